@@ -1,10 +1,23 @@
 import matplotlib.pyplot as plt
-from typing import Tuple, Union
+from scipy.linalg import solve_triangular, cho_factor, cho_solve
+from scipy.linalg.lapack import dpotrs
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple, Union, List
+import abc
 import numpy as np
 import random
+import math
+import os
+import time
+
+_accuracy = 1e-12
+# относительный порог диагонали множителя Холецкого, ниже которого окно RollingRegression считается вырожденным
+_RANK_TOLERANCE = np.sqrt(np.finfo(float).eps)
 
 
 class Regression:
+    _PREDICT_CHUNK_SIZE = 1 << 16
+
     def __new__(cls, *args, **kwargs):
         raise RuntimeError("Regression class is static class")
 
@@ -16,9 +29,65 @@ class Regression:
             return random.uniform(rand_range[0], rand_range[1])
         return random.uniform(-0.5, 0.5)
 
+    @staticmethod
+    def make_rng(seed: Union[int, np.random.Generator, None] = None) -> np.random.Generator:
+        """
+        Создаёт генератор случайных чисел NumPy.
+        :param seed: зерно генератора, готовый генератор (возвращается как есть) или None
+        :return: np.random.Generator
+        """
+        if isinstance(seed, np.random.Generator):
+            return seed
+        return np.random.default_rng(seed)
+
+    @staticmethod
+    def rand_array_in_range(rand_range: Union[float, Tuple[float, float]] = 1.0,
+                            size: Union[int, Tuple[int, ...]] = 1,
+                            rng: Union[int, np.random.Generator, None] = None,
+                            out: Union[np.ndarray, None] = None) -> np.ndarray:
+        """
+        Векторный аналог rand_in_range: массив значений с тем же распределением.
+        :param rand_range: диапазон значений [-0.5 * rand_range, 0.5 * rand_range] или [rand_range[0], rand_range[1]]
+        :param size: размерность массива (игнорируется, если задан out)
+        :param rng: зерно или генератор случайных чисел
+        :param out: непрерывный массив float64, в который записывается результат (без лишних выделений памяти)
+        :return: массив случайных значений
+        """
+        if isinstance(rand_range, float):
+            low, high = -0.5 * rand_range, 0.5 * rand_range
+        elif isinstance(rand_range, tuple):
+            low, high = rand_range
+        else:
+            low, high = -0.5, 0.5
+        rng = Regression.make_rng(rng)
+        out = rng.random(size) if out is None else rng.random(out=out)
+        out *= high - low
+        out += low
+        return out
+
+    @staticmethod
+    def test_data_chunks(generator, n_points: int, chunk_size: int = 1_000_000,
+                         seed: Union[int, np.random.Generator, None] = None, **kwargs):
+        """
+        Выдаёт тестовые данные частями, не держа в памяти всю выборку сразу.
+        Подходит для генераторов со случайными аргументами (test_data_2d, test_data_nd, second_order_surface_2d,
+        log_reg_test_data и log_reg_ellipsoid_test_data из Logistic_Regression): все части берутся из одного
+        потока случайных чисел, поэтому при одинаковом seed результат воспроизводим.
+        :param generator: функция-генератор тестовых данных с параметрами n_points и rng
+        :param n_points: общее количество точек
+        :param chunk_size: максимальное количество точек в одной части
+        :param seed: зерно или генератор случайных чисел
+        :param kwargs: остальные параметры генератора
+        :return: итератор по результатам generator для каждой части
+        """
+        rng = Regression.make_rng(seed)
+        for start in range(0, n_points, chunk_size):
+            yield generator(n_points=min(chunk_size, n_points - start), rng=rng, **kwargs)
+
     @staticmethod
     def test_data_along_line(k: float = 1.0, b: float = 0.1, arg_range: float = 1.0,
-                             rand_range: float = 0.05, n_points: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+                             rand_range: float = 0.05, n_points: int = 100,
+                             rng: Union[int, np.random.Generator, None] = None) -> Tuple[np.ndarray, np.ndarray]:
         """
         Генерирует линию вида y = k * x + b + dy, где dy - аддитивный шум с амплитудой half_disp
         :param k: наклон линии
@@ -26,15 +95,19 @@ class Regression:
         :param arg_range: диапазон аргумента от 0 до arg_range
         :param rand_range: диапазон шума данных
         :param n_points: количество точек
+        :param rng: зерно или генератор случайных чисел
         :return: кортеж значений по x и y
         """
-        x_step = arg_range / (n_points - 1)
-        return np.array([i * x_step for i in range(n_points)]), \
-            np.array([i * x_step * k + b + Regression.rand_in_range(rand_range) for i in range(n_points)])
+        x = np.arange(n_points) * (arg_range / (n_points - 1))
+        y = Regression.rand_array_in_range(rand_range, n_points, rng)
+        y += b
+        y += x * k
+        return x, y
 
     @staticmethod
     def test_data_along_cos(k: float = 1.0, b: float = 0.1, arg_range: float = 3.0,
-                             rand_range: float = 0.05, n_points: int = 300) -> Tuple[np.ndarray, np.ndarray]:
+                            rand_range: float = 0.05, n_points: int = 300,
+                            rng: Union[int, np.random.Generator, None] = None) -> Tuple[np.ndarray, np.ndarray]:
         """
         Генерирует линию вида y = k * x + b + dy, где dy - аддитивный шум с амплитудой half_disp
         :param k: наклон линии
@@ -42,16 +115,19 @@ class Regression:
         :param arg_range: диапазон аргумента от 0 до arg_range
         :param rand_range: диапазон шума данных
         :param n_points: количество точек
+        :param rng: зерно или генератор случайных чисел
         :return: кортеж значений по x и y
         """
-        x_step = arg_range / (n_points - 1)
-        return np.array([i * x_step for i in range(n_points)]), \
-            np.array([np.cos(i * x_step) + Regression.rand_in_range(rand_range) for i in range(n_points)])
+        x = np.arange(n_points) * (arg_range / (n_points - 1))
+        y = Regression.rand_array_in_range(rand_range, n_points, rng)
+        y += np.cos(x)
+        return x, y
 
     @staticmethod
     def second_order_surface_2d(surf_params:
     Tuple[float, float, float, float, float, float] = (1.0, -2.0, 3.0, -1.0, 2.0, -3.0),
-                                args_range: float = 1.0, rand_range: float = .1, n_points: int = 1000) -> \
+                                args_range: float = 1.0, rand_range: float = .1, n_points: int = 1000,
+                                rng: Union[int, np.random.Generator, None] = None) -> \
             Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
         Генерирует набор тестовых данных около поверхности второго порядка.
@@ -62,17 +138,21 @@ class Regression:
         :param args_range x in [x0, x1], y in [y0, y1]:
         :param rand_range:
         :param n_points:
+        :param rng: зерно или генератор случайных чисел
         :return:
         """
-        x = np.array([Regression.rand_in_range(args_range) for _ in range(n_points)])
-        y = np.array([Regression.rand_in_range(args_range) for _ in range(n_points)])
-        dz = np.array([surf_params[5] + Regression.rand_in_range(rand_range) for _ in range(n_points)])
-        return x, y, surf_params[0] * x * x + surf_params[1] * y * x + surf_params[2] * y * y + \
-                     surf_params[3] * x + surf_params[4] * y + dz
+        rng = Regression.make_rng(rng)
+        x, y = Regression.rand_array_in_range(args_range, (2, n_points), rng)
+        z = Regression.rand_array_in_range(rand_range, n_points, rng)
+        z += surf_params[5]
+        z += (surf_params[0] * x + surf_params[1] * y + surf_params[3]) * x
+        z += (surf_params[2] * y + surf_params[4]) * y
+        return x, y, z
 
     @staticmethod
     def test_data_2d(kx: float = -2.0, ky: float = 2.0, b: float = 12.0, args_range: float = 1.0,
-                     rand_range: float = 1.0, n_points: int = 100) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+                     rand_range: float = 1.0, n_points: int = 100,
+                     rng: Union[int, np.random.Generator, None] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
         Генерирует плоскость вида z = kx*x + ky*x + b + dz, где dz - аддитивный шум в диапазоне rand_range
         :param kx: наклон плоскости по x
@@ -81,31 +161,38 @@ class Regression:
         :param args_range: диапазон аргументов по кажой из осей от 0 до args_range
         :param rand_range: диапазон шума данных
         :param n_points: количество точек
+        :param rng: зерно или генератор случайных чисел
         :returns: кортеж значенией по x, y и z
         """
-        x = np.array([Regression.rand_in_range(args_range) for _ in range(n_points)])
-        y = np.array([Regression.rand_in_range(args_range) for _ in range(n_points)])
-        dz = np.array([b + Regression.rand_in_range(rand_range) for _ in range(n_points)])
-        return x, y, x * kx + y * ky + dz
+        rng = Regression.make_rng(rng)
+        x, y = Regression.rand_array_in_range(args_range, (2, n_points), rng)
+        z = Regression.rand_array_in_range(rand_range, n_points, rng)
+        z += b
+        z += x * kx
+        z += y * ky
+        return x, y, z
 
     @staticmethod
     def test_data_nd(surf_settings: np.ndarray = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 12.0]), args_range: float = 1.0,
-                     rand_range: float = 0.1, n_points: int = 125) -> np.ndarray:
+                     rand_range: float = 0.1, n_points: int = 125,
+                     rng: Union[int, np.random.Generator, None] = None) -> np.ndarray:
         """
         Генерирует плоскость вида z = k_0*x_0 + k_1*x_1...,k_n*x_n + d + dz, где dz - аддитивный шум в диапазоне rand_range
         :param surf_settings: параметры плоскости в виде k_0,k_1,...,k_n,d
         :param args_range: диапазон аргументов по кажой из осей от 0 до args_range
         :param n_points: количество точек
         :param rand_range: диапазон шума данных
+        :param rng: зерно или генератор случайных чисел
         :returns: массив из строк вида x_0, x_1,...,x_n, f(x_0, x_1,...,x_n)
         """
+        rng = Regression.make_rng(rng)
         n_dims = surf_settings.size - 1
-        data = np.zeros((n_points, n_dims + 1,), dtype=float)
-        for i in range(n_dims):
-            data[:, i] = np.array([Regression.rand_in_range(args_range) for _ in range(n_points)])
-            data[:, n_dims] += surf_settings[i] * data[:, i]
-        dz = np.array([surf_settings[n_dims] + Regression.rand_in_range(rand_range) for _ in range(n_points)])
-        data[:, n_dims] += dz
+        data = Regression.rand_array_in_range(args_range, (n_points, n_dims + 1,), rng)
+        # последний столбец перезаписывается шумом нужной амплитуды и значением плоскости
+        z = Regression.rand_array_in_range(rand_range, n_points, rng)
+        z += surf_settings[n_dims]
+        z += data[:, :n_dims] @ surf_settings[:n_dims]
+        data[:, n_dims] = z
         return data
 
     @staticmethod
@@ -326,18 +413,526 @@ class Regression:
         return np.linalg.inv(A) @ B
 
     @staticmethod
-    def polynom(x: np.ndarray, b: np.ndarray) -> np.ndarray:
+    def poly_design_matrix(x: np.ndarray, order: int = 5) -> np.ndarray:
+        """
+        Матрица плана полиномиальной регрессии (матрица Вандермонда).\n
+        Строка матрицы имеет вид: di = { 1, xi, xi^2,..., xi^order }\n
+        :param x: массив значений по x
+        :param order: порядок полинома
+        :return: матрица размерности (x.size, order + 1)
+        """
+        return np.vander(np.asarray(x, dtype=float).ravel(), order + 1, increasing=True)
+
+    @staticmethod
+    def batch_linear_regression(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Пакетная линейная регрессия для набора рядов, заданных на общей сетке x.\n
+        Суммы Σxi и Σxi^2 считаются один раз, а Σyi и Σxi*yi - сразу для всех столбцов y:\n
+        k = (n * Σxi*yi - Σxi*Σyi) / (n * Σxi^2 - (Σxi)^2)\n
+        b = (Σyi - k * Σxi) / n\n
+        :param x: массив значений по x размерности (n_points,)
+        :param y: матрица значений по y размерности (n_points, n_series)
+        :returns: пара массивов (k, b) размерности (n_series,)
         """
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float)
+        if y.ndim == 1:
+            y = y.reshape((-1, 1))
+        n = x.size
+        if n != y.shape[0]:
+            raise ValueError("Длины массивов x и y не совпадают")
+
+        sum_x = np.sum(x)
+        sum_x_squared = np.dot(x, x)
+        sum_y = np.sum(y, axis=0)
+        sum_xy = x @ y
+
+        k = (n * sum_xy - sum_x * sum_y) / (n * sum_x_squared - sum_x ** 2)
+        b = (sum_y - k * sum_x) / n
+        return k, b
+
+    @staticmethod
+    def batch_poly_regression(x: np.ndarray, y: np.ndarray, order: int = 5) -> np.ndarray:
+        """
+        Пакетная полиномиальная регрессия для набора рядов, заданных на общей сетке x.\n
+        Матрица плана D = { 1 | x | x^2 |...| x^order } раскладывается один раз: D = Q * R,
+        после чего коэффициенты всех рядов находятся одной обратной подстановкой:\n
+        R * C = Q^T * Y\n
+        :param x: массив значений по x размерности (n_points,)
+        :param y: матрица значений по y размерности (n_points, n_series)
+        :param order: порядок полинома
+        :return: матрица коэффициентов размерности (order + 1, n_series), столбец j - коэффициенты bi ряда j
+        """
+        y = np.asarray(y, dtype=float)
+        if y.ndim == 1:
+            y = y.reshape((-1, 1))
+        d = Regression.poly_design_matrix(x, order)
+        if d.shape[0] != y.shape[0]:
+            raise ValueError("Длины массивов x и y не совпадают")
+        q, r = np.linalg.qr(d)
+        return solve_triangular(r, q.T @ y)
+
+    @staticmethod
+    def _robust_scale(residuals: np.ndarray) -> float:
+        """
+        Устойчивая оценка разброса остатков: медиана абсолютных отклонений, нормированная на нормальное распределение.
+        """
+        scale = np.median(np.abs(residuals - np.median(residuals))) / 0.6745
+        return scale if scale > _accuracy else max(np.abs(residuals).mean(), _accuracy)
+
+    @staticmethod
+    def huber_weights(u: np.ndarray, tuning: float = 1.345) -> np.ndarray:
+        """
+        Веса Хьюбера для нормированных остатков u: w = 1 при |u| <= c, иначе c / |u|
+        """
+        abs_u = np.abs(u)
+        return np.minimum(1.0, tuning / np.maximum(abs_u, _accuracy))
+
+    @staticmethod
+    def tukey_weights(u: np.ndarray, tuning: float = 4.685) -> np.ndarray:
+        """
+        Веса Тьюки (biweight) для нормированных остатков u: w = (1 - (u / c)^2)^2 при |u| < c, иначе 0
+        """
+        t = u / tuning
+        t *= t
+        np.subtract(1.0, t, out=t)
+        np.maximum(t, 0.0, out=t)
+        t *= t
+        return t
+
+    @staticmethod
+    def irls_regression(design: np.ndarray, y: np.ndarray, weights: str = 'huber', tuning: Union[float, None] = None,
+                        max_iters: int = 50, tolerance: float = 1e-8) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Устойчивая регрессия методом итеративно перевзвешенных наименьших квадратов.
+        На каждой итерации решаются взвешенные нормальные уравнения:\n
+        (D^T * W * D) * C = D^T * W * y\n
+        где W = diag(w(ri / s)), ri - остатки предыдущей итерации, s - их устойчивый разброс,
+        w - функция весов Хьюбера ('huber') или Тьюки ('tukey').
+        :param design: матрица плана D размерности (n_points, d)
+        :param y: массив целевых значений
+        :param weights: 'huber' или 'tukey'
+        :param tuning: константа функции весов (по умолчанию 1.345 для Хьюбера и 4.685 для Тьюки)
+        :param max_iters: максимальное количество итераций
+        :param tolerance: относительное изменение коэффициентов, при котором итерации прекращаются
+        :return: пара (коэффициенты, веса точек)
+        """
+        if weights == 'huber':
+            weight_function = Regression.huber_weights
+        elif weights == 'tukey':
+            weight_function = Regression.tukey_weights
+        else:
+            raise ValueError(f"Неизвестная функция весов: {weights}")
+        design = np.asarray(design, dtype=float)
+        y = np.asarray(y, dtype=float).ravel()
+        if design.shape[0] != y.size:
+            raise ValueError("Количество точек в матрице плана и целевых значениях не совпадает")
+        tuning_args = () if tuning is None else (tuning,)
+
+        w = np.ones(y.size)
+        if weights == 'tukey':
+            # веса Тьюки обнуляют далёкие точки, поэтому старт берётся с устойчивого решения Хьюбера,
+            # а не с МНК, который сильные выбросы могут увести так, что обнулятся почти все веса
+            coefficients, _ = Regression.irls_regression(design, y, 'huber', None, max_iters, tolerance)
+        else:
+            coefficients = cho_solve(cho_factor(design.T @ design), design.T @ y)
+        for _ in range(max_iters):
+            residuals = y - design @ coefficients
+            w = weight_function(residuals / Regression._robust_scale(residuals), *tuning_args)
+            weighted = design * w[:, None]
+            previous = coefficients
+            coefficients = cho_solve(cho_factor(weighted.T @ design), weighted.T @ y)
+            if np.abs(coefficients - previous).max() <= tolerance * (1.0 + np.abs(coefficients).max()):
+                break
+        return coefficients, w
+
+    @staticmethod
+    def _ransac_batch(design: np.ndarray, y: np.ndarray, n_hypotheses: int, threshold: float,
+                      rng: np.random.Generator) -> Tuple[int, np.ndarray]:
+        """
+        Пакет гипотез RANSAC: n_hypotheses минимальных выборок решаются одним вызовом np.linalg.solve,
+        все гипотезы оцениваются одним матричным произведением.
+        :return: пара (количество inlier-ов лучшей гипотезы, её коэффициенты)
+        """
+        n_points, d = design.shape
+        indices = rng.integers(0, n_points, (n_hypotheses, d))
+        systems = design[indices]
+        determinants = np.linalg.det(systems)
+        valid = np.abs(determinants) > _accuracy
+        if not valid.any():
+            return 0, np.zeros(d)
+        hypotheses = np.linalg.solve(systems[valid], y[indices[valid]][..., None])[..., 0]
+        residuals = design @ hypotheses.T
+        residuals -= y[:, None]
+        np.abs(residuals, out=residuals)
+        scores = np.count_nonzero(residuals <= threshold, axis=0)
+        best = int(np.argmax(scores))
+        return int(scores[best]), hypotheses[best]
+
+    @staticmethod
+    def ransac_regression(design: np.ndarray, y: np.ndarray, n_hypotheses: int = 2048,
+                          threshold: Union[float, None] = None, batch_size: int = 256,
+                          n_jobs: Union[int, None] = None,
+                          seed: Union[int, None] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Устойчивая регрессия методом RANSAC.
+        Гипотезы строятся по случайным минимальным выборкам из d точек и оцениваются по количеству точек,
+        остаток которых не превышает threshold. Гипотезы обрабатываются пакетами по batch_size,
+        пакеты распределяются по потокам (numpy отпускает GIL в линейной алгебре).
+        Лучшая гипотеза уточняется методом наименьших квадратов по её inlier-ам.
+        :param design: матрица плана D размерности (n_points, d)
+        :param y: массив целевых значений
+        :param n_hypotheses: общее количество гипотез
+        :param threshold: порог остатка для inlier-а (по умолчанию 2.5 устойчивых разброса остатков МНК)
+        :param batch_size: количество гипотез в пакете
+        :param n_jobs: количество потоков (по умолчанию - количество ядер)
+        :param seed: зерно генератора случайных чисел
+        :return: пара (коэффициенты, маска inlier-ов)
+        """
+        design = np.asarray(design, dtype=float)
+        y = np.asarray(y, dtype=float).ravel()
+        n_points, d = design.shape
+        if n_points != y.size:
+            raise ValueError("Количество точек в матрице плана и целевых значениях не совпадает")
+        if n_points < d:
+            raise ValueError("Количество точек меньше количества коэффициентов модели")
+        if threshold is None:
+            residuals = y - design @ cho_solve(cho_factor(design.T @ design), design.T @ y)
+            threshold = 2.5 * Regression._robust_scale(residuals)
+
+        batches = [min(batch_size, n_hypotheses - start) for start in range(0, n_hypotheses, batch_size)]
+        rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(len(batches))]
+        n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+        if n_jobs > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                results = list(executor.map(
+                    lambda args: Regression._ransac_batch(design, y, args[0], threshold, args[1]), zip(batches, rngs)))
+        else:
+            results = [Regression._ransac_batch(design, y, size, threshold, rng) for size, rng in zip(batches, rngs)]
+
+        best_score, best = max(results, key=lambda result: result[0])
+        if best_score < d:
+            raise RuntimeError("RANSAC не нашёл ни одной невырожденной гипотезы")
+        inliers = np.abs(y - design @ best) <= threshold
+        inlier_design = design[inliers]
+        coefficients = cho_solve(cho_factor(inlier_design.T @ inlier_design), inlier_design.T @ y[inliers])
+        return coefficients, inliers
+
+    @staticmethod
+    def robust_linear_regression(x: np.ndarray, y: np.ndarray, method: str = 'huber', **kwargs) -> Tuple[float, float]:
+        """
+        Устойчивая линейная регрессия y = k * x + b.
+        :param x: массив значений по x
+        :param y: массив значений по y
+        :param method: 'huber', 'tukey' (irls_regression) или 'ransac' (ransac_regression)
+        :param kwargs: параметры irls_regression или ransac_regression
+        :returns: пара (k, b)
+        """
+        x = np.asarray(x, dtype=float).ravel()
+        design = np.column_stack((x, np.ones(x.size)))
+        if method == 'ransac':
+            coefficients, _ = Regression.ransac_regression(design, y, **kwargs)
+        else:
+            coefficients, _ = Regression.irls_regression(design, y, method, **kwargs)
+        return coefficients[0], coefficients[1]
+
+    @staticmethod
+    def robust_n_linear_regression(data_rows: np.ndarray, method: str = 'huber', **kwargs) -> np.ndarray:
+        """
+        Устойчивый аналог n_linear_regression.
+        :param data_rows: состоит из строк вида: [x_0,x_1,...,x_n, f(x_0,x_1,...,x_n)]
+        :param method: 'huber', 'tukey' (irls_regression) или 'ransac' (ransac_regression)
+        :param kwargs: параметры irls_regression или ransac_regression
+        :return: коэффициенты k_0,...,k_n
+        """
+        rows, cols = data_rows.shape
+        if cols < 2:
+            raise ValueError("Массив данных должен содержать хотя бы два столбца")
+        if method == 'ransac':
+            coefficients, _ = Regression.ransac_regression(data_rows[:, :-1], data_rows[:, -1], **kwargs)
+        else:
+            coefficients, _ = Regression.irls_regression(data_rows[:, :-1], data_rows[:, -1], method, **kwargs)
+        return coefficients
+
+    @staticmethod
+    def _poly_scaling(x: np.ndarray) -> Tuple[float, float]:
+        """
+        Сдвиг и масштаб, отображающие x на [-1, 1]: t = (x - shift) / scale.
+        :param x: массив значений по x
+        :return: пара (shift, scale)
+        """
+        x_min, x_max = x.min(), x.max()
+        return 0.5 * (x_max + x_min), 0.5 * max(x_max - x_min, _accuracy)
+
+    @staticmethod
+    def _ridge_solve(gram: np.ndarray, moment: np.ndarray, ridge: float) -> np.ndarray:
+        """
+        Решение (G + ridge * I) * C = m через разложение Холецкого. Свободный член не штрафуется.
+        :return: коэффициенты C
+        """
+        penalty = np.full(moment.size, ridge)
+        penalty[0] = 0.0
+        return cho_solve(cho_factor(gram + np.diag(penalty)), moment)
+
+    @staticmethod
+    def _cv_candidate_scores(gram: np.ndarray, moment: np.ndarray, fold_stats: list,
+                             order: int, ridge: float) -> np.ndarray:
+        """
+        Ошибки всех блоков перекрёстной проверки для одного кандидата (порядок, коэффициент регуляризации).
+        Статистики обучающей части получаются вычитанием: G_train = G - G_k, m_train = m - m_k.
+        Для порядка p используется левый верхний блок (p + 1) x (p + 1) матрицы Грама максимального порядка.
+        Ошибка на проверочном блоке считается по его статистикам без обращения к точкам:\n
+        Σ(yi - (D_k * C)_i)^2 = y_k^T * y_k - 2 * C^T * m_k + C^T * G_k * C\n
+        :return: массив среднеквадратичных ошибок по блокам
+        """
+        size = order + 1
+        g, m = gram[:size, :size], moment[:size]
+        scores = np.full(len(fold_stats), np.inf)
+        for k, (fold_gram, fold_moment, fold_target_sq, fold_size) in enumerate(fold_stats):
+            g_k = fold_gram[:size, :size]
+            m_k = fold_moment[:size]
+            try:
+                c = Regression._ridge_solve(g - g_k, m - m_k, ridge)
+            except np.linalg.LinAlgError:
+                continue
+            scores[k] = (fold_target_sq - 2.0 * c @ m_k + c @ g_k @ c) / fold_size
+        return scores
+
+    @staticmethod
+    def poly_ridge_regression(x: np.ndarray, y: np.ndarray, order: int = 5, ridge: float = 0.0) -> np.ndarray:
+        """
+        Гребневая полиномиальная регрессия в той же постановке, что и poly_cross_validation:
+        x отображается на [-1, 1], решается (G + ridge * I) * C = m, после чего коэффициенты
+        пересчитываются к исходному x, так что результат можно передать в polynom.
+        :param x: массив значений по x
+        :param y: массив значений по y
+        :param order: порядок полинома
+        :param ridge: коэффициент регуляризации
+        :return: набор коэффициентов bi полинома y = Σx^i*bi
+        """
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        shift, scale = Regression._poly_scaling(x)
+        design = Regression.poly_design_matrix((x - shift) / scale, order)
+        c = Regression._ridge_solve(design.T @ design, design.T @ y, ridge)
+        coefficients = np.polynomial.Polynomial(c)(np.polynomial.Polynomial((-shift / scale, 1.0 / scale))).coef
+        return np.pad(coefficients, (0, order + 1 - coefficients.size))
+
+    @staticmethod
+    def poly_cross_validation(x: np.ndarray, y: np.ndarray, orders=range(1, 11), ridges=(0.0,),
+                              n_folds: int = 5, n_jobs: Union[int, None] = None,
+                              seed: Union[int, np.random.Generator, None] = None) -> np.ndarray:
+        """
+        Перекрёстная проверка (k-fold) полиномиальной регрессии по порядку полинома и коэффициенту
+        гребневой регуляризации (G + ridge * I) * C = m.
+        Матрица плана строится один раз для максимального порядка, по каждому блоку считаются
+        G_k = D_k^T * D_k, m_k = D_k^T * y_k и y_k^T * y_k, после чего все кандидаты оцениваются
+        только по этим статистикам. Кандидаты (порядок, коэффициент регуляризации) обрабатываются параллельно,
+        каждый - по всем блокам.
+        x отображается на [-1, 1] перед построением признаков: предсказания МНК от этого не меняются,
+        а матрица Грама высоких порядков остаётся обусловленной; регуляризация относится к коэффициентам
+        полинома от нормированного x (см. poly_ridge_regression).
+        :param x: массив значений по x
+        :param y: массив значений по y
+        :param orders: проверяемые порядки полинома
+        :param ridges: проверяемые коэффициенты регуляризации
+        :param n_folds: количество блоков
+        :param n_jobs: количество потоков (по умолчанию - количество ядер)
+        :param seed: зерно или генератор случайных чисел для разбиения на блоки
+        :return: таблица с полями order, ridge, mse, mse_std, упорядоченная по возрастанию mse
+        """
+        x = np.asarray(x, dtype=float).ravel()
+        y = np.asarray(y, dtype=float).ravel()
+        if x.size != y.size:
+            raise ValueError("Длины массивов x и y не совпадают")
+        if not 2 <= n_folds <= x.size:
+            raise ValueError("n_folds должно быть не меньше 2 и не больше количества точек")
+        orders = np.asarray(list(orders), dtype=int)
+        ridges = np.asarray(list(ridges), dtype=float)
+        if orders.size == 0 or orders.min() < 0 or ridges.size == 0 or ridges.min() < 0.0:
+            raise ValueError("Порядки и коэффициенты регуляризации должны быть неотрицательными")
+
+        shift, scale = Regression._poly_scaling(x)
+        design = Regression.poly_design_matrix((x - shift) / scale, int(orders.max()))
+        folds = np.array_split(Regression.make_rng(seed).permutation(x.size), n_folds)
+        fold_stats = []
+        for fold in folds:
+            d_k = design[fold]
+            fold_stats.append((d_k.T @ d_k, d_k.T @ y[fold], float(y[fold] @ y[fold]), fold.size))
+        gram = sum(stats[0] for stats in fold_stats)
+        moment = sum(stats[1] for stats in fold_stats)
+
+        candidates = [(int(order), float(ridge)) for order in orders for ridge in ridges]
+
+        def score(candidate):
+            return Regression._cv_candidate_scores(gram, moment, fold_stats, *candidate)
+
+        n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+        if n_jobs > 1:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                scores = np.array(list(executor.map(score, candidates)))
+        else:
+            scores = np.array([score(candidate) for candidate in candidates])
+
+        table = np.zeros(orders.size * ridges.size,
+                         dtype=[('order', int), ('ridge', float), ('mse', float), ('mse_std', float)])
+        table['order'] = np.repeat(orders, ridges.size)
+        table['ridge'] = np.tile(ridges, orders.size)
+        table['mse'] = scores.mean(axis=1)
+        table['mse_std'] = scores.std(axis=1)
+        return table[np.argsort(table['mse'], kind='stable')]
+
+    @staticmethod
+    def polynom(x: np.ndarray, b: np.ndarray, out: Union[np.ndarray, None] = None,
+                chunk_size: Union[int, None] = None) -> np.ndarray:
+        """
+        Вычисление полинома по схеме Горнера:\n
+        yi = (...((b_n * xi + b_n-1) * xi + b_n-2) * xi + ...) * xi + b_0\n
         :param x: массив значений по x\n
         :param b: массив коэффициентов полинома\n
+        :param out: массив, в который записывается результат (той же формы, что и x)\n
+        :param chunk_size: размер блока, которым обрабатывается x\n
         :returns: возвращает полином yi = Σxi^j*bj\n
         """
-        x_curr = np.ones_like(x)
-        result = np.zeros_like(x)
-        for p, c in enumerate(b.flat):
-            result += x_curr * c
-            x_curr *= x
-        return result
+        b = np.asarray(b, dtype=float).ravel()
+
+        def kernel(x_chunk: np.ndarray, out_chunk: np.ndarray) -> None:
+            out_chunk.fill(b[-1] if b.size else 0.0)
+            for c in b[-2::-1]:
+                out_chunk *= x_chunk
+                out_chunk += c
+
+        x = np.asarray(x, dtype=float)
+        return Regression._predict_chunked(kernel, (x.reshape(-1),), x.shape, out, chunk_size)
+
+    @staticmethod
+    def _predict_chunked(kernel, args: Tuple[np.ndarray, ...], shape: Tuple[int, ...],
+                         out: Union[np.ndarray, None] = None, chunk_size: Union[int, None] = None) -> np.ndarray:
+        """
+        Применяет kernel(*args_chunk, out_chunk) к блокам входных массивов, записывая результат в out.
+        Блоки небольшого размера остаются в кэше процессора на всё время вычисления,
+        а запись в out позволяет не выделять память под результат на каждом вызове.
+        :param kernel: функция вида kernel(*args_chunk, out_chunk) -> None
+        :param args: входные массивы, первая ось которых имеет длину prod(shape)
+        :param shape: форма результата
+        :param out: непрерывный массив float64 формы shape или None
+        :param chunk_size: количество строк в блоке
+        :return: out
+        """
+        if out is None:
+            out = np.empty(shape, dtype=float)
+        elif out.shape != tuple(shape) or out.dtype != np.float64 or not out.flags.c_contiguous:
+            raise ValueError(f"Массив out должен быть непрерывным массивом float64 формы {tuple(shape)}")
+        out_flat = out.reshape(-1)
+        n = out_flat.size
+        chunk_size = Regression._PREDICT_CHUNK_SIZE if chunk_size is None else max(int(chunk_size), 1)
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            kernel(*(arg[start:stop] for arg in args), out_flat[start:stop])
+        return out
+
+    @staticmethod
+    def predict_linear(x: np.ndarray, k: float, b: float, out: Union[np.ndarray, None] = None,
+                       chunk_size: Union[int, None] = None) -> np.ndarray:
+        """
+        Значения линии y = k * x + b (результат linear_regression)
+        :param x: массив значений по x
+        :param k: наклон линии
+        :param b: смещение по y
+        :param out: массив, в который записывается результат (той же формы, что и x)
+        :param chunk_size: размер блока, которым обрабатывается x
+        :return: массив значений y
+        """
+        def kernel(x_chunk: np.ndarray, out_chunk: np.ndarray) -> None:
+            np.multiply(x_chunk, k, out=out_chunk)
+            out_chunk += b
+
+        x = np.asarray(x, dtype=float)
+        return Regression._predict_chunked(kernel, (x.reshape(-1),), x.shape, out, chunk_size)
+
+    @staticmethod
+    def predict_bi_linear(x: np.ndarray, y: np.ndarray, kx: float, ky: float, b: float,
+                          out: Union[np.ndarray, None] = None, chunk_size: Union[int, None] = None) -> np.ndarray:
+        """
+        Значения плоскости z = kx * x + ky * y + b (результат bi_linear_regression)
+        :param x: массив значений по x
+        :param y: массив значений по y (той же формы, что и x)
+        :param kx: наклон плоскости по x
+        :param ky: наклон плоскости по y
+        :param b: смещение по z
+        :param out: массив, в который записывается результат (той же формы, что и x)
+        :param chunk_size: размер блока, которым обрабатываются x и y
+        :return: массив значений z
+        """
+        def kernel(x_chunk: np.ndarray, y_chunk: np.ndarray, out_chunk: np.ndarray) -> None:
+            np.multiply(x_chunk, kx, out=out_chunk)
+            out_chunk += b
+            out_chunk += ky * y_chunk
+
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if x.shape != y.shape:
+            raise ValueError("Формы массивов x и y не совпадают")
+        return Regression._predict_chunked(kernel, (x.reshape(-1), y.reshape(-1)), x.shape, out, chunk_size)
+
+    @staticmethod
+    def predict_n_linear(x_rows: np.ndarray, coefficients: np.ndarray, out: Union[np.ndarray, None] = None,
+                         chunk_size: Union[int, None] = None) -> np.ndarray:
+        """
+        Значения гиперплоскости f(x_0,...,x_n) = Σ k_i * x_i (результат n_linear_regression)
+        Если coefficients на один элемент длиннее строки x_rows, последний коэффициент считается смещением.
+        :param x_rows: матрица из строк вида [x_0,x_1,...,x_n]
+        :param coefficients: коэффициенты k_0,...,k_n[, d]
+        :param out: массив размерности (x_rows.shape[0],), в который записывается результат
+        :param chunk_size: количество строк в блоке
+        :return: массив значений f
+        """
+        x_rows = np.asarray(x_rows, dtype=float)
+        coefficients = np.asarray(coefficients, dtype=float).ravel()
+        n_dims = x_rows.shape[1]
+        if coefficients.size not in (n_dims, n_dims + 1):
+            raise ValueError("Количество коэффициентов не совпадает с количеством столбцов x_rows")
+        weights = coefficients[:n_dims]
+        bias = coefficients[n_dims] if coefficients.size > n_dims else 0.0
+
+        def kernel(x_chunk: np.ndarray, out_chunk: np.ndarray) -> None:
+            np.dot(x_chunk, weights, out=out_chunk)
+            out_chunk += bias
+
+        return Regression._predict_chunked(kernel, (x_rows,), (x_rows.shape[0],), out, chunk_size)
+
+    @staticmethod
+    def predict_quadratic_2d(x: np.ndarray, y: np.ndarray, coefficients: np.ndarray,
+                             out: Union[np.ndarray, None] = None, chunk_size: Union[int, None] = None) -> np.ndarray:
+        """
+        Значения поверхности z(x,y) = a * x^2 + x * y * b + c * y^2 + d * x + e * y + f
+        (результат quadratic_regression_2d) в форме Горнера:\n
+        z(x,y) = ((a * x + b * y + d) * x + (c * y + e) * y) + f\n
+        :param x: массив значений по x
+        :param y: массив значений по y (той же формы, что и x)
+        :param coefficients: коэффициенты {a, b, c, d, e, f}
+        :param out: массив, в который записывается результат (той же формы, что и x)
+        :param chunk_size: размер блока, которым обрабатываются x и y
+        :return: массив значений z
+        """
+        a, b, c, d, e, f = np.asarray(coefficients, dtype=float).ravel()
+
+        def kernel(x_chunk: np.ndarray, y_chunk: np.ndarray, out_chunk: np.ndarray) -> None:
+            np.multiply(x_chunk, a, out=out_chunk)
+            out_chunk += b * y_chunk
+            out_chunk += d
+            out_chunk *= x_chunk
+            y_term = c * y_chunk
+            y_term += e
+            y_term *= y_chunk
+            out_chunk += y_term
+            out_chunk += f
+
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if x.shape != y.shape:
+            raise ValueError("Формы массивов x и y не совпадают")
+        return Regression._predict_chunked(kernel, (x.reshape(-1), y.reshape(-1)), x.shape, out, chunk_size)
 
     @staticmethod
     def quadratic_regression_2d(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
@@ -441,7 +1036,7 @@ class Regression:
         kx, ky, b = Regression.bi_linear_regression(x, y, z)
         print(f"z(x, y) = {kx:.5f} * x + {ky:.5f} * y + {b:.5f}")
         x_, y_ = np.meshgrid(np.linspace(np.min(x), np.max(x), 100), np.linspace(np.min(y), np.max(y), 100))
-        z_ = kx * x_ + y_ * ky + b
+        z_ = Regression.predict_bi_linear(x_, y_, kx, ky, b)
         fig, ax = plt.subplots(subplot_kw={"projection": "3d"})
         ax.plot(x, y, z, 'r.')
         surf = ax.plot_surface(x_, y_, z_, linewidth=0, antialiased=False, edgecolor='none',
@@ -470,6 +1065,72 @@ class Regression:
         plt.plot(x, y, 'r.')
         plt.show()
 
+    @staticmethod
+    def batch_poly_reg_example(n_series: int = 10000, order: int = 5):
+        """
+        Функция проверки пакетной полиномиальной регрессии:\n
+        1) Построить n_series зашумлённых рядов на общей сетке x\n
+        2) Решить их циклом по poly_regression и одним вызовом batch_poly_regression\n
+        3) Сравнить время и максимальное расхождение коэффициентов\n
+        :return:
+        """
+        print('\nbatch poly regression test:')
+        x, _ = Regression.test_data_along_cos()
+        y = np.cos(x)[:, None] * np.linspace(0.5, 2.0, n_series)[None, :] + \
+            np.random.uniform(-0.025, 0.025, (x.size, n_series))
+
+        t_0 = time.perf_counter()
+        loop_coefficients = np.array([Regression.poly_regression(x, y[:, j], order) for j in range(n_series)]).T
+        t_1 = time.perf_counter()
+        batch_coefficients = Regression.batch_poly_regression(x, y, order)
+        t_2 = time.perf_counter()
+
+        print(f"series: {n_series}, order: {order}, points: {x.size}")
+        print(f"poly_regression loop : {t_1 - t_0:.4f} s")
+        print(f"batch_poly_regression: {t_2 - t_1:.4f} s ({(t_1 - t_0) / (t_2 - t_1):.1f}x)")
+        print(f"max coefficients diff: {np.abs(loop_coefficients - batch_coefficients).max():.3e}")
+
+    @staticmethod
+    def robust_reg_example(outliers_fraction: float = 0.2):
+        """
+        Функция проверки устойчивой регрессии:\n
+        1) Посчитать тестовые x и y используя функцию test_data_along_line и испортить часть точек выбросами\n
+        2) Сравнить linear_regression с robust_linear_regression для методов huber, tukey и ransac\n
+        :return:
+        """
+        print("\nrobust regression test:")
+        rng = Regression.make_rng()
+        x, y = Regression.test_data_along_line(n_points=10000, rng=rng)
+        outliers = rng.random(x.size) < outliers_fraction
+        y[outliers] += rng.uniform(1.0, 5.0, np.count_nonzero(outliers))
+        t_0 = time.perf_counter()
+        k, b = Regression.linear_regression(x, y)
+        print(f"least squares: y(x) = {k:.5f} * x + {b:.5f} ({time.perf_counter() - t_0:.4f} s)")
+        for method in ('huber', 'tukey', 'ransac'):
+            t_0 = time.perf_counter()
+            k, b = Regression.robust_linear_regression(x, y, method)
+            print(f"{method:13s}: y(x) = {k:.5f} * x + {b:.5f} ({time.perf_counter() - t_0:.4f} s)")
+
+    @staticmethod
+    def poly_cv_example():
+        """
+        Функция проверки перекрёстной проверки полиномиальной регрессии:\n
+        1) Посчитать тестовые x, y используя функцию test_data_along_cos\n
+        2) Оценить порядки 1..12 и несколько коэффициентов регуляризации функцией poly_cross_validation\n
+        3) Вывести лучшие кандидаты и построить полином с лучшими порядком и коэффициентом регуляризации\n
+        :return:
+        """
+        print("\npoly regression cross validation test:")
+        x, y = Regression.test_data_along_cos()
+        table = Regression.poly_cross_validation(x, y, orders=range(1, 13), ridges=(0.0, 1e-4, 1e-2, 1.0))
+        print(f"{'order':>5} {'ridge':>8} {'mse':>12} {'mse_std':>12}")
+        for order, ridge, mse, mse_std in table[:5]:
+            print(f"{order:5d} {ridge:8.1e} {mse:12.5e} {mse_std:12.5e}")
+        coefficients = Regression.poly_ridge_regression(x, y, int(table['order'][0]), float(table['ridge'][0]))
+        plt.plot(x, Regression.polynom(x, coefficients))
+        plt.plot(x, y, 'r.')
+        plt.show()
+
     @staticmethod
     def n_linear_reg_example():
         print("\nn linear regression test:")
@@ -489,9 +1150,7 @@ class Regression:
         x_values = data_rows[:, :-1]  # Первые n столбцов - это x
         y_values = data_rows[:, -1]  # Последний столбец - это f(x)
 
-        predicted_y = np.zeros_like(y_values)
-        for i, coeff in enumerate(coefficients):
-            predicted_y += coeff * (x_values ** i)
+        predicted_y = Regression.predict_n_linear(x_values, coefficients)
 
         plt.figure()
         plt.plot(x_values, y_values, 'bo', label='Data Points')
@@ -510,19 +1169,14 @@ class Regression:
         print('2d quadratic regression test:')
         x, y, z = Regression.second_order_surface_2d()
         coeffs = Regression.quadratic_regression_2d(x, y, z)
-        y_ = Regression.polynom(x, coeffs)
         print(
              f"z(x, y) = {coeffs[0]:1.3} * x^2 + {coeffs[1]:1.3} * x * y + {coeffs[2]:1.3} * y^2 + {coeffs[3]:1.3} * x + {coeffs[4]:1.3} * y + {coeffs[5]:1.3}")
 
-        def zF(x, y):
-            return coeffs[0] * x ** 2 + x * y * coeffs[1] + coeffs[2] * y ** 2 + coeffs[3] * x + coeffs[4] * y + coeffs[
-                5]
-
         xr = np.linspace(-1, 1, 128, dtype=float)
         yr = np.linspace(-1, 1, 128, dtype=float)
 
         XR, YR = np.meshgrid(xr, yr)
-        ZR = zF(XR, YR)
+        ZR = Regression.predict_quadratic_2d(XR, YR, coeffs)
 
         ax = plt.axes(projection='3d')
         ax.plot_surface(XR, YR, ZR, alpha=0.5)
@@ -530,6 +1184,474 @@ class Regression:
         plt.grid(True)
         plt.show()
 
+
+class LeastSquaresModel(abc.ABC):
+    """
+    Модель наименьших квадратов с состоянием.
+    Решение ищется из нормальных уравнений:\n
+    (D^T * D) * C = D^T * y\n
+    где D - матрица плана, строки которой строятся из аргументов наследником (_design_matrix).
+    Модель хранит матрицу плана, матрицу Грама D^T * D, её разложение Холецкого и достаточные статистики
+    (D^T * y, y^T * y, количество точек), поэтому:\n
+    1) повторный fit на той же сетке аргументов не пересчитывает ни D, ни разложение;\n
+    2) refit(y) при неизменных аргументах стоит O(n * d) вместо O(n * d^2);\n
+    3) append(...) добавляет строки к статистикам без обращения к уже обработанным данным.\n
+    Целевые значения могут быть матрицей (n_points, n_series) - тогда все ряды решаются одним разложением.
+    """
+
+    def __init__(self):
+        # аргументы последнего fit (копия), по ним определяется, что сетка не изменилась
+        self._arguments: Union[Tuple[np.ndarray, ...], None] = None
+        # блоки матрицы плана, накопленные через fit и append
+        self._design_blocks: List[np.ndarray] = []
+        # матрица Грама D^T * D и её разложение Холецкого
+        self._gram: Union[np.ndarray, None] = None
+        self._factor = None
+        # достаточные статистики: D^T * y и y^T * y
+        self._moment: Union[np.ndarray, None] = None
+        self._target_sq: Union[np.ndarray, float] = 0.0
+        # количество точек
+        self._n_samples: int = 0
+        # коэффициенты модели
+        self._coefficients: Union[np.ndarray, None] = None
+
+    @abc.abstractmethod
+    def _design_matrix(self, *args: np.ndarray) -> np.ndarray:
+        """
+        Матрица плана для набора аргументов. Реализуется наследником.
+        """
+
+    @abc.abstractmethod
+    def _predict(self, args: Tuple[np.ndarray, ...], out: Union[np.ndarray, None],
+                 chunk_size: Union[int, None]) -> np.ndarray:
+        """
+        Значения модели с вектором коэффициентов. Реализуется наследником.
+        """
+
+    @property
+    def coefficients(self) -> np.ndarray:
+        if self._coefficients is None:
+            return np.array([])
+        return self._coefficients
+
+    @property
+    def n_samples(self) -> int:
+        return self._n_samples
+
+    def set_coefficients(self, coefficients: Union[np.ndarray, None]) -> None:
+        """
+        Задание коэффициентов, найденных вне fit (например, RollingRegression); None - коэффициенты не определены.
+        Статистики fit после этого не соответствуют коэффициентам и сбрасываются:
+        следующий append или fit обучает модель заново.
+        """
+        self._coefficients = None if coefficients is None else np.asarray(coefficients, dtype=float)
+        if self._factor is not None:
+            self._arguments = None
+            self._design_blocks = []
+            self._gram = None
+            self._factor = None
+            self._moment = None
+            self._target_sq = 0.0
+            self._n_samples = 0
+
+    def design_matrix(self, *args: np.ndarray) -> np.ndarray:
+        """
+        Матрица плана модели для набора аргументов (по строке на точку)
+        """
+        return self._design_matrix(*(np.asarray(a, dtype=float) for a in args))
+
+    @property
+    def residual_sum_squares(self) -> Union[np.ndarray, float]:
+        """
+        Сумма квадратов отклонений Σ(yi - (D * C)_i)^2, вычисленная по достаточным статистикам:\n
+        y^T * y - 2 * C^T * D^T * y + C^T * D^T * D * C\n
+        """
+        if self._coefficients is None or self._moment is None:
+            raise RuntimeError("Модель не обучена")
+        c = self._coefficients
+        return self._target_sq - 2.0 * np.sum(c * self._moment, axis=0) + np.sum(c * (self._gram @ c), axis=0)
+
+    def _same_arguments(self, arguments: Tuple[np.ndarray, ...]) -> bool:
+        if self._arguments is None or len(arguments) != len(self._arguments):
+            return False
+        for cached, arg in zip(self._arguments, arguments):
+            if cached.shape != arg.shape or not np.array_equal(cached, arg):
+                return False
+        return True
+
+    def _design(self) -> np.ndarray:
+        if len(self._design_blocks) > 1:
+            self._design_blocks = [np.vstack(self._design_blocks)]
+        return self._design_blocks[0]
+
+    @staticmethod
+    def _split_args(args: Tuple[np.ndarray, ...]) -> Tuple[Tuple[np.ndarray, ...], np.ndarray]:
+        if len(args) < 2:
+            raise ValueError("Ожидаются аргументы модели и целевые значения")
+        return tuple(np.asarray(a, dtype=float) for a in args[:-1]), np.asarray(args[-1], dtype=float)
+
+    def fit(self, *args: np.ndarray) -> "LeastSquaresModel":
+        """
+        Обучение модели. Последний аргумент - целевые значения (вектор или матрица (n_points, n_series)),
+        остальные - аргументы модели. Если аргументы совпадают с предыдущим вызовом fit,
+        матрица плана и разложение матрицы Грама используются повторно.
+        :return: self
+        """
+        arguments, target = self._split_args(args)
+        if self._same_arguments(arguments) and self._factor is not None:
+            return self.refit(target)
+        design = self._design_matrix(*arguments)
+        if design.shape[0] != target.shape[0]:
+            raise ValueError("Количество точек в аргументах и целевых значениях не совпадает")
+        self._arguments = tuple(a.copy() for a in arguments)
+        self._design_blocks = [design]
+        self._n_samples = design.shape[0]
+        self._gram = design.T @ design
+        self._factor = cho_factor(self._gram)
+        self._moment = design.T @ target
+        self._target_sq = np.sum(target * target, axis=0)
+        self._coefficients = cho_solve(self._factor, self._moment)
+        return self
+
+    def refit(self, target: np.ndarray) -> "LeastSquaresModel":
+        """
+        Повторное обучение на тех же аргументах с новыми целевыми значениями.
+        Используется сохранённое разложение матрицы Грама, пересчитывается только D^T * y.
+        :param target: целевые значения (вектор или матрица (n_points, n_series))
+        :return: self
+        """
+        if self._factor is None:
+            raise RuntimeError("Модель не обучена")
+        target = np.asarray(target, dtype=float)
+        design = self._design()
+        if design.shape[0] != target.shape[0]:
+            raise ValueError("Количество точек в целевых значениях не совпадает с обученной моделью")
+        self._moment = design.T @ target
+        self._target_sq = np.sum(target * target, axis=0)
+        self._coefficients = cho_solve(self._factor, self._moment)
+        return self
+
+    def append(self, *args: np.ndarray) -> "LeastSquaresModel":
+        """
+        Дообучение на новых точках. Аргументы те же, что и у fit.
+        Статистики обновляются только по новым строкам: D^T * D += Dn^T * Dn, D^T * y += Dn^T * yn.
+        :return: self
+        """
+        if self._factor is None:
+            return self.fit(*args)
+        arguments, target = self._split_args(args)
+        design = self._design_matrix(*arguments)
+        if design.shape[0] != target.shape[0]:
+            raise ValueError("Количество точек в аргументах и целевых значениях не совпадает")
+        if target.shape[1:] != self._moment.shape[1:]:
+            raise ValueError("Количество рядов в целевых значениях не совпадает с обученной моделью")
+        # сетка изменилась - следующий fit должен построить матрицу плана заново
+        self._arguments = None
+        self._design_blocks.append(design)
+        self._n_samples += design.shape[0]
+        self._gram += design.T @ design
+        self._moment += design.T @ target
+        self._target_sq += np.sum(target * target, axis=0)
+        self._factor = cho_factor(self._gram)
+        self._coefficients = cho_solve(self._factor, self._moment)
+        return self
+
+    def predict(self, *args: np.ndarray, out: Union[np.ndarray, None] = None,
+                chunk_size: Union[int, None] = None) -> np.ndarray:
+        """
+        Значения модели для заданных аргументов.
+        :param out: массив, в который записывается результат
+        :param chunk_size: размер блока, которым обрабатываются аргументы
+        :return: массив значений (или матрица (n_points, n_series) для модели нескольких рядов)
+        """
+        if self._coefficients is None:
+            raise RuntimeError("Модель не обучена")
+        args = tuple(np.asarray(a, dtype=float) for a in args)
+        if self._coefficients.ndim == 1:
+            return self._predict(args, out, chunk_size)
+        return np.dot(self._design_matrix(*args), self._coefficients, out=out)
+
+
+class LinearRegressionModel(LeastSquaresModel):
+    """
+    Модель y = k * x + b. fit(x, y), predict(x).
+    """
+
+    def _design_matrix(self, x: np.ndarray) -> np.ndarray:
+        return np.column_stack((x.ravel(), np.ones(x.size)))
+
+    def _predict(self, args, out, chunk_size):
+        return Regression.predict_linear(args[0], self._coefficients[0], self._coefficients[1], out, chunk_size)
+
+
+class BiLinearRegressionModel(LeastSquaresModel):
+    """
+    Модель z = kx * x + ky * y + b. fit(x, y, z), predict(x, y).
+    """
+
+    def _design_matrix(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return np.column_stack((x.ravel(), y.ravel(), np.ones(x.size)))
+
+    def _predict(self, args, out, chunk_size):
+        kx, ky, b = self._coefficients
+        return Regression.predict_bi_linear(args[0], args[1], kx, ky, b, out, chunk_size)
+
+
+class NLinearRegressionModel(LeastSquaresModel):
+    """
+    Модель f(x_0,...,x_n) = Σ k_i * x_i (без смещения, как в n_linear_regression). fit(x_rows, f), predict(x_rows).
+    """
+
+    def _design_matrix(self, x_rows: np.ndarray) -> np.ndarray:
+        return x_rows
+
+    def _predict(self, args, out, chunk_size):
+        return Regression.predict_n_linear(args[0], self._coefficients, out, chunk_size)
+
+
+class PolyRegressionModel(LeastSquaresModel):
+    """
+    Модель y = Σx^i*bi. fit(x, y), predict(x).
+    """
+
+    def __init__(self, order: int = 5):
+        super().__init__()
+        if not isinstance(order, int) or order < 0:
+            raise ValueError("order должен быть неотрицательным целым числом")
+        self._order: int = order
+
+    @property
+    def order(self) -> int:
+        return self._order
+
+    def _design_matrix(self, x: np.ndarray) -> np.ndarray:
+        return Regression.poly_design_matrix(x, self._order)
+
+    def _predict(self, args, out, chunk_size):
+        return Regression.polynom(args[0], self._coefficients, out, chunk_size)
+
+
+class QuadraticRegression2DModel(LeastSquaresModel):
+    """
+    Модель z(x,y) = a * x^2 + x * y * b + c * y^2 + d * x + e * y + f. fit(x, y, z), predict(x, y).
+    """
+
+    def _design_matrix(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        x = x.ravel()
+        y = y.ravel()
+        return np.column_stack((x * x, x * y, y * y, x, y, np.ones(x.size)))
+
+    def _predict(self, args, out, chunk_size):
+        return Regression.predict_quadratic_2d(args[0], args[1], self._coefficients, out, chunk_size)
+
+
+def poly_model_example(n_refits: int = 1000, order: int = 5):
+    """
+    Функция проверки модели с состоянием:\n
+    1) Решить n_refits задач на одной сетке x через poly_regression\n
+    2) Решить те же задачи через PolyRegressionModel.fit (разложение строится один раз)\n
+    3) Сравнить время и коэффициенты\n
+    :return:
+    """
+    print("\npoly regression model test:")
+    x, y = Regression.test_data_along_cos()
+    targets = [y + np.random.uniform(-0.025, 0.025, y.size) for _ in range(n_refits)]
+
+    t_0 = time.perf_counter()
+    static_coefficients = [Regression.poly_regression(x, target, order) for target in targets]
+    t_1 = time.perf_counter()
+    model = PolyRegressionModel(order)
+    model_coefficients = [model.fit(x, target).coefficients for target in targets]
+    t_2 = time.perf_counter()
+
+    print(f"refits: {n_refits}, order: {order}, points: {x.size}")
+    print(f"poly_regression          : {t_1 - t_0:.4f} s")
+    print(f"PolyRegressionModel.fit  : {t_2 - t_1:.4f} s ({(t_1 - t_0) / (t_2 - t_1):.1f}x)")
+    print(f"max coefficients diff    : "
+          f"{max(np.abs(a - b).max() for a, b in zip(static_coefficients, model_coefficients)):.3e}")
+
+
+class RollingRegression:
+    """
+    Регрессия по скользящему окну из последних window точек.
+    На каждом шаге новая строка матрицы плана u добавляется в статистики, а вытесняемая из окна - удаляется:\n
+    D^T * D += u * u^T,  D^T * y += u * y   (добавление)\n
+    D^T * D -= u * u^T,  D^T * y -= u * y   (удаление)\n
+    Вместо самой матрицы D^T * D хранится её разложение Холецкого R^T * R, которое обновляется
+    поворотами (rank-one update / downdate), а коэффициенты находятся двумя треугольными подстановками,
+    поэтому шаг стоит O(d^2) вместо O(window * d^2) при полном пересчёте.
+    Раз в refresh_period шагов разложение пересчитывается по точкам окна, чтобы не накапливалась ошибка округления.
+    Вид модели задаётся экземпляром LeastSquaresModel (по умолчанию LinearRegressionModel),
+    его коэффициенты обновляются на каждом шаге, так что model.predict(...) соответствует текущему окну.
+    """
+
+    def __init__(self, window: int, model: Union[LeastSquaresModel, None] = None, refresh_period: int = 1024):
+        if not isinstance(window, int) or window < 2:
+            raise ValueError("window должно быть целым числом большим или равным 2")
+        if not isinstance(refresh_period, int) or refresh_period < 1:
+            raise ValueError("refresh_period должно быть целым положительным числом")
+        self._window: int = window
+        self._refresh_period: int = refresh_period
+        self._model: LeastSquaresModel = LinearRegressionModel() if model is None else model
+        # кольцевые буферы строк матрицы плана и целевых значений
+        self._rows: Union[np.ndarray, None] = None
+        self._targets: np.ndarray = np.zeros(window)
+        self._head: int = 0
+        self._count: int = 0
+        # верхнетреугольный множитель Холецкого R^T * R = D^T * D и вектор D^T * y по точкам окна
+        self._factor: Union[np.ndarray, None] = None
+        self._moment: Union[np.ndarray, None] = None
+        self._ticks_to_refresh: int = refresh_period
+
+    @property
+    def window(self) -> int:
+        return self._window
+
+    @property
+    def model(self) -> LeastSquaresModel:
+        return self._model
+
+    @property
+    def n_samples(self) -> int:
+        return self._count
+
+    @property
+    def coefficients(self) -> np.ndarray:
+        return self._model.coefficients
+
+    @staticmethod
+    def _cholesky_rank_one(factor: np.ndarray, u: np.ndarray, sign: float) -> bool:
+        """
+        Обновление верхнетреугольного множителя R на месте: R^T * R + sign * u * u^T.
+        :return: False, если после удаления матрица перестала быть положительно определённой
+        """
+        u = u.copy()
+        n = u.size
+        for k in range(n):
+            r_kk = factor.item(k, k)
+            u_k = u.item(k)
+            r_new = r_kk * r_kk + sign * u_k * u_k
+            if r_new <= 0.0 or r_kk == 0.0:
+                return False
+            r_new = math.sqrt(r_new)
+            c = r_new / r_kk
+            s_ = u_k / r_kk
+            factor[k, k] = r_new
+            if k + 1 < n:
+                row = factor[k, k + 1:]
+                tail = u[k + 1:]
+                row += (sign * s_) * tail
+                row /= c
+                tail *= c
+                tail -= s_ * row
+        return True
+
+    @staticmethod
+    def _degenerate(factor: np.ndarray) -> bool:
+        """
+        Окно вырождено (ранг D меньше d): диагональ R содержит элемент, неотличимый от нуля
+        с учётом ошибки округления обновлений.
+        """
+        diagonal = np.abs(np.diag(factor))
+        return diagonal.min() <= _RANK_TOLERANCE * diagonal.max()
+
+    def _refresh(self) -> None:
+        """
+        Пересчёт статистик и разложения по точкам окна.
+        """
+        rows = self._rows[:self._count]
+        self._moment = rows.T @ self._targets[:self._count]
+        self._ticks_to_refresh = self._refresh_period
+        self._factor = None
+        if self._count >= rows.shape[1]:
+            try:
+                self._factor = np.linalg.cholesky(rows.T @ rows).T.copy()
+            except np.linalg.LinAlgError:
+                self._factor = None
+            if self._factor is not None and self._degenerate(self._factor):
+                self._factor = None
+
+    def _push_row(self, u: np.ndarray, target: float) -> None:
+        if self._rows is None:
+            self._rows = np.zeros((self._window, u.size))
+            self._moment = np.zeros(u.size)
+
+        if self._count == self._window:
+            u_old = self._rows[self._head]
+            self._moment -= u_old * self._targets[self._head]
+            if self._factor is not None and not self._cholesky_rank_one(self._factor, u_old, -1.0):
+                self._factor = None
+        else:
+            self._count += 1
+
+        self._rows[self._head] = u
+        self._targets[self._head] = target
+        self._head = (self._head + 1) % self._window
+        self._moment += u * target
+        if self._factor is not None:
+            self._cholesky_rank_one(self._factor, u, 1.0)
+
+        self._ticks_to_refresh -= 1
+        if self._factor is None or self._ticks_to_refresh <= 0 or self._degenerate(self._factor):
+            self._refresh()
+        # при вырожденном окне коэффициенты не определены, прежние не должны оставаться в модели
+        self._model.set_coefficients(None if self._factor is None else dpotrs(self._factor, self._moment, lower=0)[0])
+
+    def push(self, *args: float) -> np.ndarray:
+        """
+        Добавление одной точки в окно. Аргументы те же, что и у fit модели, но скалярные:
+        для LinearRegressionModel - push(x, y).
+        :return: коэффициенты модели по текущему окну (пустой массив, пока их нельзя определить)
+        """
+        *arguments, target = args
+        u = self._model.design_matrix(*(np.reshape(a, -1) for a in arguments))[0]
+        self._push_row(u, float(target))
+        return self._model.coefficients
+
+    def update(self, *args: np.ndarray) -> np.ndarray:
+        """
+        Последовательное добавление набора точек (строки матрицы плана строятся сразу для всего набора).
+        :return: матрица коэффициентов после каждого шага размерности (n_points, d),
+                 строки, для которых коэффициенты ещё не определены, заполнены nan
+        """
+        *arguments, targets = (np.asarray(a, dtype=float) for a in args)
+        rows = self._model.design_matrix(*(a.reshape(-1) for a in arguments))
+        targets = targets.reshape(-1)
+        if rows.shape[0] != targets.size:
+            raise ValueError("Количество точек в аргументах и целевых значениях не совпадает")
+        history = np.full(rows.shape, np.nan)
+        for i in range(targets.size):
+            self._push_row(rows[i], targets[i])
+            if self._factor is not None:
+                history[i] = self._model.coefficients
+        return history
+
+
+def rolling_regression_example(window: int = 10000, n_points: int = 20000):
+    """
+    Функция проверки регрессии по скользящему окну:\n
+    1) Построить зашумлённую линию с меняющимся наклоном\n
+    2) Посчитать коэффициенты RollingRegression на каждом шаге\n
+    3) Сравнить с полным пересчётом linear_regression по каждому окну\n
+    :return:
+    """
+    print("\nrolling regression test:")
+    x = np.linspace(0.0, 10.0, n_points)
+    y = np.sin(x) * x + np.random.uniform(-0.05, 0.05, n_points)
+
+    t_0 = time.perf_counter()
+    rolling = RollingRegression(window).update(x, y)
+    t_1 = time.perf_counter()
+    full = np.array([Regression.linear_regression(x[max(i + 1 - window, 0): i + 1], y[max(i + 1 - window, 0): i + 1])
+                     for i in range(1, n_points)])
+    t_2 = time.perf_counter()
+
+    print(f"window: {window}, ticks: {n_points}")
+    print(f"rolling update : {t_1 - t_0:.4f} s")
+    print(f"full refits    : {t_2 - t_1:.4f} s")
+    print(f"max coefficients diff: {np.abs(rolling[1:] - full).max():.3e}")
+
+
 if __name__ == "__main__":
     Regression.distance_field_example()
     Regression.linear_reg_example()
@@ -538,4 +1660,9 @@ if __name__ == "__main__":
     #print(data)
     print("\nN-linear regression: ", Regression.n_linear_regression(data))
     Regression.poly_reg_example()
-    Regression.quadratic_reg_example()
\ No newline at end of file
+    Regression.poly_cv_example()
+    Regression.batch_poly_reg_example()
+    Regression.robust_reg_example()
+    Regression.quadratic_reg_example()
+    poly_model_example()
+    rolling_regression_example()
\ No newline at end of file
@@ -1,9 +1,13 @@
 from typing import Tuple, Callable, Union, List
 import json
-from scipy.stats import  logistic
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 import numpy as np
 import random
+import time
+import os
+from concurrent.futures import ThreadPoolExecutor
+from Linear_Regression import Regression
 
 """
 Пусть есть два события связаны соотношением:
@@ -39,139 +43,267 @@ Vector2Int = Tuple[int, int]
 Vector2 = Tuple[float, float]
 Section = Tuple[Vector2, Vector2]
 EmptyArray = np.ndarray([])
+SOLVERS = ('gd', 'newton', 'lbfgs')
+
+
+# отрезки линии уровня для каждого из 16 состояний ячейки: пары рёбер, на которых лежат концы отрезка
+# (0 - нижнее ребро a-b, 1 - правое b-c, 2 - верхнее d-c, 3 - левое a-d; -1 - отрезка нет).
+# Состояние - 4 бита: 8 * (a >= threshold) + 4 * (b >= threshold) + 2 * (c >= threshold) + (d >= threshold)
+MARCH_SQUARES_EDGES = np.array([[[-1, -1], [-1, -1]],
+                                [[2, 3], [-1, -1]],
+                                [[1, 2], [-1, -1]],
+                                [[1, 3], [-1, -1]],
+                                [[0, 1], [-1, -1]],
+                                [[0, 3], [1, 2]],
+                                [[0, 2], [-1, -1]],
+                                [[0, 3], [-1, -1]],
+                                [[0, 3], [-1, -1]],
+                                [[0, 2], [-1, -1]],
+                                [[0, 1], [2, 3]],
+                                [[0, 1], [-1, -1]],
+                                [[1, 3], [-1, -1]],
+                                [[1, 2], [-1, -1]],
+                                [[2, 3], [-1, -1]],
+                                [[-1, -1], [-1, -1]]], dtype=int)
+
+
+def _field_grid(field: Callable, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Значения поля в узлах сетки x, y (массивы одной формы) за один вызов field.
+    Если field не векторная (возвращает не массив той же формы), она вызывается поэлементно, но всё равно
+    ровно один раз на узел.
+    """
+    try:
+        values = np.asarray(field(x, y), dtype=float)
+    except (TypeError, ValueError):
+        values = None
+    if values is None or values.shape != x.shape:
+        values = np.vectorize(field, otypes=[float])(x, y)
+    return values
+
+
+def _edge_parameter(v_0: np.ndarray, v_1: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Параметр t в [0, 1] точки пересечения уровня threshold с ребром со значениями v_0, v_1 на концах
+    (для почти равных значений - середина ребра).
+    """
+    d_t = v_1 - v_0
+    degenerate = np.abs(d_t) < _accuracy
+    t_val = (threshold - v_0) / np.where(degenerate, 1.0, d_t)
+    t_val[degenerate] = 0.5
+    return t_val
 
 
 def march_squares_2d(field: Callable[[float, float], float],
                      min_bound: Vector2 = (-5.0, -5.0),
                      max_bound: Vector2 = (5.0, 5.0),
                      march_resolution: Vector2Int = (128, 128),
-                     threshold: float = 0.5) -> List[Section]:
+                     threshold: float = 0.5) -> np.ndarray:
     """
     Эта функция рисует неявнозаданную функцию вида f(x,y) = 0. Есть аналог в matplotlib
-    :param field:
+    Поле вычисляется один раз в каждом узле сетки (field вызывается с массивами координат узлов),
+    состояния ячеек и точки пересечения рёбер считаются сразу для всех ячеек.
+    :param field: векторная функция f(x, y) (например, PolynomialFeatures.decision_function)
     :param min_bound:
     :param max_bound:
-    :param march_resolution:
+    :param march_resolution: количество узлов сетки по x и по y
     :param threshold:
-    :return:
+    :return: массив отрезков размерности (n_sections, 2, 2): [отрезок, конец, (x, y)]
     """
-
-    def lin_interp(_a: float, _b: float, t) -> float:
-        return _a + (_b - _a) * t
-
     rows, cols = max(march_resolution[1], 3), max(march_resolution[0], 3)
-    cols_ = cols - 1
-    rows_ = cols - 1
-    dx = (max_bound[0] - min_bound[0]) / cols_
-    dy = (max_bound[1] - min_bound[1]) / rows_
-    row: float
-    col: float
-    state: int
-    p1: float
-    p2: float
-    p3: float
-    p4: float
-    t_val: float
-    d_t: float
-    shape: List[Section] = []
-    for i in range(cols_ * rows_):
-        state = 0
-        row = (i // cols_) * dy + min_bound[1]
-        col = (i % cols_) * dx + min_bound[0]
-
-        a_val = field(col, row)
-        b_val = field(col + dx, row)
-        c_val = field(col + dx, row + dy)
-        d_val = field(col, row + dy)
-
-        state += 8 if a_val >= threshold else 0
-        state += 4 if b_val >= threshold else 0
-        state += 2 if c_val >= threshold else 0
-        state += 1 if d_val >= threshold else 0
-
-        if state == 0 or state == 15:
-            continue
-        # без интерполяции
-        # a = (col + dx * 0.5, row           )
-        # b = (col + dx,       row + dy * 0.5)
-        # c = (col + dx * 0.5, row + dy      )
-        # d = (col,            row + dy * 0.5)
-
-        d_t = b_val - a_val
-        if np.abs(d_t) < _accuracy:
-            a = (lin_interp(col, col + dx, np.sign(threshold - a_val)), row)
-        else:
-            t_val = (threshold - a_val) / d_t
-            a = (lin_interp(col, col + dx, t_val), row)
+    x_nodes = np.linspace(min_bound[0], max_bound[0], cols)
+    y_nodes = np.linspace(min_bound[1], max_bound[1], rows)
+    values = _field_grid(field, *np.meshgrid(x_nodes, y_nodes))
+    return _march_cells(values, x_nodes, y_nodes, threshold)
 
-        d_t = c_val - b_val
-        if np.abs(d_t) < _accuracy:
-            b = (col + dx, lin_interp(row, row + dy, np.sign(threshold - b_val)))
-        else:
-            t_val = (threshold - b_val) / d_t
-            b = (col + dx, lin_interp(row, row + dy, t_val))
 
-        d_t = c_val - d_val
-        if np.abs(d_t) < _accuracy:
-            c = (lin_interp(col, col + dx, np.sign(threshold - d_val)), row + dy)
-        else:
-            t_val = (threshold - d_val) / d_t
-            c = (lin_interp(col, col + dx, t_val), row + dy)
+def _cell_states(a_val: np.ndarray, b_val: np.ndarray, c_val: np.ndarray, d_val: np.ndarray,
+                 threshold: float) -> np.ndarray:
+    """
+    Состояния ячеек по значениям в углах: a - (x_0, y_0), b - (x_1, y_0), c - (x_1, y_1), d - (x_0, y_1)
+    """
+    state = (a_val >= threshold).astype(np.uint8) << 3
+    state |= (b_val >= threshold).astype(np.uint8) << 2
+    state |= (c_val >= threshold).astype(np.uint8) << 1
+    state |= (d_val >= threshold).astype(np.uint8)
+    return state
 
-        d_t = d_val - a_val
-        if np.abs(d_t) < _accuracy:
-            d = (col, lin_interp(row, row + dy, np.sign(threshold - a_val)))
-        else:
-            t_val = (threshold - a_val) / d_t
-            d = (col, lin_interp(row, row + dy, t_val))
 
-        while True:
-            if state == 1:
-                shape.append((c, d))
-                break
-            if state == 2:
-                shape.append((b, c))
-                break
-            if state == 3:
-                shape.append((b, d))
-                break
-            if state == 4:
-                shape.append((a, b))
-                break
-            if state == 5:
-                shape.append((a, d))
-                shape.append((b, c))
-                break
-            if state == 6:
-                shape.append((a, c))
-                break
-            if state == 7:
-                shape.append((a, d))
-                break
-            if state == 8:
-                shape.append((a, d))
-                break
-            if state == 9:
-                shape.append((a, c))
-                break
-            if state == 10:
-                shape.append((a, b))
-                shape.append((c, d))
-                break
-            if state == 11:
-                shape.append((a, b))
-                break
-            if state == 12:
-                shape.append((b, d))
-                break
-            if state == 13:
-                shape.append((b, c))
-                break
-            if state == 14:
-                shape.append((c, d))
-                break
+def _cell_sections(state: np.ndarray, a_val: np.ndarray, b_val: np.ndarray, c_val: np.ndarray, d_val: np.ndarray,
+                   x_0: np.ndarray, x_1: np.ndarray, y_0: np.ndarray, y_1: np.ndarray,
+                   threshold: float) -> np.ndarray:
+    """
+    Отрезки линии уровня threshold в ячейках [x_0, x_1] x [y_0, y_1] с состояниями state
+    и значениями a_val, b_val, c_val, d_val в углах (все массивы одномерные, по одному элементу на ячейку).
+    """
+    # точки пересечения на четырёх рёбрах каждой ячейки: [ячейка, ребро, (x, y)]
+    points = np.empty((state.size, 4, 2))
+    points[:, 0, 0] = x_0 + (x_1 - x_0) * _edge_parameter(a_val, b_val, threshold)
+    points[:, 0, 1] = y_0
+    points[:, 1, 0] = x_1
+    points[:, 1, 1] = y_0 + (y_1 - y_0) * _edge_parameter(b_val, c_val, threshold)
+    points[:, 2, 0] = x_0 + (x_1 - x_0) * _edge_parameter(d_val, c_val, threshold)
+    points[:, 2, 1] = y_1
+    points[:, 3, 0] = x_0
+    points[:, 3, 1] = y_0 + (y_1 - y_0) * _edge_parameter(a_val, d_val, threshold)
+
+    # до двух отрезков на ячейку по таблице рёбер; порядок отрезков - порядок ячеек
+    edges = MARCH_SQUARES_EDGES[state]
+    cells, slots = np.nonzero(edges[:, :, 0] >= 0)
+    edges = edges[cells, slots]
+    return np.stack((points[cells, edges[:, 0]], points[cells, edges[:, 1]]), axis=1)
+
+
+def _march_cells(values: np.ndarray, x_nodes: np.ndarray, y_nodes: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Отрезки линии уровня threshold для всех ячеек сетки со значениями values[row, col] в узлах
+    (x_nodes[col], y_nodes[row]).
+    """
+    # углы ячеек: a - (col, row), b - (col + 1, row), c - (col + 1, row + 1), d - (col, row + 1)
+    a_val, b_val = values[:-1, :-1], values[:-1, 1:]
+    c_val, d_val = values[1:, 1:], values[1:, :-1]
+    state = _cell_states(a_val, b_val, c_val, d_val, threshold)
+    rows, cols = np.nonzero((state != 0) & (state != 15))
+    return _cell_sections(state[rows, cols], a_val[rows, cols], b_val[rows, cols], c_val[rows, cols],
+                          d_val[rows, cols], x_nodes[cols], x_nodes[cols + 1], y_nodes[rows], y_nodes[rows + 1],
+                          threshold)
+
+
+def march_squares_2d_adaptive(field: Callable[[float, float], float],
+                              min_bound: Vector2 = (-5.0, -5.0),
+                              max_bound: Vector2 = (5.0, 5.0),
+                              march_resolution: Vector2Int = (16, 16),
+                              depth: int = 4,
+                              threshold: float = 0.5) -> np.ndarray:
+    """
+    Адаптивный вариант march_squares_2d (квадродерево): поле считается на грубой сетке march_resolution,
+    затем depth раз каждая ячейка, которую пересекает линия уровня, делится на четыре. Значения поля
+    в узлах хранятся в кэше (узлы, общие для соседних ячеек, вычисляются один раз), field вызывается
+    один раз на уровень с массивами координат только новых узлов.
+    Результат совпадает с march_squares_2d на равномерной сетке ((cols - 1) * 2^depth + 1) x ((rows - 1) * 2^depth + 1),
+    если каждый участок линии уровня пересекает хотя бы одну ячейку грубой сетки (мелкие замкнутые участки
+    внутри одной грубой ячейки могут быть пропущены).
+    :param field: векторная функция f(x, y)
+    :param min_bound:
+    :param max_bound:
+    :param march_resolution: количество узлов грубой сетки по x и по y
+    :param depth: количество делений ячеек
+    :param threshold:
+    :return: массив отрезков размерности (n_sections, 2, 2): [отрезок, конец, (x, y)]
+    """
+    rows, cols = max(march_resolution[1], 3), max(march_resolution[0], 3)
+    scale = 1 << depth
+    # узлы задаются целыми координатами на самой мелкой сетке, ключ узла - его номер на этой сетке
+    n_x, n_y = (cols - 1) * scale + 1, (rows - 1) * scale + 1
+    dx = (max_bound[0] - min_bound[0]) / (n_x - 1)
+    dy = (max_bound[1] - min_bound[1]) / (n_y - 1)
+
+    node_x, node_y = np.meshgrid(np.arange(cols) * scale, np.arange(rows) * scale)
+    cache_keys = (node_y * n_x + node_x).ravel()
+    cache_values = _field_grid(field, node_x * dx + min_bound[0], node_y * dy + min_bound[1]).ravel()
+
+    def lookup(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        return cache_values[np.searchsorted(cache_keys, y * n_x + x)]
+
+    # ячейки задаются левым нижним углом и размером
+    cell_x, cell_y = node_x[:-1, :-1].ravel(), node_y[:-1, :-1].ravel()
+    size = scale
+    while True:
+        a_val, b_val = lookup(cell_x, cell_y), lookup(cell_x + size, cell_y)
+        c_val, d_val = lookup(cell_x + size, cell_y + size), lookup(cell_x, cell_y + size)
+        state = _cell_states(a_val, b_val, c_val, d_val, threshold)
+        active = (state != 0) & (state != 15)
+        cell_x, cell_y = cell_x[active], cell_y[active]
+        if size == 1 or cell_x.size == 0:
             break
-    return shape
+        half = size // 2
+        # новые узлы: середины рёбер и центры делимых ячеек
+        keys = np.concatenate(((cell_y * n_x + cell_x + half),
+                               (cell_y + half) * n_x + cell_x,
+                               (cell_y + half) * n_x + cell_x + half,
+                               (cell_y + half) * n_x + cell_x + size,
+                               (cell_y + size) * n_x + cell_x + half))
+        keys = np.unique(keys)
+        position = np.minimum(np.searchsorted(cache_keys, keys), cache_keys.size - 1)
+        keys = keys[cache_keys[position] != keys]
+        values = _field_grid(field, (keys % n_x) * dx + min_bound[0], (keys // n_x) * dy + min_bound[1])
+        cache_keys = np.concatenate((cache_keys, keys))
+        cache_values = np.concatenate((cache_values, values))
+        order = np.argsort(cache_keys, kind='stable')
+        cache_keys, cache_values = cache_keys[order], cache_values[order]
+        # четыре дочерние ячейки
+        cell_x = np.concatenate((cell_x, cell_x + half, cell_x, cell_x + half))
+        cell_y = np.concatenate((cell_y, cell_y, cell_y + half, cell_y + half))
+        size = half
+
+    if cell_x.size == 0:
+        return np.empty((0, 2, 2))
+    return _cell_sections(state[active], a_val[active], b_val[active], c_val[active], d_val[active],
+                          cell_x * dx + min_bound[0], (cell_x + 1) * dx + min_bound[0],
+                          cell_y * dy + min_bound[1], (cell_y + 1) * dy + min_bound[1], threshold)
+
+
+def stitch_sections(sections: np.ndarray, tolerance: Union[float, None] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Сшивает отрезки (результат march_squares_2d) в ломаные за линейное время.
+    Концы отрезков округляются до сетки с шагом tolerance, одинаковые после округления концы считаются
+    одной вершиной (поиск по хэш-таблице). Незамкнутые ломаные начинаются в вершинах, к которым
+    примыкает один отрезок; у замкнутых последняя вершина совпадает с первой.
+    :param sections: массив отрезков размерности (n_sections, 2, 2) или список пар точек
+    :param tolerance: шаг округления координат (по умолчанию 1e-9 от размера области)
+    :return: пара (vertices, offsets): вершины всех ломаных подряд, размерность (n_vertices, 2),
+             и границы ломаных: ломаная i - vertices[offsets[i]: offsets[i + 1]]
+    """
+    sections = np.asarray(sections, dtype=float).reshape(-1, 2, 2)
+    if sections.shape[0] == 0:
+        return np.empty((0, 2)), np.zeros(1, dtype=int)
+    # концы отрезков: концы отрезка k - 2 * k и 2 * k + 1
+    endpoints = sections.reshape(-1, 2)
+    if tolerance is None:
+        tolerance = max(float(np.ptp(endpoints, axis=0).max()), 1.0) * 1e-9
+    quantized = np.round(endpoints / tolerance).astype(np.int64)
+    node_ids = {}
+    nodes = [node_ids.setdefault(key, len(node_ids)) for key in zip(quantized[:, 0].tolist(),
+                                                                    quantized[:, 1].tolist())]
+    # отрезки нулевой длины (линия уровня проходит через узел сетки) отбрасываются
+    visited = [nodes[2 * k] == nodes[2 * k + 1] for k in range(sections.shape[0])]
+    # концы отрезков, примыкающие к каждой вершине (не больше двух)
+    incident = [[] for _ in range(len(node_ids))]
+    for endpoint, node in enumerate(nodes):
+        if not visited[endpoint >> 1]:
+            incident[node].append(endpoint)
+
+    indices: List[int] = []
+    offsets = [0]
+
+    def walk(endpoint: int) -> None:
+        indices.append(endpoint)
+        while not visited[endpoint >> 1]:
+            visited[endpoint >> 1] = True
+            endpoint ^= 1
+            indices.append(endpoint)
+            joined = incident[nodes[endpoint]]
+            if len(joined) != 2:
+                break
+            endpoint = joined[1] if joined[0] == endpoint else joined[0]
+        offsets.append(len(indices))
+
+    for joined in incident:
+        if len(joined) == 1 and not visited[joined[0] >> 1]:
+            walk(joined[0])
+    for segment in range(sections.shape[0]):
+        if not visited[segment]:
+            walk(2 * segment)
+    return endpoints[indices], np.array(offsets, dtype=int)
+
+
+def draw_polylines(vertices: np.ndarray, offsets: np.ndarray, color: str = 'k') -> None:
+    """
+    Рисует все ломаные (результат stitch_sections) одним объектом LineCollection
+    """
+    polylines = np.split(vertices, offsets[1:-1])
+    plt.gca().add_collection(LineCollection(polylines, colors=color))
+    plt.gca().autoscale_view()
 
 
 def rand_in_range(rand_range: Union[float, Tuple[float, float]] = 1.0) -> float:
@@ -182,6 +314,12 @@ def rand_in_range(rand_range: Union[float, Tuple[float, float]] = 1.0) -> float:
     return random.uniform(-0.5, 0.5)
 
 
+# генераторы случайных чисел и тестовых данных общие с Linear_Regression
+make_rng = Regression.make_rng
+rand_array_in_range = Regression.rand_array_in_range
+test_data_chunks = Regression.test_data_chunks
+
+
 def ellipsoid(x: float, y: float, params: Tuple[float, float, float, float, float]) -> float:
     """
     уравнение эллипсойда
@@ -195,13 +333,15 @@ def ellipsoid(x: float, y: float, params: Tuple[float, float, float, float, floa
 
 def log_reg_ellipsoid_test_data(params: Tuple[float, float, float, float, float],
                                 arg_range: float = 5.0, rand_range: float = 1.0,
-                                n_points: int = 3000) -> Tuple[np.ndarray, np.ndarray]:
+                                n_points: int = 3000,
+                                rng: Union[int, np.random.Generator, None] = None) -> Tuple[np.ndarray, np.ndarray]:
     """
     Генератор тестовых данных для логистической регрессии. что бы понять что тут просходит, просто  _debug_mode = True
     :param params:
     :param arg_range:
     :param rand_range:
     :param n_points:
+    :param rng: зерно или генератор случайных чисел
     :return:
     """
     if _debug_mode:
@@ -209,19 +349,19 @@ def log_reg_ellipsoid_test_data(params: Tuple[float, float, float, float, float]
               f" {params[3]:1.3}x^2 + {params[4]:1.3}y^2 - 1,\n"
               f" arg_range =  [{-arg_range * 0.5:1.3}, {arg_range * 0.5:1.3}],\n"
               f" rand_range = [{-rand_range * 0.5:1.3}, {rand_range * 0.5:1.3}]")
-    features = np.zeros((n_points, 5), dtype=float)
-    features[:, 0] = np.array([rand_in_range(arg_range) for _ in range(n_points)])
-    features[:, 1] = np.array([rand_in_range(arg_range) for _ in range(n_points)])
-    features[:, 2] = features[:, 0] * features[:, 1]
-    features[:, 3] = features[:, 0] * features[:, 0]
-    features[:, 4] = features[:, 1] * features[:, 1]
-    groups = np.array(
-        [np.sign(ellipsoid(features[i, 0], features[i, 1], params)) * 0.5 + 0.5 for i in range(n_points)])
+    rng = make_rng(rng)
+    features = np.empty((n_points, 5), dtype=float)
+    features[:, :2] = rand_array_in_range(arg_range, (n_points, 2), rng)
+    np.multiply(features[:, 0], features[:, 1], out=features[:, 2])
+    np.multiply(features[:, 0], features[:, 0], out=features[:, 3])
+    np.multiply(features[:, 1], features[:, 1], out=features[:, 4])
+    groups = np.sign(ellipsoid(features[:, 0], features[:, 1], params)) * 0.5 + 0.5
     return features, groups
 
 
 def log_reg_test_data(k: float = -1.5, b: float = 0.1, arg_range: float = 1.0,
-                      rand_range: float = 0.0, n_points: int = 3000) -> Tuple[np.ndarray, np.ndarray]:
+                      rand_range: float = 0.0, n_points: int = 3000,
+                      rng: Union[int, np.random.Generator, None] = None) -> Tuple[np.ndarray, np.ndarray]:
     """
     Генератор тестовых данных для логистической регрессии. что бы понять что тут просходит, просто  _debug_mode = True
     :param k:
@@ -229,29 +369,39 @@ def log_reg_test_data(k: float = -1.5, b: float = 0.1, arg_range: float = 1.0,
     :param arg_range:
     :param rand_range:
     :param n_points:
+    :param rng: зерно или генератор случайных чисел
     :return:
     """
     if _debug_mode:
         print(f"logistic regression test data b = {b:1.3}, k = {k:1.3},\n"
               f" arg_range = [{-arg_range * 0.5:1.3}, {arg_range * 0.5:1.3}],\n"
               f" rand_range = [{-rand_range * 0.5:1.3}, {rand_range * 0.5:1.3}]")
-    features = np.zeros((n_points, 2), dtype=float)
-    features[:, 0] = np.array([rand_in_range(arg_range) for _ in range(n_points)])
-    features[:, 1] = np.array([rand_in_range(arg_range) for _ in range(n_points)])
-    groups = np.array(
-        [1 if features[i, 0] * k + b > features[i, 1] + rand_in_range(rand_range) else 0.0 for i in range(n_points)])
+    rng = make_rng(rng)
+    features = rand_array_in_range(arg_range, (n_points, 2), rng)
+    threshold = rand_array_in_range(rand_range, n_points, rng)
+    threshold += features[:, 1]
+    groups = (features[:, 0] * k + b > threshold).astype(float)
     return features, groups
 
 
-def sigmoid(x: np.ndarray) -> np.ndarray:
+def sigmoid(x: Union[np.ndarray, float], out: Union[np.ndarray, None] = None) -> Union[np.ndarray, float]:
     """
     Вычисляет сигмоид-функцию для входного массива x.
+    Устойчивая форма без переполнения exp: f(x) = exp{-log(1 + exp{-x})}, log(1 + exp{-x}) считает np.logaddexp;
+    все шаги выполняются в одном буфере результата.
 
-    :param x: Входной массив
-    :return: Результат сигмоид-функции для каждого элемента x
+    :param x: Входной массив или число
+    :param out: Массив для записи результата (может совпадать с x); используется, только если это ndarray
+    :return: Результат сигмоид-функции для каждого элемента x (для скалярного x - число)
     """
-    return logistic.cdf(x)
-    #return 1.0 / (1.0 + np.exp(-x))
+    x = np.asarray(x, dtype=float)
+    if not isinstance(out, np.ndarray):
+        out = np.empty(x.shape)
+    np.negative(x, out=out)
+    np.logaddexp(0.0, out, out=out)
+    np.negative(out, out=out)
+    np.exp(out, out=out)
+    return out if out.ndim else out[()]
 
 
 def loss(groups_probs, groups):
@@ -262,7 +412,153 @@ def loss(groups_probs, groups):
     :return: Значение функции потерь
     """
     epsilon = 1e-15
-    return -(groups * np.log(groups_probs + epsilon) - (1.0 - groups) * np.log(1.0 - groups_probs)).mean()
+    return -(groups * np.log(groups_probs + epsilon) + (1.0 - groups) * np.log(1.0 - groups_probs + epsilon)).mean()
+
+
+def _fused_log_loss(logits: np.ndarray, groups: np.ndarray,
+                    probs: Union[np.ndarray, None] = None,
+                    residual: Union[np.ndarray, None] = None) -> Tuple[float, np.ndarray, np.ndarray]:
+    """
+    Бинарная кросс-энтропия, вероятности и невязка p - y за один проход по логитам z без переполнения:
+    e = exp{-|z|}, ln(1 + exp{z}) = max(z, 0) + ln(1 + e), Σ max(z, 0) = (Σ z + Σ |z|) / 2,
+    p = f(z) = 1 / (1 + e) при z >= 0 и e / (1 + e) при z < 0.
+    Использует два рабочих массива длины n (probs и residual), которые можно передать повторно.
+    :return: тройка (L, p, p - y)
+    """
+    residual = np.abs(logits, out=residual)
+    abs_sum = residual.sum()
+    np.negative(residual, out=residual)
+    np.exp(residual, out=residual)
+    probs = np.add(residual, 1.0, out=probs)
+    np.divide(1.0, probs, out=probs)
+    np.multiply(probs, residual, out=probs, where=logits < 0.0)
+    np.log1p(residual, out=residual)
+    loss_value = (residual.sum() + 0.5 * (logits.sum() + abs_sum) - np.dot(groups, logits)) / groups.size
+    np.subtract(probs, groups, out=residual)
+    return float(loss_value), probs, residual
+
+
+def _log_loss(logits: np.ndarray, groups: np.ndarray) -> float:
+    """
+    Средняя бинарная кросс-энтропия по логитам z = (X, T):
+    -(y * ln(f(z)) + (1 - y) * ln(1 - f(z))) = ln(1 + exp{z}) - y * z
+    :param logits: значения z
+    :param groups: фактические метки классов (1 или 0)
+    :return: значение функции потерь
+    """
+    return float(np.mean(np.logaddexp(0.0, logits) - groups * logits))
+
+
+def _logits(features: np.ndarray, thetas: np.ndarray) -> np.ndarray:
+    """
+    z = b + (X, T) без добавления к признакам столбца единиц (thetas[0] - смещение b)
+    """
+    logits = np.dot(features, thetas[1:])
+    logits += thetas[0]
+    return logits
+
+
+def _bias_transpose_dot(features: np.ndarray, vector: np.ndarray) -> np.ndarray:
+    """
+    [1 | X]^T * v без построения матрицы [1 | X]
+    """
+    result = np.empty(features.shape[1] + 1)
+    result[0] = vector.sum()
+    result[1:] = np.dot(features.T, vector)
+    return result
+
+
+def _loss_gradient(features: np.ndarray, groups: np.ndarray,
+                   thetas: np.ndarray) -> Tuple[float, np.ndarray, np.ndarray]:
+    """
+    Функция потерь, её градиент и вероятности за один проход по данным:
+    L = mean(ln(1 + exp{z}) - y * z), grad = [1 | X]^T * (p - y) / n, z = b + (X, T), p = f(z)
+    :return: тройка (L, grad, p)
+    """
+    logits = _logits(features, thetas)
+    loss_value, probs, residual = _fused_log_loss(logits, groups)
+    return loss_value, _bias_transpose_dot(features, residual) / groups.size, probs
+
+
+def _log_sum_exp(logits: np.ndarray) -> np.ndarray:
+    """
+    ln(Σ_k exp{z_k}) по строкам без переполнения: m + ln(Σ_k exp{z_k - m}), m = max_k z_k
+    """
+    maximum = logits.max(axis=1)
+    return maximum + np.log(np.exp(logits - maximum[:, None]).sum(axis=1))
+
+
+def _softmax_loss_gradient(features: np.ndarray, groups: np.ndarray,
+                           thetas: np.ndarray) -> Tuple[float, np.ndarray, np.ndarray]:
+    """
+    Функция потерь softmax-регрессии, её градиент и вероятности за один проход по данным:
+    L = mean(ln(Σ_k exp{z_k}) - z_y), grad = [1 | X]^T * (P - Y) / n, Z = b + X * T,
+    где Y - прямое кодирование индексов классов groups (не строится явно).
+    :return: тройка (L, grad, P)
+    """
+    logits = _logits(features, thetas)
+    rows = np.arange(groups.size)
+    logits -= logits.max(axis=1)[:, None]
+    probs = np.exp(logits)
+    sums = probs.sum(axis=1)
+    loss_value = float(np.mean(np.log(sums) - logits[rows, groups]))
+    probs /= sums[:, None]
+    residual = probs.copy()
+    residual[rows, groups] -= 1.0
+    gradient = np.empty_like(thetas)
+    gradient[0] = residual.sum(axis=0)
+    gradient[1:] = np.dot(features.T, residual)
+    return loss_value, gradient / groups.size, probs
+
+
+def _ovr_log_loss(logits: np.ndarray, groups: np.ndarray) -> float:
+    """
+    Сумма средних бинарных кросс-энтропий K моделей "класс k против остальных":
+    L = Σ_k mean(ln(1 + exp{z_k}) - y_k * z_k), y_k = 1 только для groups == k
+    """
+    return float((np.logaddexp(0.0, logits).sum() - logits[np.arange(groups.size), groups].sum()) / groups.size)
+
+
+def _ovr_loss_gradient(features: np.ndarray, groups: np.ndarray,
+                       thetas: np.ndarray) -> Tuple[float, np.ndarray, np.ndarray]:
+    """
+    Функция потерь one-vs-rest (_ovr_log_loss), её градиент и вероятности за один проход по данным:
+    grad = [1 | X]^T * (P - Y) / n, P = f(Z) поэлементно. Столбец k градиента совпадает с градиентом
+    бинарной модели "класс k против остальных", поэтому шаг по нему - шаг K независимых моделей.
+    :return: тройка (L, grad, P)
+    """
+    logits = _logits(features, thetas)
+    rows = np.arange(groups.size)
+    loss_value = _ovr_log_loss(logits, groups)
+    probs = sigmoid(logits)
+    residual = probs.copy()
+    residual[rows, groups] -= 1.0
+    gradient = np.empty_like(thetas)
+    gradient[0] = residual.sum(axis=0)
+    gradient[1:] = np.dot(features.T, residual)
+    return loss_value, gradient / groups.size, probs
+
+
+def _hessian_vector(features: np.ndarray, probs: np.ndarray, vector: np.ndarray) -> np.ndarray:
+    """
+    Произведение матрицы Гессе функции потерь на вектор без построения самой матрицы:
+    H * v = [1 | X]^T * (p * (1 - p) * ([1 | X] * v)) / n
+    """
+    return _bias_transpose_dot(features, probs * (1.0 - probs) * _logits(features, vector)) / probs.size
+
+
+def _hessian(features: np.ndarray, probs: np.ndarray) -> np.ndarray:
+    """
+    Матрица Гессе функции потерь H = [1 | X]^T * diag(p * (1 - p)) * [1 | X] / n
+    (то же, что _hessian_vector, применённое ко всем базисным векторам сразу)
+    """
+    weights = probs * (1.0 - probs)
+    n_features = features.shape[1]
+    hessian = np.empty((n_features + 1, n_features + 1))
+    hessian[0, 0] = weights.sum()
+    hessian[0, 1:] = hessian[1:, 0] = np.dot(weights, features)
+    hessian[1:, 1:] = np.dot(features.T * weights, features)
+    return hessian / probs.size
 
 
 def draw_logistic_data(features: np.ndarray, groups: np.ndarray, theta: np.ndarray = None) -> None:
@@ -302,9 +598,144 @@ def draw_logistic_data(features: np.ndarray, groups: np.ndarray, theta: np.ndarr
     plt.show()
 
 
+class PolynomialFeatures:
+    """
+    Расширение признаков (x_0, ..., x_{m-1}) всеми одночленами x_0^{k_0} * ... * x_{m-1}^{k_{m-1}}
+    степени от 1 до degree (одночлен степени 0 не нужен - его роль играет смещение thetas[0]).
+    Одночлены упорядочены по степени; каждый одночлен степени > 1 - произведение одного из предыдущих
+    одночленов и одного исходного признака, поэтому каждый столбец считается одним умножением.
+    Для степени 2 и двух признаков: x, y, x^2, xy, y^2.
+    Расширенная матрица целиком не строится: признаки расширяются блоками по chunk_size строк.
+    """
+
+    def __init__(self, degree: int = 2, n_features: int = 2):
+        if not isinstance(degree, int) or degree < 1:
+            raise ValueError("degree должно быть целым числом большим или равным 1")
+        if not isinstance(n_features, int) or n_features < 1:
+            raise ValueError("n_features должно быть целым числом большим или равным 1")
+        # максимальная степень одночленов
+        self._degree: int = degree
+        # количество исходных признаков
+        self._n_features: int = n_features
+        # степени исходных признаков в каждом одночлене, размерность (n_output_features, n_features)
+        self._exponents: np.ndarray
+        # одночлен k = одночлен _parents[k] * x[_variables[k]] (для первых n_features одночленов _parents = -1)
+        self._parents: np.ndarray
+        self._variables: np.ndarray
+        self._build()
+
+    def _build(self) -> None:
+        exponents = [tuple(int(i == j) for i in range(self._n_features)) for j in range(self._n_features)]
+        parents = [-1] * self._n_features
+        variables = list(range(self._n_features))
+        # последний признак, входящий в одночлен: множители добавляются в неубывающем порядке,
+        # поэтому каждый одночлен получается ровно один раз
+        last_variables = list(range(self._n_features))
+        start = 0
+        for _ in range(2, self._degree + 1):
+            stop = len(exponents)
+            for parent in range(start, stop):
+                for variable in range(last_variables[parent], self._n_features):
+                    monomial = list(exponents[parent])
+                    monomial[variable] += 1
+                    exponents.append(tuple(monomial))
+                    parents.append(parent)
+                    variables.append(variable)
+                    last_variables.append(variable)
+            start = stop
+        self._exponents = np.array(exponents, dtype=int)
+        self._parents = np.array(parents, dtype=int)
+        self._variables = np.array(variables, dtype=int)
+
+    @property
+    def degree(self) -> int:
+        return self._degree
+
+    @property
+    def n_features(self) -> int:
+        return self._n_features
+
+    @property
+    def n_output_features(self) -> int:
+        return self._parents.size
+
+    @property
+    def exponents(self) -> np.ndarray:
+        return self._exponents
+
+    def __str__(self):
+        names = []
+        for monomial in self._exponents:
+            names.append("*".join(f"x{i}" if k == 1 else f"x{i}^{k}" for i, k in enumerate(monomial) if k != 0))
+        return ", ".join(names)
+
+    def transform(self, features: np.ndarray, out: Union[np.ndarray, None] = None) -> np.ndarray:
+        """
+        Расширение блока признаков.
+        :param features: исходные признаки, записанные в виде столбцов, размерность (n, n_features)
+        :param out: массив размерности (n, n_output_features) для результата (лучше в порядке 'F',
+                    тогда каждый столбец непрерывен в памяти)
+        :return: расширенные признаки
+        """
+        n_samples, n_features = features.shape
+        assert n_features == self._n_features
+        if out is None:
+            out = np.empty((n_samples, self.n_output_features), order='F')
+        out[:, :n_features] = features
+        for k in range(n_features, self.n_output_features):
+            np.multiply(out[:, self._parents[k]], features[:, self._variables[k]], out=out[:, k])
+        return out
+
+    def chunks(self, features: np.ndarray, chunk_size: int = 65536):
+        """
+        Итератор по расширенным блокам признаков. Все блоки пишутся в один буфер, поэтому каждый блок
+        действителен только до получения следующего.
+        """
+        buffer = np.empty((min(chunk_size, features.shape[0]), self.n_output_features), order='F')
+        for start in range(0, features.shape[0], chunk_size):
+            block = features[start: start + chunk_size]
+            yield self.transform(block, buffer[:block.shape[0]])
+
+    def stream(self, features: np.ndarray, groups: np.ndarray, chunk_size: int = 65536):
+        """
+        Источник данных для LogisticRegression.train_stream: блоки (расширенные признаки, метки).
+        :param features: исходные признаки (например, np.memmap)
+        :param groups: метки групп
+        :param chunk_size: количество строк в блоке
+        :return: функция без аргументов, возвращающая итератор по парам (features, groups)
+        """
+        def source():
+            for start, block in zip(range(0, features.shape[0], chunk_size), self.chunks(features, chunk_size)):
+                yield block, groups[start: start + chunk_size]
+        return source
+
+    def decision_function(self, thetas: np.ndarray, chunk_size: int = 65536) -> Callable:
+        """
+        Решающая функция модели, обученной на расширенных признаках: z = b + (P(X), T),
+        где P(X) - одночлены исходных признаков. Функция векторная: аргументы - координаты исходных признаков
+        (числа или массивы одной формы), результат - число или массив той же формы.
+        Подходит как field для march_squares_2d: граница классов - линия уровня z = 0.
+        """
+        assert thetas.size == self.n_output_features + 1
+
+        def field(*coordinates):
+            coordinates = np.broadcast_arrays(*(np.asarray(c, dtype=float) for c in coordinates))
+            shape = coordinates[0].shape
+            features = np.stack([c.ravel() for c in coordinates], axis=1)
+            result = np.empty(features.shape[0])
+            for start, block in zip(range(0, features.shape[0], chunk_size), self.chunks(features, chunk_size)):
+                result[start: start + block.shape[0]] = _logits(block, thetas)
+            return float(result[0]) if shape == () else result.reshape(shape)
+        return field
+
+
 class LogisticRegression:
+    _NEWTON_DIRECT_MAX_FEATURES = 64
+
     def __init__(self, learning_rate: float = 1.0,
-                 max_iters: int = 1000, accuracy: float = 1e-2):
+                 max_iters: int = 1000, accuracy: float = 1e-2,
+                 batch_size: Union[int, None] = None, loss_eval_interval: int = 10,
+                 early_stop_patience: int = 5, early_stop_tolerance: float = 1e-4, solver: str = 'gd'):
         # максимальное количество шагов градиентным спуском
         self._max_train_iters: int = 0
         # длина шага вдоль направления градиента
@@ -317,10 +748,30 @@ class LogisticRegression:
         self._thetas: Union[np.ndarray, None] = None
         # текущее знаение функции потерь
         self._losses: float = 0.0
+        # размер пакета (None - весь набор данных за шаг, 1 - стохастический спуск)
+        self._batch_size: Union[int, None] = None
+        # через сколько эпох считается функция потерь
+        self._loss_eval_interval: int = 1
+        # сколько вычислений функции потерь подряд без улучшения допускается до остановки
+        self._early_stop_patience: int = 1
+        # относительное улучшение функции потерь, которое считается улучшением
+        self._early_stop_tolerance: float = 0.0
+        # значения функции потерь при каждом вычислении
+        self._loss_history: List[float] = []
+        # метод обучения: 'gd' - градиентный спуск, 'newton' - метод Ньютона (IRLS), 'lbfgs' - L-BFGS
+        self._solver: str = 'gd'
+        # лучшее значение функции потерь и количество вычислений без улучшения (для ранней остановки)
+        self._best_loss: float = np.inf
+        self._stalled: int = 0
 
         self.max_train_iters = max_iters
         self.learning_rate = learning_rate
         self.learning_accuracy = accuracy
+        self.batch_size = batch_size
+        self.loss_eval_interval = loss_eval_interval
+        self.early_stop_patience = early_stop_patience
+        self.early_stop_tolerance = early_stop_tolerance
+        self.solver = solver
 
     def __str__(self):
         """
@@ -390,6 +841,65 @@ class LogisticRegression:
         if isinstance(value, (float, int)) and 0.01 <= value <= 1.0:
             self._learning_accuracy = float(value)
 
+    @property
+    def batch_size(self) -> Union[int, None]:
+        return self._batch_size
+
+    @batch_size.setter
+    def batch_size(self, value: Union[int, None]) -> None:
+        if value is None or (isinstance(value, int) and value >= 1):
+            self._batch_size = value
+        else:
+            raise ValueError("batch_size должно быть None или целым числом большим или равным 1")
+
+    @property
+    def loss_eval_interval(self) -> int:
+        return self._loss_eval_interval
+
+    @loss_eval_interval.setter
+    def loss_eval_interval(self, value: int) -> None:
+        if isinstance(value, int) and value >= 1:
+            self._loss_eval_interval = value
+        else:
+            raise ValueError("loss_eval_interval должно быть целым числом большим или равным 1")
+
+    @property
+    def early_stop_patience(self) -> int:
+        return self._early_stop_patience
+
+    @early_stop_patience.setter
+    def early_stop_patience(self, value: int) -> None:
+        if isinstance(value, int) and value >= 1:
+            self._early_stop_patience = value
+        else:
+            raise ValueError("early_stop_patience должно быть целым числом большим или равным 1")
+
+    @property
+    def early_stop_tolerance(self) -> float:
+        return self._early_stop_tolerance
+
+    @early_stop_tolerance.setter
+    def early_stop_tolerance(self, value: float) -> None:
+        if isinstance(value, (float, int)) and value >= 0.0:
+            self._early_stop_tolerance = float(value)
+        else:
+            raise ValueError("early_stop_tolerance должно быть неотрицательным числом")
+
+    @property
+    def solver(self) -> str:
+        return self._solver
+
+    @solver.setter
+    def solver(self, value: str) -> None:
+        if value in SOLVERS:
+            self._solver = value
+        else:
+            raise ValueError(f"solver должен быть одним из {SOLVERS}")
+
+    @property
+    def loss_history(self) -> List[float]:
+        return self._loss_history
+
     @property
     def thetas(self) -> np.ndarray:
         if self._thetas is not None:
@@ -407,42 +917,537 @@ class LogisticRegression:
         assert n_features == self._thetas.size - 1
         return sigmoid(np.dot(features, self._thetas[1:]) + self._thetas[0])
 
-    def train(self, features: np.ndarray, groups: np.ndarray) -> None:
+    def train(self, features: np.ndarray, groups: np.ndarray, seed: Union[int, None] = None) -> None:
         """
         :param features: - признаки групп, записанные в виде столбцов
         :param groups: - вектор столбец принадлежности групп (0-первая группа, 1-вторая)
+        :param seed: - зерно генератора случайных чисел для перемешивания пакетов
         :return:
         """
         # проверка размерности -  количество принаков группы == количество элементов в толбце
-        # реализация градиентного спуска для обучения логистической регрессии.
-        # формула thetas(i) = thetas(i - 1) - learning_rate * (X^T * sigmoid(X *  thetas(i - 1)) - groups)
         n_samples, n_features = features.shape
         assert n_samples == groups.size
 
         self._group_features_count = n_features
-        self._thetas = np.zeros(n_features + 1)
-        X = np.hstack([np.ones(shape=(n_samples, 1)), features])
+        self._thetas = self._initial_thetas(n_features)
+        self._loss_history = []
+        self._best_loss = np.inf
+        self._stalled = 0
+        groups = self._prepare_groups(groups)
+
+        if self._solver == 'newton':
+            self._train_newton(features, groups)
+        elif self._solver == 'lbfgs':
+            self._train_lbfgs(features, groups)
+        else:
+            self._train_gradient_descent(features, groups, np.random.default_rng(seed))
 
-        for _ in range(self._max_train_iters):
-            logits = sigmoid(np.dot(X, self._thetas))
-            self._thetas -= self._learning_rate * np.dot(X.T, logits - groups)
-            # not important
-            loss_v = loss(groups, logits)
-            #print(f"loss_v = {loss_v}")
-            #loss1 = np.multiply(np.log(logits + 1e-15), groups) + np.multiply((1 - groups), np.log(1 - logits + 1e-15))
-            #print(f"loss1 = {loss1}")
-            cost = -np.sum(loss_v) / groups.size
-            loss = np.multiply(np.log(logits + 1e-15), groups) + np.multiply((1 - groups), np.log(1 - logits + 1e-15))
-            cost = -np.sum(loss) / groups.size
-            self._losses = cost
-            if (self._losses <= self._learning_accuracy):
-                #print(f"\nself._losses = {self._losses} и self._learning_accuracy = {self._learning_accuracy}\n")
+        if _debug_mode:
+            print(f"Полученные значения весов после обучения: {self._thetas}")
+            print(f"Значения точности и общей потери: {self._learning_accuracy, self._losses}\n")
+
+    def _initial_thetas(self, n_features: int) -> np.ndarray:
+        return np.zeros(n_features + 1)
+
+    def _prepare_groups(self, groups: np.ndarray) -> np.ndarray:
+        return np.asarray(groups, dtype=float).ravel()
+
+    def _loss_gradient(self, features: np.ndarray, groups: np.ndarray, thetas: np.ndarray):
+        """
+        Функция потерь и её градиент по thetas (ядро, общее для всех методов обучения).
+        """
+        return _loss_gradient(features, groups, thetas)
+
+    def _loss(self, features: np.ndarray, groups: np.ndarray) -> float:
+        return _log_loss(_logits(features, self._thetas), groups)
+
+    def _register_loss(self, loss_value: float) -> bool:
+        """
+        Сохраняет значение функции потерь и проверяет условия остановки:
+        функция потерь достигла learning_accuracy или early_stop_patience раз подряд улучшилась меньше,
+        чем на early_stop_tolerance (относительно лучшего значения).
+        :return: True, если обучение нужно остановить
+        """
+        self._losses = loss_value
+        self._loss_history.append(loss_value)
+        if loss_value <= self._learning_accuracy:
+            return True
+        if loss_value < self._best_loss * (1.0 - self._early_stop_tolerance):
+            self._best_loss = loss_value
+            self._stalled = 0
+            return False
+        self._stalled += 1
+        return self._stalled >= self._early_stop_patience
+
+    def _fit_chunk(self, features: np.ndarray, groups: np.ndarray, rng: np.random.Generator) -> float:
+        """
+        Один проход градиентного спуска по блоку данных (пакетами по batch_size).
+        thetas(i) = thetas(i - 1) - learning_rate * [1 | X]^T * (sigmoid(b + (X, T)) - groups) / n
+        Пакеты выбираются по перестановке индексов, сами данные не перемешиваются и не копируются целиком.
+        :return: средняя функция потерь блока, посчитанная по тем же логитам, что и градиент (до шага)
+        """
+        n_samples = groups.size
+        batch_size = n_samples if self._batch_size is None else min(self._batch_size, n_samples)
+        if batch_size == n_samples:
+            loss_value, gradient, _ = self._loss_gradient(features, groups, self._thetas)
+            self._thetas -= self._learning_rate * gradient
+            return loss_value
+        loss_sum = 0.0
+        order = rng.permutation(n_samples)
+        for start in range(0, n_samples, batch_size):
+            indices = order[start: start + batch_size]
+            loss_value, gradient, _ = self._loss_gradient(features[indices], groups[indices], self._thetas)
+            self._thetas -= self._learning_rate * gradient
+            loss_sum += loss_value * indices.size
+        return loss_sum / n_samples
+
+    def _train_gradient_descent(self, features: np.ndarray, groups: np.ndarray, rng: np.random.Generator) -> None:
+        # одна итерация (max_train_iters) - одна эпоха, то есть проход по всем пакетам данных.
+        # функция потерь по всему набору считается раз в loss_eval_interval эпох.
+        for epoch in range(1, self._max_train_iters + 1):
+            self._fit_chunk(features, groups, rng)
+            if epoch % self._loss_eval_interval != 0 and epoch != self._max_train_iters:
+                continue
+            if self._register_loss(self._loss(features, groups)):
+                break
+
+    def partial_fit(self, features: np.ndarray, groups: np.ndarray, seed: Union[int, None] = None) -> float:
+        """
+        Дообучение на новом блоке размеченных данных: один проход градиентного спуска по блоку.
+        Если модель ещё не обучалась, параметры инициализируются нулями; блок с другим количеством признаков,
+        чем у обученной модели, - ошибка (ValueError).
+        :param features: - признаки групп, записанные в виде столбцов
+        :param groups: - вектор столбец принадлежности групп (0-первая группа, 1-вторая)
+        :param seed: - зерно генератора случайных чисел для перемешивания пакетов
+        :return: средняя функция потерь блока до шага
+        """
+        n_samples, n_features = features.shape
+        assert n_samples == groups.size
+        if self._thetas is None:
+            self._group_features_count = n_features
+            self._thetas = self._initial_thetas(n_features)
+        elif self._group_features_count != n_features:
+            raise ValueError(f"partial_fit:: модель обучена на {self._group_features_count} признаках, "
+                             f"а в блоке {n_features}")
+        self._losses = self._fit_chunk(features, self._prepare_groups(groups), np.random.default_rng(seed))
+        return self._losses
+
+    @staticmethod
+    def _iter_chunks(source, chunk_size: int):
+        """
+        Итератор по блокам (features, groups): source - либо функция, возвращающая такой итератор,
+        либо пара массивов (например, np.memmap), которые читаются срезами по chunk_size строк.
+        """
+        if callable(source):
+            yield from source()
+            return
+        features, groups = source
+        for start in range(0, features.shape[0], chunk_size):
+            yield features[start: start + chunk_size], groups[start: start + chunk_size]
+
+    def train_stream(self, source, chunk_size: int = 65536, seed: Union[int, None] = None) -> None:
+        """
+        Обучение по данным, которые не помещаются в память. В памяти находятся только параметры модели
+        и один блок данных. Каждая эпоха (max_train_iters) - один проход по всем блокам source градиентным
+        спуском (пакетами по batch_size внутри блока). Функция потерь эпохи - среднее функций потерь блоков,
+        посчитанных до шага по блоку, поэтому отдельный проход для неё не нужен; раз в loss_eval_interval
+        эпох по ней проверяются условия остановки.
+        :param source: функция без аргументов, возвращающая итератор по парам (features, groups)
+                       (вызывается в начале каждой эпохи), или пара массивов (features, groups),
+                       например np.memmap, которые читаются блоками по chunk_size строк
+        :param chunk_size: размер блока для пары массивов
+        :param seed: зерно генератора случайных чисел для перемешивания пакетов
+        :return:
+        """
+        rng = np.random.default_rng(seed)
+        self._thetas = None
+        self._loss_history = []
+        self._best_loss = np.inf
+        self._stalled = 0
+        for epoch in range(1, self._max_train_iters + 1):
+            loss_sum = 0.0
+            n_samples = 0
+            for features, groups in self._iter_chunks(source, chunk_size):
+                groups = self._prepare_groups(groups)
+                if self._thetas is None:
+                    self._group_features_count = features.shape[1]
+                    self._thetas = self._initial_thetas(features.shape[1])
+                elif self._group_features_count != features.shape[1]:
+                    raise ValueError(f"train_stream:: в первом блоке {self._group_features_count} признаков, "
+                                     f"а в очередном {features.shape[1]}")
+                loss_sum += self._fit_chunk(features, groups, rng) * groups.size
+                n_samples += groups.size
+            if n_samples == 0:
+                raise ValueError("Источник данных не содержит ни одного блока")
+            if epoch % self._loss_eval_interval != 0 and epoch != self._max_train_iters:
+                continue
+            if self._register_loss(loss_sum / n_samples):
                 break
 
         if _debug_mode:
             print(f"Полученные значения весов после обучения: {self._thetas}")
             print(f"Значения точности и общей потери: {self._learning_accuracy, self._losses}\n")
 
+    def _line_search(self, features: np.ndarray, groups: np.ndarray, thetas: np.ndarray, loss_value: float,
+                     gradient: np.ndarray, direction: np.ndarray):
+        """
+        Поиск шага вдоль направления спуска direction с дроблением шага (условие Армихо):
+        L(thetas + t * direction) <= L(thetas) + 1e-4 * t * (gradient, direction)
+        :return: новые thetas и результат _loss_gradient для них
+        """
+        slope = np.vdot(gradient, direction)
+        step = 1.0
+        while True:
+            candidate = thetas + step * direction
+            result = self._loss_gradient(features, groups, candidate)
+            if result[0] <= loss_value + 1e-4 * step * slope or step < _accuracy:
+                return candidate, result
+            step *= 0.5
+
+    @staticmethod
+    def _newton_direction_cg(features: np.ndarray, probs: np.ndarray, gradient: np.ndarray) -> np.ndarray:
+        """
+        Решение H * d = -grad методом сопряжённых градиентов на произведениях H * v (_hessian_vector),
+        без построения матрицы Гессе.
+        """
+        direction = np.zeros_like(gradient)
+        residual = -gradient
+        conjugate = residual.copy()
+        residual_sq = residual @ residual
+        for _ in range(gradient.size):
+            h_conjugate = _hessian_vector(features, probs, conjugate) + _accuracy * conjugate
+            alpha = residual_sq / (conjugate @ h_conjugate)
+            direction += alpha * conjugate
+            residual -= alpha * h_conjugate
+            residual_sq, previous_sq = residual @ residual, residual_sq
+            if np.sqrt(residual_sq) < _accuracy:
+                break
+            conjugate = residual + (residual_sq / previous_sq) * conjugate
+        return direction
+
+    def _train_newton(self, features: np.ndarray, groups: np.ndarray) -> None:
+        # метод Ньютона-Рафсона (IRLS): H * dT = grad, H = X^T * diag(p * (1 - p)) * X / n.
+        # при небольшом количестве признаков матрица Гессе строится явно,
+        # иначе направление находится методом сопряжённых градиентов на произведениях H * v.
+        loss_value, gradient, probs = _loss_gradient(features, groups, self._thetas)
+        for _ in range(self._max_train_iters):
+            if gradient.size <= LogisticRegression._NEWTON_DIRECT_MAX_FEATURES:
+                hessian = _hessian(features, probs)
+                hessian[np.diag_indices_from(hessian)] += _accuracy
+                direction = -np.linalg.solve(hessian, gradient)
+            else:
+                direction = self._newton_direction_cg(features, probs, gradient)
+            self._thetas, (loss_value, gradient, probs) = \
+                self._line_search(features, groups, self._thetas, loss_value, gradient, direction)
+            if self._register_loss(loss_value) or np.abs(gradient).max() < _accuracy:
+                break
+
+    def _train_lbfgs(self, features: np.ndarray, groups: np.ndarray, memory: int = 10) -> None:
+        # L-BFGS: направление спуска - произведение приближения обратной матрицы Гессе на градиент,
+        # восстановленное двухпроходной рекурсией по последним memory парам (s, y),
+        # s = thetas(i + 1) - thetas(i), y = grad(i + 1) - grad(i). Матрица Гессе не строится.
+        loss_value, gradient, _ = self._loss_gradient(features, groups, self._thetas)
+        s_history: List[np.ndarray] = []
+        y_history: List[np.ndarray] = []
+        for _ in range(self._max_train_iters):
+            direction = -gradient
+            alphas = []
+            for s_i, y_i in zip(reversed(s_history), reversed(y_history)):
+                alpha = np.vdot(s_i, direction) / np.vdot(y_i, s_i)
+                direction -= alpha * y_i
+                alphas.append(alpha)
+            if s_history:
+                direction *= np.vdot(s_history[-1], y_history[-1]) / np.vdot(y_history[-1], y_history[-1])
+            for (s_i, y_i), alpha in zip(zip(s_history, y_history), reversed(alphas)):
+                beta = np.vdot(y_i, direction) / np.vdot(y_i, s_i)
+                direction += (alpha - beta) * s_i
+
+            thetas, (new_loss, new_gradient, _) = \
+                self._line_search(features, groups, self._thetas, loss_value, gradient, direction)
+            s_i, y_i = thetas - self._thetas, new_gradient - gradient
+            if np.vdot(y_i, s_i) > _accuracy * np.vdot(s_i, s_i):
+                s_history.append(s_i)
+                y_history.append(y_i)
+                if len(s_history) > memory:
+                    s_history.pop(0)
+                    y_history.pop(0)
+            self._thetas, loss_value, gradient = thetas, new_loss, new_gradient
+            if self._register_loss(loss_value) or np.abs(gradient).max() < _accuracy:
+                break
+
+
+class MulticlassLogisticRegression(LogisticRegression):
+    """
+    Логистическая регрессия для K классов.
+    multi_class = 'softmax': P{y=k|X} = exp{z_k} / Σ_j exp{z_j}, z = b + (X, T), T - матрица (n_features, K).
+    Параметры всех классов обучаются вместе: на каждом шаге одно матричное произведение
+    [1 | X] * thetas размерности (n, K) и одно [1 | X]^T * (P - Y) для градиента.
+    multi_class = 'ovr': K независимых бинарных моделей "класс k против остальных",
+    обучаемых параллельно в потоках; thetas - их параметры, сложенные в столбцы. partial_fit и train_stream
+    для 'ovr' делают шаг сразу для всех K моделей, функция потерь - сумма их функций потерь.
+    """
+
+    def __init__(self, learning_rate: float = 1.0,
+                 max_iters: int = 1000, accuracy: float = 1e-2,
+                 batch_size: Union[int, None] = None, loss_eval_interval: int = 10,
+                 early_stop_patience: int = 5, early_stop_tolerance: float = 1e-4, solver: str = 'gd',
+                 multi_class: str = 'softmax', classes: Union[np.ndarray, None] = None,
+                 n_jobs: Union[int, None] = None):
+        if multi_class not in ('softmax', 'ovr'):
+            raise ValueError("multi_class должен быть 'softmax' или 'ovr'")
+        # способ обучения нескольких классов (задаётся до вызова сеттера solver)
+        self._multi_class: str = multi_class
+        super().__init__(learning_rate, max_iters, accuracy, batch_size, loss_eval_interval,
+                         early_stop_patience, early_stop_tolerance, solver)
+        # метки классов, столбец k thetas соответствует метке classes[k]
+        self._classes: Union[np.ndarray, None] = None if classes is None else np.unique(classes)
+        # количество потоков для 'ovr'
+        self._n_jobs: Union[int, None] = n_jobs
+
+    @property
+    def multi_class(self) -> str:
+        return self._multi_class
+
+    @property
+    def solver(self) -> str:
+        return self._solver
+
+    @solver.setter
+    def solver(self, value: str) -> None:
+        if self._multi_class == 'softmax' and value == 'newton':
+            raise ValueError("solver 'newton' не поддерживается для multi_class='softmax'")
+        LogisticRegression.solver.fset(self, value)
+
+    @property
+    def classes(self) -> np.ndarray:
+        return self._classes if self._classes is not None else np.array([])
+
+    def _initial_thetas(self, n_features: int) -> np.ndarray:
+        return np.zeros((n_features + 1, self._classes.size))
+
+    def _prepare_groups(self, groups: np.ndarray) -> np.ndarray:
+        """
+        Метки классов -> индексы столбцов thetas.
+        """
+        if self._classes is None:
+            raise ValueError("Метки классов не заданы: передайте classes или вызовите train")
+        groups = np.asarray(groups).ravel()
+        indices = np.searchsorted(self._classes, groups)
+        if np.any(indices >= self._classes.size) or np.any(self._classes[np.minimum(indices, self._classes.size - 1)]
+                                                          != groups):
+            raise ValueError("Среди меток есть классы, отсутствующие в classes")
+        return indices
+
+    def _loss_gradient(self, features: np.ndarray, groups: np.ndarray, thetas: np.ndarray):
+        if self._multi_class == 'ovr':
+            return _ovr_loss_gradient(features, groups, thetas)
+        return _softmax_loss_gradient(features, groups, thetas)
+
+    def _loss(self, features: np.ndarray, groups: np.ndarray) -> float:
+        logits = _logits(features, self._thetas)
+        if self._multi_class == 'ovr':
+            return _ovr_log_loss(logits, groups)
+        return float(np.mean(_log_sum_exp(logits) - logits[np.arange(groups.size), groups]))
+
+    def train(self, features: np.ndarray, groups: np.ndarray, seed: Union[int, None] = None) -> None:
+        """
+        :param features: - признаки, записанные в виде столбцов
+        :param groups: - вектор меток классов (любые сравнимые значения)
+        :param seed: - зерно генератора случайных чисел для перемешивания пакетов
+        :return:
+        """
+        if self._classes is None:
+            self._classes = np.unique(groups)
+        if self._multi_class == 'softmax':
+            super().train(features, groups, seed)
+            return
+        n_samples, n_features = features.shape
+        assert n_samples == groups.size
+        indices = self._prepare_groups(groups)
+        self._group_features_count = n_features
+
+        def train_binary(k: int) -> LogisticRegression:
+            model = LogisticRegression(self._learning_rate, self._max_train_iters, self._learning_accuracy,
+                                       self._batch_size, self._loss_eval_interval, self._early_stop_patience,
+                                       self._early_stop_tolerance, self._solver)
+            model.train(features, (indices == k).astype(float), seed)
+            return model
+
+        n_jobs = os.cpu_count() if self._n_jobs is None else self._n_jobs
+        if n_jobs > 1:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                models = list(executor.map(train_binary, range(self._classes.size)))
+        else:
+            models = [train_binary(k) for k in range(self._classes.size)]
+        self._thetas = np.column_stack([model.thetas for model in models])
+        self._losses = float(np.sum([model.losses for model in models]))
+        self._loss_history = [self._losses]
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """
+        :return: матрица вероятностей классов размерности (n_samples, K)
+        """
+        n_samples, n_features = features.shape
+        assert n_features == self._thetas.shape[0] - 1
+        logits = _logits(features, self._thetas)
+        if self._multi_class == 'softmax':
+            logits -= _log_sum_exp(logits)[:, None]
+            return np.exp(logits)
+        probs = sigmoid(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        return probs
+
+    def classify(self, features: np.ndarray) -> np.ndarray:
+        """
+        :return: вектор наиболее вероятных меток классов
+        """
+        return self._classes[np.argmax(_logits(features, self._thetas), axis=1)]
+
+
+def multiclass_benchmark(n_points: int = 20000, n_classes=(2, 4, 8, 16), iters: int = 200):
+    """
+    Время обучения softmax-модели против последовательного обучения K бинарных моделей
+    (one-vs-rest в одном потоке) при одинаковом количестве итераций градиентного спуска.
+    """
+    global _debug_mode
+    debug_mode, _debug_mode = _debug_mode, False
+    try:
+        rng = make_rng(0)
+        print(f"multiclass training time, {n_points} points, {iters} iterations:")
+        for k in n_classes:
+            angles = 2.0 * np.pi * np.arange(k) / k
+            centers = np.column_stack((np.cos(angles), np.sin(angles))) * 2.0
+            groups = rng.integers(0, k, n_points)
+            features = centers[groups] + rng.normal(0.0, 0.5, (n_points, 2))
+            features = np.hstack((features, features[:, :1] * features[:, 1:], features * features))
+            times = []
+            for multi_class, n_jobs in (('softmax', 1), ('ovr', 1), ('ovr', None)):
+                lg = MulticlassLogisticRegression(max_iters=iters, loss_eval_interval=iters, multi_class=multi_class,
+                                                  n_jobs=n_jobs)
+                t_0 = time.perf_counter()
+                lg.train(features, groups)
+                times.append(time.perf_counter() - t_0)
+                accuracy = np.mean(lg.classify(features) == groups)
+                times.append(accuracy)
+            print(f"K = {k:2d}: softmax {times[0]:.3f} s (acc {times[1]:.3f}), "
+                  f"sequential ovr {times[2]:.3f} s (acc {times[3]:.3f}), parallel ovr {times[4]:.3f} s")
+    finally:
+        _debug_mode = debug_mode
+
+
+def train_benchmark(target_loss: float = 0.1, n_points: int = 100000):
+    """
+    Время обучения до достижения target_loss на данных log_reg_test_data:
+    полный градиентный спуск с вычислением функции потерь на каждом шаге (поведение прежнего train)
+    против мини-пакетного и стохастического режимов.
+    """
+    global _debug_mode
+    debug_mode, _debug_mode = _debug_mode, False
+    try:
+        features, groups = log_reg_test_data(n_points=n_points, rand_range=0.1, rng=0)
+        configs = (("full batch, loss every step", dict(batch_size=None, loss_eval_interval=1)),
+                   ("full batch, loss every 10  ", dict(batch_size=None, loss_eval_interval=10)),
+                   ("mini-batch 256             ", dict(batch_size=256, loss_eval_interval=1)),
+                   ("mini-batch 32              ", dict(batch_size=32, loss_eval_interval=1)))
+        print(f"time to loss <= {target_loss} on {n_points} points:")
+        for name, config in configs:
+            lg = LogisticRegression(learning_rate=1.0, max_iters=100000, accuracy=target_loss,
+                                    early_stop_patience=1000000, **config)
+            t_0 = time.perf_counter()
+            lg.train(features, groups, seed=0)
+            print(f"{name}: {time.perf_counter() - t_0:8.4f} s,"
+                  f" epochs: {len(lg.loss_history) * lg.loss_eval_interval}, loss: {lg.losses:.4f}")
+    finally:
+        _debug_mode = debug_mode
+
+
+def solver_benchmark(target_loss: float = 0.03, n_points: int = 3000):
+    """
+    Количество итераций и время обучения до достижения target_loss на данных log_reg_ellipsoid_test_data
+    для градиентного спуска, метода Ньютона и L-BFGS.
+    """
+    global _debug_mode
+    debug_mode, _debug_mode = _debug_mode, False
+    try:
+        features, groups = log_reg_ellipsoid_test_data((0.08, -0.08, 1.6, 1.0, 1.0), n_points=n_points, rng=0)
+        print(f"time to loss <= {target_loss} on {n_points} ellipsoid points:")
+        for solver in SOLVERS:
+            lg = LogisticRegression(max_iters=100000, accuracy=target_loss, loss_eval_interval=1,
+                                    early_stop_patience=1000000, solver=solver)
+            t_0 = time.perf_counter()
+            lg.train(features, groups)
+            print(f"{solver:6s}: {time.perf_counter() - t_0:8.4f} s, iterations: {len(lg.loss_history):6d},"
+                  f" loss: {lg.losses:.4f}")
+    finally:
+        _debug_mode = debug_mode
+
+
+def loss_kernel_benchmark(n_points: int = 1000000, repeats: int = 20):
+    """
+    Время вычисления функции потерь и невязки p - y по готовым логитам:
+    прежний путь (sigmoid + loss с ln(p + eps) на отдельных массивах) против _fused_log_loss
+    с повторно используемыми рабочими массивами. Также сравнивается точность при больших |z|.
+    """
+    rng = make_rng(0)
+    logits = rng.normal(0.0, 4.0, n_points)
+    groups = (rng.random(n_points) < sigmoid(logits)).astype(float)
+    probs, residual = np.empty(n_points), np.empty(n_points)
+
+    t_0 = time.perf_counter()
+    for _ in range(repeats):
+        reference_probs = 1.0 / (1.0 + np.exp(-logits))
+        reference_loss = loss(reference_probs, groups)
+        reference_residual = reference_probs - groups
+    t_reference = (time.perf_counter() - t_0) / repeats
+
+    t_0 = time.perf_counter()
+    for _ in range(repeats):
+        fused_loss, _, _ = _fused_log_loss(logits, groups, probs, residual)
+    t_fused = (time.perf_counter() - t_0) / repeats
+
+    print(f"loss + residual on {n_points} logits:")
+    print(f"separate arrays: {t_reference * 1e3:8.3f} ms, loss: {reference_loss:.12f}")
+    print(f"fused kernel   : {t_fused * 1e3:8.3f} ms, loss: {fused_loss:.12f},"
+          f" max |residual diff|: {np.abs(residual - reference_residual).max():.3e}")
+
+    extreme = np.array([-800.0, -40.0, 40.0, 800.0])
+    extreme_groups = np.array([1.0, 1.0, 0.0, 0.0])
+    with np.errstate(over='ignore'):
+        reference_extreme = loss(1.0 / (1.0 + np.exp(-extreme)), extreme_groups)
+    print(f"|z| up to 800, exact loss {np.mean(np.abs(extreme)):.1f}: separate arrays {reference_extreme:.4f},"
+          f" fused kernel {_fused_log_loss(extreme, extreme_groups)[0]:.4f}")
+
+
+def march_squares_benchmark(coarse_resolution: int = 16, depth: int = 4):
+    """
+    Количество вычислений поля и время построения границы эллипса: равномерная сетка высокого разрешения
+    против адаптивного квадродерева с тем же шагом самых мелких ячеек.
+    """
+    params = (0.08, -0.08, 1.6, 1.0, 1.0)
+    evaluations = [0]
+
+    def field(x, y):
+        evaluations[0] += np.size(x)
+        return ellipsoid(x, y, params)
+
+    resolution = (coarse_resolution - 1) * (1 << depth) + 1
+    print(f"ellipse contour, finest step {10.0 / (resolution - 1):.4f}:")
+    t_0 = time.perf_counter()
+    uniform = march_squares_2d(field, march_resolution=(resolution, resolution), threshold=0.0)
+    t_uniform = time.perf_counter() - t_0
+    print(f"uniform  {resolution}x{resolution}: {evaluations[0]:8d} evaluations, {t_uniform * 1e3:8.3f} ms,"
+          f" {uniform.shape[0]} sections")
+    evaluations[0] = 0
+    t_0 = time.perf_counter()
+    adaptive = march_squares_2d_adaptive(field, march_resolution=(coarse_resolution, coarse_resolution),
+                                         depth=depth, threshold=0.0)
+    t_adaptive = time.perf_counter() - t_0
+    print(f"adaptive {coarse_resolution}x{coarse_resolution}, depth {depth}: {evaluations[0]:8d} evaluations,"
+          f" {t_adaptive * 1e3:8.3f} ms, {adaptive.shape[0]} sections")
+    same = uniform.shape == adaptive.shape and \
+        np.abs(np.sort(uniform.reshape(-1, 4), axis=0) - np.sort(adaptive.reshape(-1, 4), axis=0)).max() < 1e-9
+    print(f"same sections: {same}")
+
 
 def lin_reg_test():
     features, group = log_reg_test_data()
@@ -453,20 +1458,15 @@ def lin_reg_test():
 
 def non_lin_reg_test():
     features, group = log_reg_ellipsoid_test_data((0.08, -0.08, 1.6, 1.0, 1.0))
+    # обучение на одночленах степени не выше 2 от координат точек (расширяются блоками при обучении)
+    expansion = PolynomialFeatures(degree=2, n_features=2)
+    coordinates = np.ascontiguousarray(features[:, :2])
     lg = LogisticRegression()
-    lg.train(features, group)
-    print(f"Обученные параметры логистической регрессии:\n {lg}")
-
-    thetas = lg.thetas
-
-    def _ellipsoid(x: float, y: float) -> float:
-        return thetas[0] + x * thetas[1] + y * thetas[2] + x * y * thetas[3] + x * x * thetas[4] + y * y * thetas[5]
-
-    sections = march_squares_2d(_ellipsoid)
+    lg.train_stream(expansion.stream(coordinates, group))
+    print(f"Обученные параметры логистической регрессии ({expansion}):\n {lg}")
 
-    for arc in sections:
-        p_0, p_1 = arc
-        plt.plot([p_0[0], p_1[0]], [p_0[1], p_1[1]], 'k')
+    sections = march_squares_2d(expansion.decision_function(lg.thetas), threshold=0.0)
+    draw_polylines(*stitch_sections(sections))
 
     plt.xlabel("x")
     plt.ylabel("y")
@@ -1,13 +1,21 @@
-from typing import Union, List, Dict
+from typing import Union, List, Dict, Tuple, Callable, Iterator
+from functools import lru_cache
+from itertools import repeat
+from bisect import bisect_left, insort
 from collections import namedtuple
 import datetime
 from datetime import date
 import os.path
 import json
+from json.encoder import encode_basestring
 import csv
+import time
+import numpy as np
 
 LAB_WORK_SESSION_KEYS = ("presence", "lab_work_n", "lab_work_mark", "lab_work_date")
 STUDENT_KEYS = ("unique_id", "name", "surname", "group", "subgroup", "lab_works_sessions")
+STUDENT_GROUPS = (6407, 6408, 6409)
+STUDENT_SUBGROUPS = (1, 2)
 
 class LabWorkSession(namedtuple('LabWorkSession', 'presence, lab_work_number, lab_work_mark, lab_work_date')):
     """
@@ -22,15 +30,35 @@ class LabWorkSession(namedtuple('LabWorkSession', 'presence, lab_work_number, la
             param: lab_work_date: дата л.р.(date)
         """
         if not LabWorkSession._validate_args(presence, lab_work_number, lab_work_mark, lab_work_date):
-            raise ValueError(f"LabWorkSession ::"
-                             f"incorrect args :\n"
-                             f"presence       : {presence},\n"
-                             f"lab_work_number: {lab_work_number},\n"
-                             f"lab_work_mark  : {lab_work_mark},\n"
-                             f"lab_work_date  : {lab_work_date}")
+            raise LabWorkSession._args_error(presence, lab_work_number, lab_work_mark, lab_work_date)
 
         return super(LabWorkSession, cls).__new__(cls, presence, lab_work_number, lab_work_mark, lab_work_date)
 
+    @classmethod
+    def _trusted(cls, presence: bool, lab_work_number: int, lab_work_mark: int,
+                 lab_work_date: date) -> 'LabWorkSession':
+        """
+        Создание без проверки аргументов - только для уже проверенных данных
+        (validate_session_columns или разбор, гарантирующий типы, и _validate_values)
+        """
+        return tuple.__new__(cls, (presence, lab_work_number, lab_work_mark, lab_work_date))
+
+    @staticmethod
+    def _args_error(presence, lab_work_number, lab_work_mark, lab_work_date) -> ValueError:
+        return ValueError(f"LabWorkSession ::"
+                          f"incorrect args :\n"
+                          f"presence       : {presence},\n"
+                          f"lab_work_number: {lab_work_number},\n"
+                          f"lab_work_mark  : {lab_work_mark},\n"
+                          f"lab_work_date  : {lab_work_date}")
+
+    @staticmethod
+    def _validate_values(presence: bool, lab_work_mark: int) -> bool:
+        """
+        Проверка значений без проверки типов
+        """
+        return bool(presence) and lab_work_mark > -1
+
     @staticmethod
     def _validate_args(presence: bool, lab_work_number: int, lab_work_mark: int, lab_work_date: date) -> bool:
         """
@@ -39,13 +67,9 @@ class LabWorkSession(namedtuple('LabWorkSession', 'presence, lab_work_number, la
             param: lab_work_mark: оценка за л.р.(int)
             param: lab_work_date: дата л.р.(date)
         """
-        rule_1 = True if presence and lab_work_mark > -1 else False
         correct = isinstance(presence, bool) and isinstance(lab_work_number, int) \
                   and isinstance(lab_work_mark, int) and isinstance(lab_work_date, date)
-        if correct and rule_1:
-            return True
-        else:
-            return False
+        return correct and LabWorkSession._validate_values(presence, lab_work_mark)
 
     def __str__(self) -> str:
         """
@@ -64,8 +88,236 @@ class LabWorkSession(namedtuple('LabWorkSession', 'presence, lab_work_number, la
                f'\t\t\t"lab_work_mark": {self.lab_work_mark},\n' \
                f'\t\t\t"lab_work_date": "{self.lab_work_date.strftime("%d:%m:%y")}"\n' \
                f'\t\t}}'
+class SessionView:
+    """
+    Лабораторные занятия одного студента в SessionStore: срезы столбцов хранилища без копирования.
+    Итерирование и индексирование создают экземпляры LabWorkSession по требованию.
+    Вид отражает состояние хранилища на момент получения (после изменений хранилища получите вид заново).
+    """
+    __slots__ = ('lab_work_number', 'lab_work_mark', 'presence', 'day', 'trusted')
+    # с какого количества занятий столбцы выгоднее проверить векторно, чем проверять каждый объект
+    _VALIDATE_MIN_SIZE = 32
+
+    def __init__(self, lab_work_number: np.ndarray, lab_work_mark: np.ndarray, presence: np.ndarray, day: np.ndarray,
+                 trusted: bool = False):
+        """
+            param: lab_work_number: номера л.р.
+            param: lab_work_mark: оценки за л.р.
+            param: presence: присутствие студента на л.р.
+            param: day: даты л.р. (date.toordinal())
+            param: trusted: все занятия уже проверены (SessionStore знает это без повторной проверки)
+        """
+        self.lab_work_number = lab_work_number
+        self.lab_work_mark = lab_work_mark
+        self.presence = presence
+        self.day = day
+        self.trusted = trusted
+
+    def __len__(self) -> int:
+        return self.day.size
+
+    def __getitem__(self, index: int) -> LabWorkSession:
+        make = LabWorkSession._trusted if self.trusted else LabWorkSession
+        return make(bool(self.presence[index]), int(self.lab_work_number[index]),
+                    int(self.lab_work_mark[index]), date.fromordinal(int(self.day[index])))
+
+    def __iter__(self):
+        # для непроверенного вида столбцы проверяются один раз (если занятий достаточно много);
+        # если все занятия корректны, проверка каждого объекта не нужна
+        trusted = self.trusted or (self.day.size >= SessionView._VALIDATE_MIN_SIZE and validate_session_columns(
+            self.presence, self.lab_work_number, self.lab_work_mark, self.day).all())
+        make = LabWorkSession._trusted if trusted else LabWorkSession
+        for presence, number, mark, day in zip(self.presence.tolist(), self.lab_work_number.tolist(),
+                                               self.lab_work_mark.tolist(), self.day.tolist()):
+            yield make(presence, number, mark, date.fromordinal(day))
+
+
+class SessionStore:
+    """
+    Столбцовое хранилище лабораторных занятий всех студентов: id студента, номер л.р., оценка,
+    присутствие и дата (номер дня, date.toordinal()) - по одному массиву numpy на поле (21 байт на занятие).
+    Занятия одного студента хранятся подряд (после добавления не по порядку id хранилище один раз
+    упорядочивается при следующем запросе), поэтому sessions(unique_id) - срезы без копирования.
+    Студент, подключённый к хранилищу (attach), хранит свои занятия в нём, Student.lab_work_sessions
+    возвращает SessionView.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        capacity = max(int(capacity), 1)
+        self._student = np.empty(capacity, dtype=np.int64)
+        self._lab_work_number = np.empty(capacity, dtype=np.int32)
+        self._lab_work_mark = np.empty(capacity, dtype=np.int32)
+        self._presence = np.empty(capacity, dtype=bool)
+        self._day = np.empty(capacity, dtype=np.int32)
+        # количество занятий
+        self._size = 0
+        # упорядочены ли занятия по id студента
+        self._ordered = True
+        # unique_id -> (начало, конец) занятий студента (действительно, если _ordered)
+        self._ranges: Dict[int, Tuple[int, int]] = {}
+        # количество занятий, не проходящих проверку LabWorkSession; пока их нет, SessionView
+        # создаёт LabWorkSession без проверки
+        self._invalid = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, size: int) -> None:
+        if size <= self._student.size:
+            return
+        capacity = max(size, 2 * self._student.size)
+        for name in ('_student', '_lab_work_number', '_lab_work_mark', '_presence', '_day'):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def append(self, unique_id: int, session: LabWorkSession) -> None:
+        """
+        Добавление одного занятия студента unique_id
+        """
+        if not isinstance(session, LabWorkSession):
+            raise ValueError(f'Error append lab work session')
+        self._reserve(self._size + 1)
+        index = self._size
+        self._student[index] = unique_id
+        self._lab_work_number[index] = session.lab_work_number
+        self._lab_work_mark[index] = session.lab_work_mark
+        self._presence[index] = session.presence
+        self._day[index] = session.lab_work_date.toordinal()
+        self._size += 1
+        if not LabWorkSession._validate_values(session.presence, session.lab_work_mark):
+            self._invalid += 1
+        if not self._ordered:
+            return
+        if index == 0 or unique_id > self._student[index - 1]:
+            self._ranges[unique_id] = (index, index + 1)
+        elif unique_id == self._student[index - 1]:
+            self._ranges[unique_id] = (self._ranges[unique_id][0], index + 1)
+        else:
+            self._ordered = False
+
+    def extend(self, unique_id: np.ndarray, lab_work_number: np.ndarray, lab_work_mark: np.ndarray,
+               presence: np.ndarray, day: np.ndarray) -> None:
+        """
+        Добавление столбцов занятий (массивы одной длины) без проверки значений
+        """
+        count = np.size(unique_id)
+        self._reserve(self._size + count)
+        stop = self._size + count
+        self._student[self._size: stop] = unique_id
+        self._lab_work_number[self._size: stop] = lab_work_number
+        self._lab_work_mark[self._size: stop] = lab_work_mark
+        self._presence[self._size: stop] = presence
+        self._day[self._size: stop] = day
+        self._invalid += count - int(np.count_nonzero(self._valid(self._size, stop)))
+        self._size = stop
+        self._ordered = False
+
+    def _valid(self, start: int, stop: int) -> np.ndarray:
+        return validate_session_columns(self._presence[start: stop], self._lab_work_number[start: stop],
+                                        self._lab_work_mark[start: stop], self._day[start: stop])
+
+    def _order(self) -> None:
+        """
+        Устойчивая сортировка занятий по id студента и пересчёт диапазонов
+        """
+        if self._ordered:
+            return
+        order = np.argsort(self._student[:self._size], kind='stable')
+        for name in ('_student', '_lab_work_number', '_lab_work_mark', '_presence', '_day'):
+            column = getattr(self, name)
+            column[:self._size] = column[:self._size][order]
+        ids, starts, counts = np.unique(self._student[:self._size], return_index=True, return_counts=True)
+        self._ranges = {unique_id: (start, start + count)
+                        for unique_id, start, count in zip(ids.tolist(), starts.tolist(), counts.tolist())}
+        self._ordered = True
+
+    def sessions(self, unique_id: int) -> SessionView:
+        """
+        Занятия студента unique_id (срезы столбцов без копирования)
+        """
+        self._order()
+        start, stop = self._ranges.get(unique_id, (0, 0))
+        return SessionView(self._lab_work_number[start: stop], self._lab_work_mark[start: stop],
+                           self._presence[start: stop], self._day[start: stop], self._invalid == 0)
+
+    def count(self, unique_id: int) -> int:
+        self._order()
+        start, stop = self._ranges.get(unique_id, (0, 0))
+        return stop - start
+
+    def relabel(self, unique_id: int, new_unique_id: int) -> None:
+        """
+        Перенос занятий студента unique_id на id new_unique_id.
+        Если в хранилище уже есть занятия new_unique_id, возбуждается ValueError (занятия двух студентов
+        не объединяются).
+        """
+        if unique_id == new_unique_id:
+            return
+        self._order()
+        if new_unique_id in self._ranges:
+            raise ValueError(f"SessionStore:: sessions of student {new_unique_id} are already in the store")
+        student = self._student[:self._size]
+        student[student == unique_id] = new_unique_id
+        self._ordered = False
+
+    def attach(self, student: 'Student') -> None:
+        """
+        Перенос занятий студента в хранилище; дальше студент хранит занятия только в нём
+        """
+        if student._lab_work_sessions is self:
+            return
+        previous = student._lab_work_sessions
+        for session in student.lab_work_sessions:
+            self.append(student.unique_id, session)
+        if isinstance(previous, SessionStore):
+            previous.remove(student.unique_id)
+        student._lab_work_sessions = self
+
+    def remove(self, unique_id: int) -> int:
+        """
+        Удаление всех занятий студента unique_id
+        :return: количество удалённых занятий
+        """
+        self._order()
+        start, stop = self._ranges.pop(unique_id, (0, 0))
+        count = stop - start
+        if count == 0:
+            return 0
+        if self._invalid:
+            self._invalid -= count - int(np.count_nonzero(self._valid(start, stop)))
+        for name in ('_student', '_lab_work_number', '_lab_work_mark', '_presence', '_day'):
+            column = getattr(self, name)
+            column[start: self._size - count] = column[stop: self._size]
+        self._size -= count
+        self._ranges = {key: (first - count, last - count) if first >= stop else (first, last)
+                        for key, (first, last) in self._ranges.items()}
+        return count
+
+    @classmethod
+    def from_students(cls, students: List['Student']) -> 'SessionStore':
+        store = cls()
+        for student in students:
+            store.attach(student)
+        return store
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        Столбцы всех занятий, упорядоченные по id студента (без копирования):
+        unique_id, lab_work_number, lab_work_mark, presence, day
+        """
+        self._order()
+        return {'unique_id': self._student[:self._size],
+                'lab_work_number': self._lab_work_number[:self._size],
+                'lab_work_mark': self._lab_work_mark[:self._size],
+                'presence': self._presence[:self._size],
+                'day': self._day[:self._size]}
+
+
 class Student:
-    __slots__ = ('_unique_id', '_name', '_surname', '_group', '_subgroup', '_lab_work_sessions')
+    __slots__ = ('_unique_id', '_name', '_surname', '_group', '_subgroup', '_lab_work_sessions', '_repository')
 
     def __init__(self, unique_id: int, name: str, surname: str, group: int, subgroup: int):
         """
@@ -75,14 +327,56 @@ class Student:
             param: group: номер группы в которой студент обучается (int)
             param: subgroup: номер подгруппы (int)
         """
+        if not self._validate_args(unique_id, name, surname, group, subgroup):
+            raise Student._args_error(unique_id, name, surname, group, subgroup)
         self._unique_id = unique_id
         self._name = name
         self._surname = surname
         self._group = group
         self._subgroup = subgroup
         self._lab_work_sessions = []
-        if not self._validate_args(unique_id, name, surname, group, subgroup):
-            raise ValueError(f'Что-то пошло не так')
+        # StudentRepository, в индексах которого находится студент
+        self._repository = None
+
+    @classmethod
+    def _trusted(cls, unique_id: int, name: str, surname: str, group: int, subgroup: int) -> 'Student':
+        """
+        Создание без проверки аргументов - только для уже проверенных данных
+        (validate_student_columns или разбор, гарантирующий типы, и _validate_values)
+        """
+        student = object.__new__(cls)
+        student._unique_id = unique_id
+        student._name = name
+        student._surname = surname
+        student._group = group
+        student._subgroup = subgroup
+        student._lab_work_sessions = []
+        student._repository = None
+        return student
+
+    @staticmethod
+    def _args_error(unique_id, name, surname, group, subgroup) -> ValueError:
+        """
+        Исключение с перечнем аргументов, не прошедших проверку _validate_args
+        """
+        checks = (('unique_id', unique_id, 'ожидается int', isinstance(unique_id, int)),
+                  ('name', name, 'ожидается str', isinstance(name, str)),
+                  ('surname', surname, 'ожидается str', isinstance(surname, str)),
+                  ('group', group, f'ожидается одна из {STUDENT_GROUPS}',
+                   isinstance(group, int) and group in STUDENT_GROUPS),
+                  ('subgroup', subgroup, f'ожидается одна из {STUDENT_SUBGROUPS}',
+                   isinstance(subgroup, int) and subgroup in STUDENT_SUBGROUPS))
+        return ValueError(f"Student ::"
+                          f"incorrect args :\n" +
+                          ',\n'.join(f"{field:9}: {value!r} ({expected})"
+                                      for field, value, expected, correct in checks if not correct))
+
+    @staticmethod
+    def _validate_values(group: int, subgroup: int) -> bool:
+        """
+        Проверка значений без проверки типов
+        """
+        return group in STUDENT_GROUPS and subgroup in STUDENT_SUBGROUPS
 
     @staticmethod
     def _validate_args(unique_id: int, name: str, surname: str, group: int, subgroup: int) -> bool:
@@ -95,12 +389,7 @@ class Student:
         """
         correct = isinstance(unique_id, int) and isinstance(name, str) and isinstance(surname, str) \
                   and isinstance(group, int) and isinstance(subgroup, int)
-
-        rule1 = True if group == 6407 or group == 6408 or group == 6409 else False
-        rule2 = True if subgroup == 1 or subgroup == 2 else False
-
-        if correct and rule1 and rule2: return True
-        else: return False
+        return correct and Student._validate_values(group, subgroup)
 
     def __str__(self) -> str:
         """
@@ -144,8 +433,8 @@ class Student:
 
         return f'\t{{\n' \
                f'\t\t"unique_id":          {self._unique_id},\n' \
-               f'\t\t"name":               "{self._name}",\n' \
-               f'\t\t"surname":            "{self._surname}",\n' \
+               f'\t\t"name":               {encode_basestring(self._name)},\n' \
+               f'\t\t"surname":            {encode_basestring(self._surname)},\n' \
                f'\t\t"group":              {self._group},\n' \
                f'\t\t"subgroup":           {self._subgroup},\n' \
                f'\t\t"lab_works_sessions": [\n{sep.join(str(session) for session in self.lab_work_sessions)}]\n' \
@@ -193,7 +482,11 @@ class Student:
         """
         assert isinstance(value, int) #утверждение, которое проверяет, является ли условие истинным. Если условие программы
         assert value > 0  #истино, то работа программы продолжается. В ином случае - вызывает исключение AssertError
-        self._unique_id = value
+        if self._repository is not None:
+            self._repository._check_unique_id(self, value)
+        if isinstance(self._lab_work_sessions, SessionStore):
+            self._lab_work_sessions.relabel(self._unique_id, value)
+        self._set_indexed('_unique_id', value)
 
     @name.setter
     def name(self, name: str) -> None:
@@ -211,16 +504,53 @@ class Student:
         """
         assert isinstance(surname, str)
         assert len(surname) != 0
-        self._surname = surname
+        self._set_indexed('_surname', surname)
+
+    @group.setter
+    def group(self, group: int) -> None:
+        """
+        Метод для изменения номера группы
+        """
+        assert isinstance(group, int)
+        assert group in STUDENT_GROUPS
+        self._set_indexed('_group', group)
+
+    @subgroup.setter
+    def subgroup(self, subgroup: int) -> None:
+        """
+        Метод для изменения номера подгруппы
+        """
+        assert isinstance(subgroup, int)
+        assert subgroup in STUDENT_SUBGROUPS
+        self._set_indexed('_subgroup', subgroup)
+
+    def _set_indexed(self, slot: str, value) -> None:
+        """
+        Изменение поля, по которому StudentRepository строит индексы (индексы обновляются вместе с полем)
+        """
+        if self._repository is None:
+            setattr(self, slot, value)
+        else:
+            self._repository._reindex(self, slot, value)
 
     @property
     def lab_work_sessions(self):
         """
         Метод доступа для списка лабораторных работ, которые студент посетил или не посетил.
         Использовать yield.
+        Для студента, подключённого к SessionStore, - SessionView (срезы столбцов хранилища без копирования,
+        экземпляры LabWorkSession создаются при итерировании).
+        """
+        if isinstance(self._lab_work_sessions, SessionStore):
+            return self._lab_work_sessions.sessions(self._unique_id)
+        return (lab for lab in self._lab_work_sessions)
+
+    @property
+    def session_store(self) -> Union[SessionStore, None]:
         """
-        for lab in self._lab_work_sessions:
-            yield lab
+        Хранилище занятий, к которому подключён студент
+        """
+        return self._lab_work_sessions if isinstance(self._lab_work_sessions, SessionStore) else None
 
     def append_lab_work_session(self, session: LabWorkSession):
         """
@@ -228,13 +558,82 @@ class Student:
         """
         if not isinstance(session, LabWorkSession):
             raise ValueError(f'Error append lab work session')
-        self._lab_work_sessions.append(session)
+        if isinstance(self._lab_work_sessions, SessionStore):
+            self._lab_work_sessions.append(self._unique_id, session)
+        else:
+            self._lab_work_sessions.append(session)
 
     @lab_work_sessions.setter
     def lab_work_sessions(self, lab):
+        """
+        Замена занятий студента. Присваивание SessionStore подключает студента к хранилищу, в котором
+        уже есть его занятия (см. SessionStore.extend). Занятия студента в прежнем хранилище удаляются,
+        чтобы не учитываться в статистике хранилища дважды.
+        """
+        if isinstance(self._lab_work_sessions, SessionStore) and lab is not self._lab_work_sessions:
+            self._lab_work_sessions.remove(self._unique_id)
         self._lab_work_sessions = lab
 
 
+def _is_str_column(column) -> np.ndarray:
+    if isinstance(column, np.ndarray) and column.dtype.kind == 'U':
+        return np.ones(column.size, dtype=bool)
+    return np.fromiter(map(isinstance, column, repeat(str)), dtype=bool, count=len(column))
+
+
+def validate_session_columns(presence: np.ndarray, lab_work_number: np.ndarray, lab_work_mark: np.ndarray,
+                             day: np.ndarray) -> np.ndarray:
+    """
+    Проверка столбцов занятий по правилам LabWorkSession._validate_args сразу для всех занятий:
+    типы проверяются один раз по dtype столбца (presence - bool, остальные - целые, day - date.toordinal()),
+    значения - векторно.
+    :return: маска корректных занятий
+    """
+    presence, lab_work_number, lab_work_mark, day = \
+        (np.asarray(column) for column in (presence, lab_work_number, lab_work_mark, day))
+    if not presence.size == lab_work_number.size == lab_work_mark.size == day.size:
+        raise ValueError("validate_session_columns:: columns have different lengths")
+    if presence.dtype != bool or any(column.dtype.kind not in 'iu' for column in (lab_work_number, lab_work_mark, day)):
+        return np.zeros(presence.size, dtype=bool)
+    return presence & (lab_work_mark > -1) & (day >= 1) & (day <= date.max.toordinal())
+
+
+def validate_student_columns(unique_id: np.ndarray, name, surname, group: np.ndarray,
+                             subgroup: np.ndarray) -> np.ndarray:
+    """
+    Проверка столбцов студентов по правилам Student._validate_args сразу для всех студентов:
+    целые столбцы проверяются по dtype, имена и фамилии - массив строк numpy или список str.
+    :return: маска корректных студентов
+    """
+    unique_id, group, subgroup = (np.asarray(column) for column in (unique_id, group, subgroup))
+    if not unique_id.size == len(name) == len(surname) == group.size == subgroup.size:
+        raise ValueError("validate_student_columns:: columns have different lengths")
+    if any(column.dtype.kind not in 'iu' for column in (unique_id, group, subgroup)):
+        return np.zeros(unique_id.size, dtype=bool)
+    return _is_str_column(name) & _is_str_column(surname) & \
+        np.isin(group, STUDENT_GROUPS) & np.isin(subgroup, STUDENT_SUBGROUPS)
+
+
+def build_students(unique_id: np.ndarray, name, surname, group: np.ndarray, subgroup: np.ndarray,
+                   errors: Union['ErrorSink', None] = None) -> List[Student]:
+    """
+    Создание студентов из столбцов: одна векторная проверка (validate_student_columns) вместо проверки
+    каждого объекта в конструкторе. Некорректные записи передаются в errors (номер записи, запись, исключение),
+    если он задан, иначе возбуждается ValueError.
+    """
+    valid = validate_student_columns(unique_id, name, surname, group, subgroup)
+    columns = [column.tolist() if isinstance(column, np.ndarray) else list(column)
+               for column in (unique_id, name, surname, group, subgroup)]
+    if not valid.all():
+        for position in np.flatnonzero(~valid).tolist():
+            record = tuple(column[position] for column in columns)
+            if errors is None:
+                raise ValueError(f"build_students:: invalid student record {record}")
+            errors(position, record, ValueError(f"invalid student record {record}"))
+        columns = [[column[position] for position in np.flatnonzero(valid).tolist()] for column in columns]
+    return list(map(Student._trusted, *columns))
+
+
 def _load_lab_work_session(json_node) -> LabWorkSession:
     """
         Создание из под-дерева json файла экземпляра класса LabWorkSession.
@@ -245,16 +644,21 @@ def _load_lab_work_session(json_node) -> LabWorkSession:
         if key not in json_node:
             raise KeyError(f"load_lab_work_session:: key \"{key}\" not present in json_node")
 
-    return LabWorkSession(True if json_node['presence'] == 1 else False,
-                          int(json_node['lab_work_n']),
-                          int(json_node['lab_work_mark']),
-                          datetime.datetime.strptime(json_node['lab_work_date'], '%d:%m:%y').date())
+    presence = json_node['presence'] == 1
+    lab_work_number, lab_work_mark = int(json_node['lab_work_n']), int(json_node['lab_work_mark'])
+    lab_work_date = _parse_date(json_node['lab_work_date'])
+    # типы гарантированы преобразованиями, остаётся проверить значения
+    if not LabWorkSession._validate_values(presence, lab_work_mark):
+        raise LabWorkSession._args_error(presence, lab_work_number, lab_work_mark, lab_work_date)
+    return LabWorkSession._trusted(presence, lab_work_number, lab_work_mark, lab_work_date)
 
-def _load_student(json_node) -> Student:
+def _load_student(json_node, errors: Union['ErrorSink', None] = None, position: int = 0) -> Student:
     """
         Создание из под-дерева json файла экземпляра класса Student.
         Если в процессе создания LabWorkSession у студента случается ошибка,
         создание самого студента ломаться не должно.
+        Ошибки занятий передаются в errors (пара (position - номер студента, номер занятия), занятие, исключение),
+        если он задан, иначе печатаются.
     """
     for key in STUDENT_KEYS:
         if key not in json_node:
@@ -264,17 +668,14 @@ def _load_student(json_node) -> Student:
                       json_node['surname'],
                       int(json_node['group']),
                       int(json_node['subgroup']))
-    for session in json_node['lab_works_sessions']:
+    for index, session in enumerate(json_node['lab_works_sessions']):
         try:
             student.append_lab_work_session(_load_lab_work_session(session))
-        except ValueError as ver:
-            print(ver)
-            continue
-        except KeyError as ker:
-            print(ker)
-            continue
-        except Exception as exc:
-            print(exc)
+        except (KeyError, ValueError, TypeError) as exc:
+            if errors is None:
+                print(exc)
+            else:
+                errors((position, index), session, exc)
             continue
     return student
 
@@ -292,58 +693,572 @@ STUD_PRESENCE = 6
 LAB_WORK_NUMBER = 7
 LAB_WORK_MARK = 8
 
-def load_students_csv(file_path: str) -> Union[List[Student], None]:
+class LoadErrors:
+    """
+    Приёмник ошибок загрузки: считает некорректные строки (записи) и хранит первые max_stored из них
+    в виде троек (позиция, строка/запись, исключение). Позиция - номер строки csv файла, номер студента
+    в json файле или, для ошибки занятия в json файле, пара (номер студента, номер занятия).
+    Вместо экземпляра LoadErrors загрузчикам можно передать любую функцию с такими же тремя аргументами.
+    """
+    __slots__ = ('_count', '_errors', '_max_stored')
+
+    def __init__(self, max_stored: int = 100):
+        self._count = 0
+        self._errors = []
+        self._max_stored = max_stored
+
+    def __call__(self, position: Union[int, Tuple[int, int]], record, error: Exception) -> None:
+        self._count += 1
+        if len(self._errors) < self._max_stored:
+            self._errors.append((position, record, error))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __str__(self) -> str:
+        return '\n'.join(f'{position}: {error}' for position, _, error in self._errors)
+
+    @property
+    def count(self) -> int:
+        """
+        Общее количество ошибок
+        """
+        return self._count
+
+    @property
+    def errors(self) -> List[Tuple[Union[int, Tuple[int, int]], object, Exception]]:
+        """
+        Первые max_stored ошибок
+        """
+        return self._errors
+
+
+ErrorSink = Callable[[Union[int, Tuple[int, int]], object, Exception], None]
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(text: str) -> date:
+    """
+    Быстрый разбор даты в формате dd:mm:yy (тот же результат, что и strptime(text, '%d:%m:%y').date():
+    день и месяц - одна или две цифры, год - две цифры, 69..99 -> 19xx, 00..68 -> 20xx).
+    В журнале мало различных дат, поэтому результаты кэшируются.
+    """
+    if not isinstance(text, str):
+        raise TypeError(f"date {text!r} is not a string in format dd:mm:yy")
+    parts = text.split(':')
+    if len(parts) != 3:
+        raise ValueError(f"date \"{text}\" does not match format dd:mm:yy")
+    day, month, year = parts
+    if not (0 < len(day) <= 2 and 0 < len(month) <= 2 and len(year) == 2
+            and day.isdigit() and month.isdigit() and year.isdigit()):
+        raise ValueError(f"date \"{text}\" does not match format dd:mm:yy")
+    year = int(year)
+    return date(year + (2000 if year < 69 else 1900), int(month), int(day))
+
+
+def _parse_csv_row(line: List[str]) -> Tuple[int, str, str, int, int, LabWorkSession]:
+    """
+    Разбор строки csv файла: (unique_id, name, surname, group, subgroup, session)
+    """
+    presence = int(line[STUD_PRESENCE]) == 1
+    lab_work_number, lab_work_mark = int(line[LAB_WORK_NUMBER]), int(line[LAB_WORK_MARK])
+    lab_work_date = _parse_date(line[LAB_WORK_DATE])
+    # типы гарантированы разбором, остаётся проверить значения
+    if not LabWorkSession._validate_values(presence, lab_work_mark):
+        raise LabWorkSession._args_error(presence, lab_work_number, lab_work_mark, lab_work_date)
+    return (int(line[UNIQUE_ID]), line[STUD_NAME], line[STUD_SURNAME], int(line[STUD_GROUP]),
+            int(line[STUD_SUBGROUP]), LabWorkSession._trusted(presence, lab_work_number, lab_work_mark, lab_work_date))
+
+
+def _parsed_student(unique_id: int, name: str, surname: str, group: int, subgroup: int) -> Student:
+    """
+    Студент из разобранной строки csv: типы гарантированы _parse_csv_row, проверяются только значения
+    """
+    if not Student._validate_values(group, subgroup):
+        raise Student._args_error(unique_id, name, surname, group, subgroup)
+    return Student._trusted(unique_id, name, surname, group, subgroup)
+
+
+def _iter_csv_rows(file_path: str, errors: ErrorSink):
+    """
+    Итератор по разобранным строкам csv файла (без заголовка): (номер строки в файле, разобранная строка).
+    Строка читается, разбирается и отдаётся сразу, в памяти одновременно находится одна строка.
+    Некорректные строки передаются в errors (номер строки в файле, считая заголовок первой строкой)
+    и пропускаются.
+    """
+    with open(file_path, 'r', encoding='utf-8') as input_file:
+        csv_reader = csv.reader(input_file, delimiter=';')
+        next(csv_reader, None)
+        for line in csv_reader:
+            try:
+                yield csv_reader.line_num, _parse_csv_row(line)
+            except (ValueError, IndexError) as ex:
+                errors(csv_reader.line_num, line, ex)
+
+
+def iter_students_csv(file_path: str, errors: Union[ErrorSink, None] = None,
+                      batch_size: Union[int, None] = None) -> Iterator[Union[Student, List[Student]]]:
+    """
+    Потоковое чтение студентов из csv файла: студент отдаётся, как только закончились идущие подряд
+    строки с его unique_id (так записывает save_students_csv), поэтому в памяти находится только текущий
+    студент (или текущий пакет). Строки студента, который уже был отдан, считаются ошибкой и передаются
+    в errors; для файлов с перемешанными строками используйте load_students_csv.
+    :param file_path: путь к csv файлу
+    :param errors: приёмник ошибок (например, LoadErrors); по умолчанию ошибки только считаются
+    :param batch_size: если задан, отдаются списки не более чем из batch_size студентов
+    :return: итератор по студентам (или по спискам студентов)
+    """
+    assert isinstance(file_path, str)
+    if errors is None:
+        errors = LoadErrors()
+    if batch_size is not None and batch_size < 1:
+        raise ValueError("batch_size должно быть целым числом большим или равным 1")
+    finished = set()
+    student: Union[Student, None] = None
+    batch: List[Student] = []
+    for line_number, (unique_id, name, surname, group, subgroup, session) in _iter_csv_rows(file_path, errors):
+        if student is None or student.unique_id != unique_id:
+            if unique_id in finished:
+                errors(line_number, unique_id, ValueError(f"rows of student {unique_id} are not contiguous"))
+                continue
+            if student is not None:
+                finished.add(student.unique_id)
+                if batch_size is None:
+                    yield student
+                else:
+                    batch.append(student)
+                    if len(batch) == batch_size:
+                        yield batch
+                        batch = []
+            try:
+                student = _parsed_student(unique_id, name, surname, group, subgroup)
+            except ValueError as ex:
+                errors(line_number, unique_id, ex)
+                student = None
+                continue
+        student.append_lab_work_session(session)
+    if student is not None:
+        if batch_size is None:
+            yield student
+        else:
+            batch.append(student)
+    if batch:
+        yield batch
+
+
+def load_students_csv(file_path: str, errors: Union[ErrorSink, None] = None,
+                      store: Union[SessionStore, None] = None) -> Union[List[Student], None]:
+    """
+    Загрузка списка студентов из csv файла (строки одного студента могут идти в любом порядке).
+    Некорректные строки передаются в errors (например, LoadErrors) с номером строки в файле и пропускаются.
+    Если задан store, занятия студентов хранятся в нём (студенты подключаются к хранилищу).
+    """
     # csv header
     #     0    |   1  |   2   |   3  |    4    |  5  |    6    |        7       |       8     |
     # unique_id; name; surname; group; subgroup; date; presence; lab_work_number; lab_work_mark
     assert isinstance(file_path, str)
     if not os.path.exists(file_path):
         return None
+    if errors is None:
+        errors = LoadErrors()
 
     students_raw: Dict[int, Student] = {}
-
-    with open(file_path, 'r', encoding='utf-8') as input_file:
-        csv_reader = csv.reader(input_file, delimiter=';')
-        next(csv_reader)
-
-        for line in csv_reader:
+    for line_number, (unique_id, name, surname, group, subgroup, session) in _iter_csv_rows(file_path, errors):
+        student = students_raw.get(unique_id)
+        if student is None:
             try:
-                unique_id = int(line[0])
-                name = line[2]
-                surname = line[1]
-                group = int(line[3])
-                subgroup = int(line[4])
-                presence = True if int(line[6]) == 1 else False
-                lab_work_number = int(line[7])
-                lab_work_mark = int(line[8])
-                lab_work_date = datetime.datetime.strptime(line[5], '%d:%m:%y').date()
-
-                if unique_id not in students_raw:
-
-                    students_raw[unique_id] = Student(unique_id, name, surname, group, subgroup)
-
-                session = LabWorkSession(presence, lab_work_number, lab_work_mark, lab_work_date)
-                students_raw[unique_id].append_lab_work_session(session)
-            except Exception as ex:
-                print(f"Ошибка при обработке строки: {ex}")
+                student = students_raw[unique_id] = _parsed_student(unique_id, name, surname, group, subgroup)
+            except ValueError as ex:
+                errors(line_number, (unique_id, name, surname, group, subgroup), ex)
                 continue
+            if store is not None:
+                store.attach(student)
+        student.append_lab_work_session(session)
     return list(students_raw.values())
 
-def load_students_json(file_path: str) -> Union[List[Student], None]:
+
+class StudentRepository:
+    """
+    Контейнер студентов с индексами:
+    unique_id -> студент (хэш-таблица),
+    (group, subgroup) -> студенты (хэш-таблица),
+    (surname, unique_id) - упорядоченный список для запросов по диапазону и префиксу фамилии.
+    Индексы обновляются при добавлении и удалении студентов и при изменении unique_id, surname, group
+    и subgroup через свойства Student. Студент может находиться только в одном репозитории.
+    """
+
+    def __init__(self, students: Union[List[Student], None] = None):
+        self._by_id: Dict[int, Student] = {}
+        # значения - словари unique_id -> студент: удаление за O(1), порядок добавления сохраняется
+        self._by_group: Dict[Tuple[int, int], Dict[int, Student]] = {}
+        self._surnames: List[Tuple[str, int]] = []
+        if students is not None:
+            self.extend(students)
+
+    @classmethod
+    def from_csv(cls, file_path: str, errors: Union['ErrorSink', None] = None,
+                 store: Union[SessionStore, None] = None) -> Union['StudentRepository', None]:
+        """
+        Загрузка студентов из csv файла сразу в репозиторий (см. load_students_csv)
+        """
+        students = load_students_csv(file_path, errors, store)
+        return None if students is None else cls(students)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __contains__(self, unique_id: int) -> bool:
+        return unique_id in self._by_id
+
+    def __getitem__(self, unique_id: int) -> Student:
+        return self._by_id[unique_id]
+
+    def get(self, unique_id: int) -> Union[Student, None]:
+        return self._by_id.get(unique_id)
+
+    def add(self, student: Student) -> None:
+        """
+        Добавление студента (unique_id должен быть уникальным)
+        """
+        if not isinstance(student, Student):
+            raise ValueError(f'StudentRepository :: {student} is not a Student')
+        if student._repository is not None:
+            raise ValueError(f'StudentRepository :: student {student.unique_id} already belongs to a repository')
+        if student.unique_id in self._by_id:
+            raise ValueError(f'StudentRepository :: duplicate unique_id {student.unique_id}')
+        self._index(student)
+        student._repository = self
+
+    def extend(self, students: List[Student]) -> None:
+        """
+        Добавление нескольких студентов: индекс фамилий сортируется один раз, а не вставкой каждого студента
+        """
+        added = []
+        try:
+            for student in students:
+                if not isinstance(student, Student):
+                    raise ValueError(f'StudentRepository :: {student} is not a Student')
+                if student._repository is not None:
+                    raise ValueError(f'StudentRepository :: student {student.unique_id} '
+                                     f'already belongs to a repository')
+                if student.unique_id in self._by_id:
+                    raise ValueError(f'StudentRepository :: duplicate unique_id {student.unique_id}')
+                self._by_id[student.unique_id] = student
+                self._by_group.setdefault((student.group, student.subgroup), {})[student.unique_id] = student
+                student._repository = self
+                added.append(student)
+        except ValueError:
+            for student in added:
+                del self._by_id[student.unique_id]
+                del self._by_group[(student.group, student.subgroup)][student.unique_id]
+                student._repository = None
+            self._by_group = {key: value for key, value in self._by_group.items() if value}
+            raise
+        self._surnames.extend((student.surname, student.unique_id) for student in added)
+        self._surnames.sort()
+
+    def remove(self, unique_id: int) -> Student:
+        """
+        Удаление студента по unique_id
+        """
+        student = self._by_id[unique_id]
+        self._unindex(student)
+        student._repository = None
+        return student
+
+    def by_group(self, group: int, subgroup: Union[int, None] = None) -> List[Student]:
+        """
+        Студенты группы (и подгруппы, если задана)
+        """
+        if subgroup is not None:
+            return list(self._by_group.get((group, subgroup), {}).values())
+        return [student for key, students in self._by_group.items() if key[0] == group
+                for student in students.values()]
+
+    def by_surname_range(self, low: str, high: str) -> List[Student]:
+        """
+        Студенты с фамилией из диапазона low <= surname < high, упорядоченные по фамилии
+        """
+        start = bisect_left(self._surnames, (low,))
+        stop = bisect_left(self._surnames, (high,))
+        return [self._by_id[unique_id] for _, unique_id in self._surnames[start: stop]]
+
+    def by_surname_prefix(self, prefix: str) -> List[Student]:
+        """
+        Студенты, фамилия которых начинается с prefix, упорядоченные по фамилии
+        """
+        if len(prefix) == 0:
+            return [self._by_id[unique_id] for _, unique_id in self._surnames]
+        return self.by_surname_range(prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+    def _index(self, student: Student) -> None:
+        self._by_id[student.unique_id] = student
+        self._by_group.setdefault((student.group, student.subgroup), {})[student.unique_id] = student
+        insort(self._surnames, (student.surname, student.unique_id))
+
+    def _unindex(self, student: Student) -> None:
+        del self._by_id[student.unique_id]
+        key = (student.group, student.subgroup)
+        del self._by_group[key][student.unique_id]
+        if not self._by_group[key]:
+            del self._by_group[key]
+        del self._surnames[bisect_left(self._surnames, (student.surname, student.unique_id))]
+
+    def _check_unique_id(self, student: Student, unique_id: int) -> None:
+        if unique_id != student.unique_id and unique_id in self._by_id:
+            raise ValueError(f'StudentRepository :: duplicate unique_id {unique_id}')
+
+    def _reindex(self, student: Student, slot: str, value) -> None:
+        """
+        Изменение индексируемого поля студента slot ('_unique_id', '_surname', '_group', '_subgroup')
+        """
+        if slot == '_unique_id':
+            self._check_unique_id(student, value)
+        self._unindex(student)
+        setattr(student, slot, value)
+        self._index(student)
+
+
+def repository_benchmark(n_students: int = 100000, n_queries: int = 1000):
+    """
+    Время поиска студентов по unique_id, группе и префиксу фамилии: линейный просмотр списка
+    против индексов StudentRepository
+    """
+    students = [Student(unique_id, 'Имя', f'Фамилия{unique_id:06d}', 6407 + unique_id % 3, 1 + unique_id % 2)
+                for unique_id in range(n_students)]
+    t_0 = time.perf_counter()
+    repository = StudentRepository(students)
+    t_build = time.perf_counter() - t_0
+    ids = [(i * 7919) % n_students for i in range(n_queries)]
+    prefixes = [f'Фамилия{i % 1000:03d}' for i in range(n_queries)]
+    queries = (('unique_id', lambda i: [s for s in students if s.unique_id == ids[i]],
+                lambda i: repository.get(ids[i])),
+               ('group', lambda i: [s for s in students if s.group == 6408 and s.subgroup == 1],
+                lambda i: repository.by_group(6408, 1)),
+               ('prefix', lambda i: [s for s in students if s.surname.startswith(prefixes[i])],
+                lambda i: repository.by_surname_prefix(prefixes[i])))
+    print(f"{n_students} students, repository built in {t_build * 1e3:.3f} ms, time per query:")
+    for name, scan, indexed in queries:
+        n_scans = max(n_queries // 100, 1)
+        t_0 = time.perf_counter()
+        for i in range(n_scans):
+            scan(i)
+        t_scan = (time.perf_counter() - t_0) / n_scans
+        t_0 = time.perf_counter()
+        for i in range(n_queries):
+            indexed(i)
+        t_indexed = (time.perf_counter() - t_0) / n_queries
+        print(f"{name:9s}: scan {t_scan * 1e6:12.1f} us, index {t_indexed * 1e6:10.1f} us")
+
+
+def csv_load_benchmark(n_students: int = 20000, n_labs: int = 50, file_path: str = "benchmark_students.csv"):
+    """
+    Скорость разбора дат (strptime против _parse_date) и чтения csv файла (строк в секунду)
+    на синтетическом журнале из n_students * n_labs строк.
+    """
+    with open(file_path, 'w', newline='', encoding='utf-8') as output_file:
+        writer = csv.writer(output_file, delimiter=';')
+        writer.writerow(['unique_id', 'name', 'surname', 'group', 'subgroup',
+                         'date', 'presence', 'lab_work_n', 'lab_work_mark'])
+        for unique_id in range(n_students):
+            for lab in range(n_labs):
+                writer.writerow([unique_id, f'Имя{unique_id}', f'Фамилия{unique_id}', 6407 + unique_id % 3,
+                                 1 + unique_id % 2, f'{1 + lab % 28}:{1 + lab % 12}:23', 1, lab, lab % 6])
+    n_rows = n_students * n_labs
+    try:
+        dates = [f'{1 + i % 28}:{1 + i % 12}:23' for i in range(n_rows)]
+        t_0 = time.perf_counter()
+        for text in dates:
+            datetime.datetime.strptime(text, '%d:%m:%y').date()
+        t_strptime = time.perf_counter() - t_0
+        t_0 = time.perf_counter()
+        for text in dates:
+            _parse_date(text)
+        t_parse = time.perf_counter() - t_0
+        print(f"dates: strptime {n_rows / t_strptime:12.0f} rows/s, _parse_date {n_rows / t_parse:12.0f} rows/s")
+
+        t_0 = time.perf_counter()
+        load_students_csv(file_path)
+        t_load = time.perf_counter() - t_0
+        t_0 = time.perf_counter()
+        n_loaded = sum(1 for _ in iter_students_csv(file_path))
+        t_stream = time.perf_counter() - t_0
+        print(f"load_students_csv: {n_rows / t_load:12.0f} rows/s")
+        print(f"iter_students_csv: {n_rows / t_stream:12.0f} rows/s, {n_loaded} students")
+    finally:
+        os.remove(file_path)
+
+
+class _JsonStream:
+    """
+    Чтение json файла частями: буфер содержит только ещё не разобранный текст
+    """
+    __slots__ = ('_file', '_buffer', '_position', '_chunk_size', '_eof')
+
+    _WHITESPACE = ' \t\n\r'
+
+    def __init__(self, file, chunk_size: int):
+        self._file = file
+        self._buffer = ''
+        self._position = 0
+        self._chunk_size = chunk_size
+        self._eof = False
+
+    def _read(self) -> bool:
+        """
+        Дочитывает следующую часть файла (разобранный текст из буфера отбрасывается)
+        """
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Следующий непробельный символ ('' в конце файла)
+        """
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in self._WHITESPACE:
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                return ''
+
+    def expect(self, symbol: str) -> None:
+        found = self.peek()
+        if found != symbol:
+            raise json.JSONDecodeError(f"Expecting '{symbol}'", found, 0)
+        self._position += 1
+
+    def value(self, decoder: json.JSONDecoder):
+        """
+        Следующее значение json целиком; буфер дочитывается, пока значения в нём нет полностью
+        (каждый раз читается вдвое больше, поэтому большое значение разбирается за линейное время)
+        """
+        self.peek()
+        chunk_size = self._chunk_size
+        while True:
+            try:
+                value, end = decoder.raw_decode(self._buffer, self._position)
+                # число в конце буфера может продолжаться в следующей части
+                if end < len(self._buffer) or self._eof or not isinstance(value, (int, float)):
+                    self._position = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._chunk_size *= 2
+            self._read()
+            self._chunk_size = chunk_size
+
+
+def iter_students_json(file_path: str, errors: Union[ErrorSink, None] = None,
+                       chunk_size: int = 1 << 16) -> Iterator[Student]:
+    """
+    Потоковое чтение студентов из json файла: массив "students" разбирается поэлементно, студент создаётся
+    и отдаётся сразу после разбора своего элемента, поэтому память не зависит от размера файла
+    (в памяти один элемент и часть файла размером chunk_size).
+    Ошибка создания студента передаётся в errors (номер элемента, элемент, исключение) и не прерывает чтение;
+    ошибки занятий, как и в _load_student, не мешают созданию студента и тоже передаются в errors
+    с позицией (номер элемента, номер занятия).
+    :param file_path: путь к json файлу
+    :param errors: приёмник ошибок (например, LoadErrors); по умолчанию ошибки печатаются
+    :param chunk_size: размер части файла, читаемой за раз (символов)
+    :return: итератор по студентам
+    """
+    assert isinstance(file_path, str)
+    decoder = json.JSONDecoder()
+    with open(file_path, "r", encoding="utf-8") as file:
+        stream = _JsonStream(file, chunk_size)
+        stream.expect('{')
+        while stream.peek() != '}':
+            key = stream.value(decoder)
+            stream.expect(':')
+            if key != 'students':
+                stream.value(decoder)
+            else:
+                stream.expect('[')
+                index = 0
+                while stream.peek() != ']':
+                    if index:
+                        stream.expect(',')
+                    node = stream.value(decoder)
+                    try:
+                        student = _load_student(node, errors, index)
+                    except (KeyError, ValueError, TypeError) as exc:
+                        if errors is None:
+                            print(exc)
+                        else:
+                            errors(index, node, exc)
+                    else:
+                        yield student
+                    index += 1
+                stream.expect(']')
+            if stream.peek() == ',':
+                stream.expect(',')
+
+
+def load_students_json(file_path: str, errors: Union[ErrorSink, None] = None) -> Union[List[Student], None]:
     """
     Загрузка списка студентов из json файла.
     Ошибка создания экземпляра класса Student не должна приводить к поломке всего чтения.
+    Файл разбирается потоково (iter_students_json), дерево json целиком в памяти не строится.
     """
     assert isinstance(file_path, str)  # Путь к файлу должен быть строкой
     if not os.path.exists(file_path):  # и, желательно, существовать...
         print('Файла не существует')
         return None
-    students = []
-    with open(file_path, "r", encoding="utf-8") as file:
-        data = json.load(file)
-        for student in data['students']:
-            students.append(_load_student(student))
-    return students
+    return list(iter_students_json(file_path, errors))
+
+
+def json_read_benchmark(n_students: int = 20000, n_labs: int = 20, file_path: str = "benchmark_students.json"):
+    """
+    Время и пиковая память чтения json файла: json.load всего файла против iter_students_json
+    (студенты не сохраняются, чтобы измерить память самого чтения)
+    """
+    import tracemalloc
+    lab_dates = [date(2023, 1 + lab % 12, 1 + lab % 28) for lab in range(n_labs)]
+    students = (Student(unique_id, 'Имя', 'Фамилия', 6407 + unique_id % 3, 1 + unique_id % 2)
+                for unique_id in range(n_students))
+
+    def with_sessions(student: Student) -> Student:
+        for lab in range(n_labs):
+            student.append_lab_work_session(LabWorkSession(True, lab, lab % 6, lab_dates[lab]))
+        return student
+
+    with open(file_path, 'w', encoding='utf-8') as output_file:
+        write_students_json(output_file, map(with_sessions, students))
+    print(f"{n_students} students x {n_labs} sessions, {os.path.getsize(file_path) / 2 ** 20:.2f} MiB:")
+    try:
+        def dom():
+            with open(file_path, "r", encoding="utf-8") as file:
+                for node in json.load(file)['students']:
+                    _load_student(node)
+
+        def stream():
+            for _ in iter_students_json(file_path):
+                pass
+
+        for name, reader in (("json.load           ", dom), ("iter_students_json  ", stream)):
+            tracemalloc.start()
+            t_0 = time.perf_counter()
+            reader()
+            elapsed = time.perf_counter() - t_0
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{name}: {elapsed * 1e3:9.3f} ms, peak memory {peak / 2 ** 20:8.2f} MiB")
+    finally:
+        os.remove(file_path)
+
 
 # def save_students_json(file_path: str, students: List[Student]) -> bool:
 #     """
@@ -381,15 +1296,83 @@ def load_students_json(file_path: str) -> Union[List[Student], None]:
 #         print(f'Ошибка при записи в JSON файл: {exc}')
 #         return False
 
-def save_students_json(file_path: str, students: List[Student]) -> None:
+@lru_cache(maxsize=4096)
+def _format_day(day: int) -> str:
+    """
+    Дата (номер дня, date.toordinal()) в формате dd:mm:yy, как strftime("%d:%m:%y"), с кэшированием
+    """
+    value = date.fromordinal(day)
+    return f'{value.day:02d}:{value.month:02d}:{value.year % 100:02d}'
+
+
+def _session_rows(student: Student):
+    """
+    Занятия студента в виде кортежей (присутствие 0/1, номер л.р., оценка, дата dd:mm:yy).
+    Для студента из SessionStore значения берутся из столбцов без создания LabWorkSession.
+    """
+    sessions = student.lab_work_sessions
+    if isinstance(sessions, SessionView):
+        return zip(sessions.presence.astype(np.int8).tolist(), sessions.lab_work_number.tolist(),
+                   sessions.lab_work_mark.tolist(), map(_format_day, sessions.day.tolist()))
+    return ((1 if session.presence else 0, session.lab_work_number, session.lab_work_mark,
+             _format_day(session.lab_work_date.toordinal())) for session in sessions)
+
+
+def write_students_json(output_file, students, compact: bool = False) -> int:
+    """
+    Потоковая запись студентов в json: каждый студент сериализуется и записывается в файл сразу,
+    поэтому память не зависит от количества студентов (students может быть генератором,
+    например iter_students_csv). Строки экранируются по правилам json.
+    Формат с отступами совпадает с прежним форматом save_students_json (Student.__str__).
+    :param output_file: открытый на запись текстовый файл
+    :param students: итерируемый набор студентов
+    :param compact: запись без отступов и переводов строк
+    :return: количество записанных студентов
+    """
+    if compact:
+        head, separator, tail = '{"students":[', ',', ']}'
+        student_format = '{{"unique_id":{},"name":{},"surname":{},"group":{},"subgroup":{},' \
+                         '"lab_works_sessions":[{}]}}'
+        session_format = '{{"presence":{},"lab_work_n":{},"lab_work_mark":{},"lab_work_date":"{}"}}'
+        session_separator = ','
+    else:
+        head, separator, tail = '{\n\t"students":[\n', ',\n', ']\n}'
+        student_format = '\t{{\n' \
+                         '\t\t"unique_id":          {},\n' \
+                         '\t\t"name":               {},\n' \
+                         '\t\t"surname":            {},\n' \
+                         '\t\t"group":              {},\n' \
+                         '\t\t"subgroup":           {},\n' \
+                         '\t\t"lab_works_sessions": [\n{}]\n' \
+                         '\t}}'
+        session_format = '\t\t{{\n' \
+                         '\t\t\t"presence":      {},\n' \
+                         '\t\t\t"lab_work_n":    {},\n' \
+                         '\t\t\t"lab_work_mark": {},\n' \
+                         '\t\t\t"lab_work_date": "{}"\n' \
+                         '\t\t}}'
+        session_separator = ',\n'
+    output_file.write(head)
+    count = 0
+    for student in students:
+        sessions = session_separator.join([session_format.format(*row) for row in _session_rows(student)])
+        if count:
+            output_file.write(separator)
+        output_file.write(student_format.format(student.unique_id, encode_basestring(student.name),
+                                                encode_basestring(student.surname), student.group,
+                                                student.subgroup, sessions))
+        count += 1
+    output_file.write(tail)
+    return count
+
+
+def save_students_json(file_path: str, students: List[Student], compact: bool = False) -> None:
     """
-    Запись списка студентов в json файл
+    Запись списка студентов в json файл (см. write_students_json)
     """
     try:
         with open(file_path, 'w', encoding='utf-8') as output_file:
-            output_file.write('{\n\t"students":[\n')
-            output_file.write(',\n'.join(str(i) for i in students))
-            output_file.write(']\n}')
+            write_students_json(output_file, students, compact)
             print('Запись в JSON файл прошла успешно')
             return None
 
@@ -398,6 +1381,46 @@ def save_students_json(file_path: str, students: List[Student]) -> None:
         return None
 
 
+def json_write_benchmark(n_students: int = 20000, n_labs: int = 20, file_path: str = "benchmark_students.json"):
+    """
+    Время записи json файла: прежний путь (строка всего документа из Student.__str__) против
+    write_students_json с отступами и без, для студентов со списками LabWorkSession и из SessionStore
+    """
+    lab_dates = [date(2023, 1 + lab % 12, 1 + lab % 28) for lab in range(n_labs)]
+    students = [Student(unique_id, 'Имя "в кавычках"', 'Фамилия', 6407 + unique_id % 3, 1 + unique_id % 2)
+                for unique_id in range(n_students)]
+    for student in students:
+        for lab in range(n_labs):
+            student.append_lab_work_session(LabWorkSession(True, lab, lab % 6, lab_dates[lab]))
+    stored = [Student(unique_id, 'Имя', 'Фамилия', 6407 + unique_id % 3, 1 + unique_id % 2)
+              for unique_id in range(n_students)]
+    store = SessionStore(n_students * n_labs)
+    for student in students:
+        for session in student.lab_work_sessions:
+            store.append(student.unique_id, session)
+    for student in stored:
+        student.lab_work_sessions = store
+
+    def previous(output_file, items, compact):
+        output_file.write('{\n\t"students":[\n')
+        output_file.write(',\n'.join(str(i) for i in items))
+        output_file.write(']\n}')
+
+    print(f"{n_students} students x {n_labs} sessions:")
+    try:
+        for name, writer, items, compact in (("Student.__str__ document  ", previous, students, False),
+                                             ("streaming, indented       ", write_students_json, students, False),
+                                             ("streaming, compact        ", write_students_json, students, True),
+                                             ("streaming, compact, store ", write_students_json, stored, True)):
+            t_0 = time.perf_counter()
+            with open(file_path, 'w', encoding='utf-8') as output_file:
+                writer(output_file, items, compact)
+            elapsed = time.perf_counter() - t_0
+            print(f"{name}: {elapsed * 1e3:9.3f} ms, {os.path.getsize(file_path) / 2 ** 20:7.2f} MiB")
+    finally:
+        os.remove(file_path)
+
+
 def save_students_csv(file_path: str, students: List[Student]) -> bool:
     """
     Запись списка студентов в csv файл
@@ -413,7 +1436,7 @@ def save_students_csv(file_path: str, students: List[Student]) -> bool:
 
             for student in students:
                 if student._lab_work_sessions is not None:
-                    for session in student._lab_work_sessions:
+                    for session in student.lab_work_sessions:
                         writer.writerow([
                             student._unique_id, student._name, student._surname,
                             student._group, student._subgroup, session.lab_work_date.strftime("%d:%m:%y"),
@@ -425,6 +1448,84 @@ def save_students_csv(file_path: str, students: List[Student]) -> bool:
         print(f'Ошибка при записи в CSV файл: {exc}')
         return False
 
+def session_store_benchmark(n_students: int = 20000, n_labs: int = 50):
+    """
+    Память на занятие и время вычисления средней оценки: списки LabWorkSession против SessionStore
+    """
+    import tracemalloc
+    lab_dates = [date(2023, 1 + lab % 12, 1 + lab % 28) for lab in range(n_labs)]
+    n_sessions = n_students * n_labs
+
+    tracemalloc.start()
+    students = [Student(unique_id, 'Имя', 'Фамилия', 6407 + unique_id % 3, 1 + unique_id % 2)
+                for unique_id in range(n_students)]
+    base = tracemalloc.get_traced_memory()[0]
+    for student in students:
+        for lab in range(n_labs):
+            student.append_lab_work_session(LabWorkSession(True, lab, lab % 6, lab_dates[lab]))
+    objects_memory = tracemalloc.get_traced_memory()[0] - base
+    t_0 = time.perf_counter()
+    mean_objects = sum(s.lab_work_mark for student in students for s in student.lab_work_sessions) / n_sessions
+    t_objects = time.perf_counter() - t_0
+
+    base = tracemalloc.get_traced_memory()[0]
+    store = SessionStore(n_sessions)
+    store.extend(np.repeat(np.arange(n_students), n_labs), np.tile(np.arange(n_labs), n_students),
+                 np.tile(np.arange(n_labs) % 6, n_students), np.ones(n_sessions, dtype=bool),
+                 np.tile([day.toordinal() for day in lab_dates], n_students))
+    store_memory = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    store.sessions(0)
+    t_0 = time.perf_counter()
+    mean_store = store.columns['lab_work_mark'].mean()
+    t_store = time.perf_counter() - t_0
+
+    print(f"{n_sessions} sessions:")
+    print(f"LabWorkSession lists: {objects_memory / n_sessions:6.1f} bytes/session,"
+          f" mean mark {mean_objects:.3f} in {t_objects * 1e3:9.3f} ms")
+    print(f"SessionStore        : {store_memory / n_sessions:6.1f} bytes/session,"
+          f" mean mark {mean_store:.3f} in {t_store * 1e3:9.3f} ms")
+
+
+def construction_benchmark(n_students: int = 20000, n_labs: int = 50):
+    """
+    Время создания студентов и занятий: конструкторы с проверкой каждого объекта против
+    векторной проверки столбцов и создания без проверки
+    """
+    lab_dates = [date(2023, 1 + lab % 12, 1 + lab % 28) for lab in range(n_labs)]
+    unique_id = np.arange(n_students)
+    group, subgroup = 6407 + unique_id % 3, 1 + unique_id % 2
+    names, surnames = ['Имя'] * n_students, ['Фамилия'] * n_students
+    n_sessions = n_students * n_labs
+    presence = np.ones(n_sessions, dtype=bool)
+    number = np.tile(np.arange(n_labs), n_students)
+    mark = number % 6
+    day = np.tile([lab_date.toordinal() for lab_date in lab_dates], n_students)
+
+    t_0 = time.perf_counter()
+    for values in zip(unique_id.tolist(), names, surnames, group.tolist(), subgroup.tolist()):
+        Student(*values)
+    t_student = time.perf_counter() - t_0
+    t_0 = time.perf_counter()
+    build_students(unique_id, names, surnames, group, subgroup)
+    t_build = time.perf_counter() - t_0
+
+    dates = [lab_dates[lab] for lab in number.tolist()]
+    t_0 = time.perf_counter()
+    for values in zip(presence.tolist(), number.tolist(), mark.tolist(), dates):
+        LabWorkSession(*values)
+    t_session = time.perf_counter() - t_0
+    t_0 = time.perf_counter()
+    if validate_session_columns(presence, number, mark, day).all():
+        for values in zip(presence.tolist(), number.tolist(), mark.tolist(), dates):
+            LabWorkSession._trusted(*values)
+    t_trusted = time.perf_counter() - t_0
+
+    print(f"{n_students} students: Student {t_student * 1e3:9.3f} ms, build_students {t_build * 1e3:9.3f} ms")
+    print(f"{n_sessions} sessions: LabWorkSession {t_session * 1e3:9.3f} ms,"
+          f" validate_session_columns + _trusted {t_trusted * 1e3:9.3f} ms")
+
+
 if __name__ == '__main__':
     students = load_students_csv("students.csv")
     save_students_json("saved_students.json", students)
@@ -0,0 +1,216 @@
+"""
+Сводная статистика журнала по группам, подгруппам и номерам лабораторных работ.
+Занятия всех студентов берутся столбцами (SessionStore.columns), группировка - по целым ключам:
+каждый ключ переводится в плотный код 0..n-1, составной код считается в смешанной системе счисления,
+агрегаты - np.bincount по составному коду (без сортировки занятий).
+Опоздания считаются относительно срока сдачи своей группы: группы занимаются по разному расписанию.
+"""
+from typing import Union, List, Tuple, Dict, Sequence
+from datetime import date
+import time
+import numpy as np
+from Student_Class import Student, SessionStore
+
+
+GROUP_KEYS = ('group', 'subgroup', 'lab_work_number')
+
+
+def _dense_codes(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Плотные коды целых значений: (коды, значения по кодам).
+    Для небольшого диапазона значений код - сдвиг на минимум (без сортировки), иначе - np.unique.
+    """
+    if values.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    low, high = int(values.min()), int(values.max())
+    if high - low < max(values.size, 1 << 16):
+        return values.astype(np.int64) - low, np.arange(low, high + 1, dtype=np.int64)
+    uniques, codes = np.unique(values, return_inverse=True)
+    return codes, uniques
+
+
+def session_columns(students: List[Student]) -> Dict[str, np.ndarray]:
+    """
+    Столбцы занятий студентов: unique_id, group, subgroup, lab_work_number, lab_work_mark, presence, day.
+    Если все студенты подключены к одному SessionStore, столбцы занятий берутся из него без копирования,
+    а группа и подгруппа сопоставляются занятиям поиском id студента; иначе занятия собираются из объектов.
+    """
+    unique_ids = np.fromiter((student.unique_id for student in students), dtype=np.int64, count=len(students))
+    groups = np.fromiter((student.group for student in students), dtype=np.int64, count=len(students))
+    subgroups = np.fromiter((student.subgroup for student in students), dtype=np.int64, count=len(students))
+    stores = {id(student.session_store): student.session_store for student in students}
+
+    if len(stores) == 1 and None not in stores.values():
+        columns = dict(next(iter(stores.values())).columns)
+    else:
+        store = SessionStore()
+        for student in students:
+            for session in student.lab_work_sessions:
+                store.append(student.unique_id, session)
+        columns = dict(store.columns)
+
+    order = np.argsort(unique_ids, kind='stable')
+    sorted_ids = unique_ids[order]
+    position = np.minimum(np.searchsorted(sorted_ids, columns['unique_id']), max(sorted_ids.size - 1, 0))
+    known = sorted_ids[position] == columns['unique_id'] if sorted_ids.size else \
+        np.zeros(columns['unique_id'].size, dtype=bool)
+    if not known.all():
+        # в хранилище могут быть занятия студентов, которых нет в списке
+        columns = {key: value[known] for key, value in columns.items()}
+        position = position[known]
+    columns['group'] = groups[order][position]
+    columns['subgroup'] = subgroups[order][position]
+    return columns
+
+
+def default_deadlines(columns: Dict[str, np.ndarray]) -> Dict[Tuple[int, int], int]:
+    """
+    Срок сдачи каждой лабораторной работы в каждой группе по умолчанию - самый ранний день, в который её сдавали
+    студенты этой группы, присутствовавшие на занятии (номер дня, date.toordinal())
+    :return: {(группа, номер л.р.): номер дня}
+    """
+    group_codes, groups = _dense_codes(columns['group'])
+    lab_codes, numbers = _dense_codes(columns['lab_work_number'])
+    present = columns['presence'].astype(bool)
+    codes = (group_codes * numbers.size + lab_codes)[present]
+    days = columns['day'][present]
+    if days.size == 0:
+        return {}
+    n_codes = groups.size * numbers.size
+    first_day = int(days.min())
+    span = int(days.max()) - first_day + 1
+    if n_codes * span <= 1 << 24:
+        # гистограмма ((группа, л.р.), день): первый непустой день в каждой строке
+        histogram = np.bincount(codes * span + (days - first_day), minlength=n_codes * span)
+        histogram = histogram.reshape(n_codes, span) != 0
+        submitted = histogram.any(axis=1)
+        earliest = np.argmax(histogram, axis=1) + first_day
+    else:
+        earliest = np.full(n_codes, np.iinfo(np.int64).max)
+        np.minimum.at(earliest, codes, days)
+        submitted = earliest != np.iinfo(np.int64).max
+    keys = np.flatnonzero(submitted)
+    return dict(zip(zip(groups[keys // numbers.size].tolist(), numbers[keys % numbers.size].tolist()),
+                    earliest[submitted].tolist()))
+
+
+def _deadline_table(deadlines: Dict[Union[int, Tuple[int, int]], Union[date, int]], groups: np.ndarray,
+                    numbers: np.ndarray) -> np.ndarray:
+    """
+    Таблица сроков (группа, л.р.) по плотным кодам групп и номеров л.р.: сначала сроки {номер л.р.: срок}
+    для всех групп, затем сроки {(группа, номер л.р.): срок}; без срока занятие не считается опоздавшим
+    """
+    table = np.full((groups.size, numbers.size), np.iinfo(np.int64).max, dtype=np.int64)
+    group_index = {group: index for index, group in enumerate(groups.tolist())}
+    lab_index = {number: index for index, number in enumerate(numbers.tolist())}
+    for key, value in sorted(deadlines.items(), key=lambda item: isinstance(item[0], tuple)):
+        day = value.toordinal() if isinstance(value, date) else int(value)
+        if isinstance(key, tuple):
+            if key[0] in group_index and key[1] in lab_index:
+                table[group_index[key[0]], lab_index[key[1]]] = day
+        elif key in lab_index:
+            table[:, lab_index[key]] = day
+    return table
+
+
+def gradebook_stats(students: List[Student], by: Sequence[str] = ('group',),
+                    deadlines: Union[Dict[Union[int, Tuple[int, int]], Union[date, int]], None] = None,
+                    columns: Union[Dict[str, np.ndarray], None] = None) -> np.ndarray:
+    """
+    Сводная статистика занятий, сгруппированных по ключам by (любые из 'group', 'subgroup', 'lab_work_number').
+    :param students: студенты (лучше подключённые к одному SessionStore)
+    :param by: ключи группировки
+    :param deadlines: сроки сдачи (дата или номер дня) {номер л.р.: срок} для всех групп
+                      и/или {(группа, номер л.р.): срок}; по умолчанию - default_deadlines
+    :param columns: готовый результат session_columns(students) (чтобы не собирать его для каждого запроса)
+    :return: структурированный массив, упорядоченный по ключам: ключи by, sessions - количество занятий,
+             attendance_rate - доля посещённых, mean_mark - средняя оценка за посещённые занятия,
+             late - количество посещённых занятий, сданных позже срока своей группы
+    """
+    by = tuple(by)
+    for key in by:
+        if key not in GROUP_KEYS:
+            raise ValueError(f"gradebook_stats:: unknown group key \"{key}\", expected one of {GROUP_KEYS}")
+    if columns is None:
+        columns = session_columns(students)
+    if deadlines is None:
+        deadlines = default_deadlines(columns)
+
+    # составной код группы в смешанной системе счисления
+    code = np.zeros(columns['day'].size, dtype=np.int64)
+    key_values = []
+    for key in by:
+        key_codes, values = _dense_codes(columns[key])
+        code *= values.size
+        code += key_codes
+        key_values.append(values)
+    n_groups = int(np.prod([values.size for values in key_values], dtype=np.int64)) if by else 1
+
+    # срок сдачи каждого занятия по таблице сроков, индексированной группой и номером л.р.;
+    # пропущенное занятие опозданием не считается
+    group_codes, group_values = _dense_codes(columns['group'])
+    lab_codes, lab_numbers = _dense_codes(columns['lab_work_number'])
+    presence = columns['presence']
+    late = columns['day'] > _deadline_table(deadlines, group_values, lab_numbers)[group_codes, lab_codes]
+    late &= presence
+    sessions = np.bincount(code, minlength=n_groups)
+    attended = np.bincount(code, weights=presence, minlength=n_groups)
+    marks = np.bincount(code, weights=columns['lab_work_mark'] * presence, minlength=n_groups)
+    late_count = np.bincount(code, weights=late, minlength=n_groups)
+
+    groups_present = np.nonzero(sessions)[0]
+    table = np.zeros(groups_present.size, dtype=[(key, np.int64) for key in by] +
+                     [('sessions', np.int64), ('attendance_rate', float), ('mean_mark', float), ('late', np.int64)])
+    remainder = groups_present.copy()
+    for key, values in zip(reversed(by), reversed(key_values)):
+        table[key] = values[remainder % values.size]
+        remainder //= values.size
+    table['sessions'] = sessions[groups_present]
+    table['attendance_rate'] = attended[groups_present] / sessions[groups_present]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        table['mean_mark'] = marks[groups_present] / attended[groups_present]
+    table['late'] = late_count[groups_present]
+    return table
+
+
+def format_stats(table: np.ndarray) -> str:
+    """
+    Текстовая таблица результата gradebook_stats
+    """
+    names = table.dtype.names
+    lines = [' | '.join(f'{name:>15}' for name in names)]
+    for row in table:
+        lines.append(' | '.join(f'{row[name]:15.3f}' if table.dtype[name].kind == 'f' else f'{row[name]:15d}'
+                                for name in names))
+    return '\n'.join(lines)
+
+
+def gradebook_benchmark(n_students: int = 100000, n_labs: int = 10, seed: int = 0):
+    """
+    Время расчёта статистики по группам, подгруппам и л.р. для n_students студентов в одном SessionStore
+    """
+    rng = np.random.default_rng(seed)
+    students = [Student(unique_id, 'Имя', 'Фамилия', 6407 + unique_id % 3, 1 + unique_id % 2)
+                for unique_id in range(n_students)]
+    store = SessionStore(n_students * n_labs)
+    n_sessions = n_students * n_labs
+    start_day = date(2023, 9, 1).toordinal()
+    store.extend(np.repeat(np.arange(n_students), n_labs), np.tile(np.arange(n_labs), n_students),
+                 rng.integers(0, 6, n_sessions), rng.random(n_sessions) < 0.9,
+                 np.tile(start_day + 14 * np.arange(n_labs), n_students) + (rng.random(n_sessions) < 0.2) * 7)
+    for student in students:
+        student.lab_work_sessions = store
+
+    t_0 = time.perf_counter()
+    columns = session_columns(students)
+    t_columns = time.perf_counter() - t_0
+    print(f"{n_students} students, {n_sessions} sessions, columns in {t_columns * 1e3:.3f} ms")
+    for by in (('group',), ('group', 'subgroup'), ('lab_work_number',), GROUP_KEYS):
+        t_0 = time.perf_counter()
+        table = gradebook_stats(students, by, columns=columns)
+        print(f"by {', '.join(by)}: {table.size} rows in {(time.perf_counter() - t_0) * 1e3:.3f} ms")
+    print(format_stats(gradebook_stats(students, ('group', 'subgroup'), columns=columns)))
+
+
+if __name__ == '__main__':
+    gradebook_benchmark()
@@ -0,0 +1,324 @@
+"""
+Двоичный формат журнала (все числа little-endian):
+заголовок      - HEADER: сигнатура, версия, количество студентов, занятий, размер таблицы строк
+                 и смещения трёх таблиц от начала файла;
+таблица студентов - записи STUDENT_RECORD, упорядоченные по unique_id (поиск студента - двоичный поиск),
+                 у каждого студента - смещение и длина имени и фамилии в таблице строк и диапазон его занятий;
+таблица занятий   - записи SESSION_RECORD фиксированной длины, занятия одного студента идут подряд;
+таблица строк     - имена и фамилии в utf-8 подряд.
+Файл читается через mmap: открытие файла читает только заголовок, таблицы - представления numpy
+над отображённой памятью без копирования, обращение к одному студенту затрагивает только его страницы.
+Отображение закрывается в close(), только если на таблицы (students_table, sessions_table) больше
+нет ссылок; иначе close() выдаёт ResourceWarning, и память освобождается вместе с последним представлением.
+"""
+from typing import Union, List, Iterator
+from datetime import date
+import mmap
+import os.path
+import struct
+import time
+import warnings
+import numpy as np
+from Student_Class import Student, LabWorkSession, SessionStore, SessionView, build_students, load_students_csv, \
+    load_students_json, iter_students_json, save_students_csv, save_students_json
+
+MAGIC = b'STUDBIN1'
+VERSION = 1
+# сигнатура, версия, студентов, занятий, размер таблицы строк, смещения таблиц студентов, занятий и строк
+HEADER = struct.Struct('<8sIQQQQQQ')
+STUDENT_RECORD = np.dtype([('unique_id', '<i8'), ('group', '<i4'), ('subgroup', '<i4'),
+                           ('name_offset', '<u8'), ('name_length', '<u4'),
+                           ('surname_offset', '<u8'), ('surname_length', '<u4'),
+                           ('session_start', '<u8'), ('session_count', '<u4')])
+SESSION_RECORD = np.dtype([('lab_work_number', '<i4'), ('lab_work_mark', '<i4'), ('presence', 'u1'),
+                           ('day', '<i4')])
+
+
+def _session_columns(student: Student):
+    """
+    Занятия студента столбцами: (номера л.р., оценки, присутствие, номера дней)
+    """
+    sessions = student.lab_work_sessions
+    if isinstance(sessions, SessionView):
+        return sessions.lab_work_number, sessions.lab_work_mark, sessions.presence, sessions.day
+    sessions = list(sessions)
+    return ([session.lab_work_number for session in sessions], [session.lab_work_mark for session in sessions],
+            [session.presence for session in sessions], [session.lab_work_date.toordinal() for session in sessions])
+
+
+def save_students_binary(file_path: str, students: List[Student]) -> None:
+    """
+    Запись студентов в двоичный файл
+    """
+    students = sorted(students, key=lambda student: student.unique_id)
+    table = np.zeros(len(students), dtype=STUDENT_RECORD)
+    strings = bytearray()
+    columns = [[], [], [], []]
+    session_start = 0
+    for index, student in enumerate(students):
+        record = table[index]
+        if index and student.unique_id == students[index - 1].unique_id:
+            raise ValueError(f"save_students_binary:: duplicate unique_id {student.unique_id}")
+        record['unique_id'] = student.unique_id
+        record['group'] = student.group
+        record['subgroup'] = student.subgroup
+        for field, text in (('name', student.name), ('surname', student.surname)):
+            encoded = text.encode('utf-8')
+            record[f'{field}_offset'] = len(strings)
+            record[f'{field}_length'] = len(encoded)
+            strings += encoded
+        student_columns = _session_columns(student)
+        for column, values in zip(columns, student_columns):
+            column.append(np.asarray(values))
+        record['session_start'] = session_start
+        record['session_count'] = len(student_columns[0])
+        session_start += len(student_columns[0])
+
+    sessions = np.zeros(session_start, dtype=SESSION_RECORD)
+    if students:
+        for field, column in zip(('lab_work_number', 'lab_work_mark', 'presence', 'day'), columns):
+            sessions[field] = np.concatenate(column)
+
+    students_offset = HEADER.size
+    sessions_offset = students_offset + table.nbytes
+    strings_offset = sessions_offset + sessions.nbytes
+    with open(file_path, 'wb') as output_file:
+        output_file.write(HEADER.pack(MAGIC, VERSION, table.size, sessions.size, len(strings),
+                                      students_offset, sessions_offset, strings_offset))
+        output_file.write(table.tobytes())
+        output_file.write(sessions.tobytes())
+        output_file.write(strings)
+
+
+class StudentBinaryFile:
+    """
+    Чтение двоичного файла журнала через mmap.
+    Таблицы студентов и занятий - структурированные массивы numpy над отображённой памятью;
+    student(unique_id) находит студента двоичным поиском и читает только его записи.
+    """
+
+    def __init__(self, file_path: str):
+        assert isinstance(file_path, str)
+        self._file = open(file_path, 'rb')
+        try:
+            if os.path.getsize(file_path) < HEADER.size:
+                raise ValueError(f"StudentBinaryFile:: {file_path} is not a student binary file")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            self._file.close()
+            raise
+        magic, version, n_students, n_sessions, strings_size, students_offset, sessions_offset, strings_offset = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"StudentBinaryFile:: {file_path} is not a student binary file")
+        size = len(self._map)
+        if not (HEADER.size <= students_offset and students_offset + n_students * STUDENT_RECORD.itemsize <= size
+                and HEADER.size <= sessions_offset and sessions_offset + n_sessions * SESSION_RECORD.itemsize <= size
+                and HEADER.size <= strings_offset and strings_offset + strings_size <= size):
+            self.close()
+            raise ValueError(f"StudentBinaryFile:: {file_path} is truncated or corrupted: header declares "
+                             f"{n_students} students, {n_sessions} sessions and {strings_size} bytes of strings, "
+                             f"file size is {size} bytes")
+        self._students = np.frombuffer(self._map, dtype=STUDENT_RECORD, count=n_students, offset=students_offset)
+        self._sessions = np.frombuffer(self._map, dtype=SESSION_RECORD, count=n_sessions, offset=sessions_offset)
+        self._strings_offset = strings_offset
+
+    def close(self) -> None:
+        self._students = None
+        self._sessions = None
+        if not self._map.closed:
+            try:
+                self._map.close()
+            except BufferError:
+                # на отображение ещё ссылаются представления students_table / sessions_table;
+                # оно закроется вместе с последним из них
+                warnings.warn("StudentBinaryFile:: mapping is still referenced by table views and stays open "
+                              "until they are released", ResourceWarning, stacklevel=2)
+        self._file.close()
+
+    def __enter__(self) -> 'StudentBinaryFile':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._students.size
+
+    def __contains__(self, unique_id: int) -> bool:
+        return self._find(unique_id) is not None
+
+    @property
+    def n_sessions(self) -> int:
+        return self._sessions.size
+
+    @property
+    def students_table(self) -> np.ndarray:
+        """
+        Таблица студентов (без копирования; пока на неё есть ссылки, отображение не закрывается)
+        """
+        return self._students
+
+    @property
+    def sessions_table(self) -> np.ndarray:
+        """
+        Таблица занятий (без копирования; пока на неё есть ссылки, отображение не закрывается)
+        """
+        return self._sessions
+
+    def _find(self, unique_id: int) -> Union[int, None]:
+        ids = self._students['unique_id']
+        index = int(np.searchsorted(ids, unique_id))
+        if index < ids.size and ids[index] == unique_id:
+            return index
+        return None
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_offset + offset
+        return self._map[start: start + length].decode('utf-8')
+
+    def sessions(self, unique_id: int) -> SessionView:
+        """
+        Занятия студента (копия его записей, не зависящая от отображения и от close())
+        """
+        index = self._find(unique_id)
+        if index is None:
+            raise KeyError(unique_id)
+        record = self._students[index]
+        start = int(record['session_start'])
+        block = self._sessions[start: start + int(record['session_count'])].copy()
+        return SessionView(block['lab_work_number'], block['lab_work_mark'], block['presence'].view(bool),
+                           block['day'])
+
+    def _student(self, index: int) -> Student:
+        record = self._students[index]
+        student = Student(int(record['unique_id']),
+                          self._string(int(record['name_offset']), int(record['name_length'])),
+                          self._string(int(record['surname_offset']), int(record['surname_length'])),
+                          int(record['group']), int(record['subgroup']))
+        return student
+
+    def student(self, unique_id: int) -> Student:
+        """
+        Студент со списком занятий
+        """
+        index = self._find(unique_id)
+        if index is None:
+            raise KeyError(unique_id)
+        student = self._student(index)
+        student.lab_work_sessions = list(self.sessions(unique_id))
+        return student
+
+    def __iter__(self) -> Iterator[Student]:
+        for index in range(self._students.size):
+            yield self.student(int(self._students[index]['unique_id']))
+
+    def load(self, store: Union[SessionStore, None] = None) -> List[Student]:
+        """
+        Все студенты. Если задан store, занятия копируются в него одним векторным добавлением
+        и студенты подключаются к хранилищу, иначе у каждого студента создаётся список LabWorkSession.
+        """
+        if store is None:
+            return list(self)
+        table = self._students
+        strings = self._map[self._strings_offset: self._strings_offset + int(
+            (table['surname_offset'] + table['surname_length']).max(initial=0))]
+        students = build_students(table['unique_id'], *(
+            [strings[start: start + length].decode('utf-8')
+             for start, length in zip(table[f'{field}_offset'].tolist(), table[f'{field}_length'].tolist())]
+            for field in ('name', 'surname')), table['group'], table['subgroup'])
+        store.extend(np.repeat(self._students['unique_id'], self._students['session_count']),
+                     self._sessions['lab_work_number'], self._sessions['lab_work_mark'],
+                     self._sessions['presence'].view(bool), self._sessions['day'])
+        for student in students:
+            student.lab_work_sessions = store
+        return students
+
+
+def load_students_binary(file_path: str, store: Union[SessionStore, None] = None) -> Union[List[Student], None]:
+    """
+    Загрузка всех студентов из двоичного файла (см. StudentBinaryFile.load)
+    """
+    if not os.path.exists(file_path):
+        return None
+    with StudentBinaryFile(file_path) as binary_file:
+        return binary_file.load(store)
+
+
+def convert_to_binary(source_path: str, binary_path: str) -> int:
+    """
+    Преобразование csv или json файла (по расширению) в двоичный формат
+    :return: количество записанных студентов
+    """
+    extension = os.path.splitext(source_path)[1].lower()
+    if extension == '.csv':
+        students = load_students_csv(source_path)
+    elif extension == '.json':
+        students = list(iter_students_json(source_path)) if os.path.exists(source_path) else None
+    else:
+        raise ValueError(f"convert_to_binary:: unknown source format \"{extension}\"")
+    if students is None:
+        raise FileNotFoundError(source_path)
+    save_students_binary(binary_path, students)
+    return len(students)
+
+
+def convert_from_binary(binary_path: str, target_path: str) -> int:
+    """
+    Преобразование двоичного файла в csv или json (по расширению)
+    :return: количество записанных студентов
+    """
+    extension = os.path.splitext(target_path)[1].lower()
+    if extension not in ('.csv', '.json'):
+        raise ValueError(f"convert_from_binary:: unknown target format \"{extension}\"")
+    students = load_students_binary(binary_path, SessionStore())
+    if students is None:
+        raise FileNotFoundError(binary_path)
+    if extension == '.csv':
+        save_students_csv(target_path, students)
+    else:
+        save_students_json(target_path, students)
+    return len(students)
+
+
+def binary_benchmark(n_students: int = 20000, n_labs: int = 20, file_stem: str = "benchmark_students"):
+    """
+    Время загрузки журнала из csv, json и двоичного файла и время доступа к одному студенту
+    """
+    lab_dates = [date(2023, 1 + lab % 12, 1 + lab % 28) for lab in range(n_labs)]
+    students = [Student(unique_id, 'Имя', 'Фамилия', 6407 + unique_id % 3, 1 + unique_id % 2)
+                for unique_id in range(n_students)]
+    for student in students:
+        for lab in range(n_labs):
+            student.append_lab_work_session(LabWorkSession(True, lab, lab % 6, lab_dates[lab]))
+    paths = {extension: f"{file_stem}.{extension}" for extension in ('csv', 'json', 'bin')}
+    save_students_csv(paths['csv'], students)
+    save_students_json(paths['json'], students, compact=True)
+    save_students_binary(paths['bin'], students)
+    print(f"{n_students} students x {n_labs} sessions:")
+    try:
+        for name, loader in (("csv                ", lambda: load_students_csv(paths['csv'])),
+                             ("json               ", lambda: load_students_json(paths['json'])),
+                             ("binary, objects    ", lambda: load_students_binary(paths['bin'])),
+                             ("binary, store      ", lambda: load_students_binary(paths['bin'], SessionStore()))):
+            t_0 = time.perf_counter()
+            loader()
+            elapsed = time.perf_counter() - t_0
+            print(f"{name}: {elapsed * 1e3:10.3f} ms")
+        t_0 = time.perf_counter()
+        with StudentBinaryFile(paths['bin']) as binary_file:
+            t_open = time.perf_counter() - t_0
+            t_0 = time.perf_counter()
+            for unique_id in range(0, n_students, max(n_students // 1000, 1)):
+                binary_file.student(unique_id)
+            t_student = (time.perf_counter() - t_0) / len(range(0, n_students, max(n_students // 1000, 1)))
+        print(f"binary open: {t_open * 1e3:.3f} ms, one student: {t_student * 1e6:.1f} us")
+        print(', '.join(f"{extension}: {os.path.getsize(path) / 2 ** 20:.2f} MiB" for extension, path in paths.items()))
+    finally:
+        for path in paths.values():
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    binary_benchmark()
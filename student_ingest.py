@@ -0,0 +1,210 @@
+"""
+Параллельная загрузка нескольких csv/json файлов журнала.
+Каждый файл разбирается в отдельном процессе, результат возвращается в компактном виде - массивами numpy
+и склеенными строками с массивами границ (а не списками объектов Student), поэтому передача между
+процессами почти ничего не стоит. Основной процесс объединяет студентов по unique_id и находит конфликты.
+"""
+from typing import Union, List, Dict, Tuple
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import glob
+import os.path
+import time
+import numpy as np
+from Student_Class import Student, LabWorkSession, SessionStore, LoadErrors, _iter_csv_rows, iter_students_json, \
+    load_students_csv, save_students_csv
+
+# сколько сообщений об ошибках каждого файла возвращается из процесса
+_MAX_ERRORS = 20
+
+IngestConflict = namedtuple('IngestConflict', 'unique_id, accepted_file, rejected_file, fields')
+IngestResult = namedtuple('IngestResult', 'students, store, conflicts, errors')
+
+
+def _pack_strings(strings: List[str]) -> Tuple[str, np.ndarray]:
+    """
+    Склейка строк в одну строку с массивом границ: строка i - text[offsets[i]: offsets[i + 1]].
+    Разделитель не используется, поэтому строки могут содержать любые символы.
+    """
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum([len(string) for string in strings], out=offsets[1:])
+    return ''.join(strings), offsets
+
+
+def _unpack_strings(text: str, offsets: np.ndarray) -> List[str]:
+    """
+    Обратное к _pack_strings разбиение склеенной строки по границам
+    """
+    bounds = offsets.tolist()
+    return [text[start: stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def _parse_file(file_path: str) -> Tuple:
+    """
+    Разбор одного файла (выполняется в процессе пула).
+    :return: (путь, записи студентов: unique_id, группы, подгруппы, имена, фамилии (см. _pack_strings),
+             занятия: номер записи студента, номер л.р., оценка, присутствие, номер дня,
+             количество ошибок, первые сообщения об ошибках)
+    """
+    errors = LoadErrors(_MAX_ERRORS)
+    records: Dict[Tuple[int, str, str, int, int], int] = {}
+    session_record, numbers, marks, presence, days = [], [], [], [], []
+
+    def add_session(key, session: LabWorkSession) -> None:
+        session_record.append(records.setdefault(key, len(records)))
+        numbers.append(session.lab_work_number)
+        marks.append(session.lab_work_mark)
+        presence.append(session.presence)
+        days.append(session.lab_work_date.toordinal())
+
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.csv':
+        for line_number, (unique_id, name, surname, group, subgroup, session) in _iter_csv_rows(file_path, errors):
+            key = (unique_id, name, surname, group, subgroup)
+            if key not in records and not Student._validate_args(*key):
+                errors(line_number, key, ValueError(f"invalid student record {key}"))
+                continue
+            add_session(key, session)
+    elif extension == '.json':
+        for student in iter_students_json(file_path, errors):
+            key = (student.unique_id, student.name, student.surname, student.group, student.subgroup)
+            records.setdefault(key, len(records))
+            for session in student.lab_work_sessions:
+                add_session(key, session)
+    else:
+        raise ValueError(f"ingest_students:: unknown file format \"{extension}\"")
+
+    keys = list(records)
+    return (file_path,
+            np.array([key[0] for key in keys], dtype=np.int64),
+            np.array([key[3] for key in keys], dtype=np.int32),
+            np.array([key[4] for key in keys], dtype=np.int32),
+            _pack_strings([key[1] for key in keys]),
+            _pack_strings([key[2] for key in keys]),
+            np.array(session_record, dtype=np.int32),
+            np.array(numbers, dtype=np.int32),
+            np.array(marks, dtype=np.int32),
+            np.array(presence, dtype=bool),
+            np.array(days, dtype=np.int32),
+            errors.count,
+            [f'{position}: {error}' for position, _, error in errors.errors])
+
+
+def _expand_paths(files: Union[str, List[str]]) -> List[str]:
+    """
+    Список файлов: шаблон glob или список путей и шаблонов
+    """
+    if isinstance(files, str):
+        files = [files]
+    paths = []
+    for pattern in files:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths.extend(path for path in matches if path not in paths)
+    return paths
+
+
+def ingest_students(files: Union[str, List[str]], n_jobs: Union[int, None] = None,
+                    store: Union[SessionStore, None] = None, deduplicate: bool = True) -> IngestResult:
+    """
+    Загрузка нескольких csv/json файлов в пуле процессов с объединением студентов по unique_id.
+    Запись студента из следующего файла с тем же unique_id, но другими именем, фамилией, группой или подгруппой,
+    считается конфликтом: остаётся первая запись (в порядке файлов), занятия конфликтующей записи
+    не загружаются, а конфликт попадает в результат.
+    :param files: шаблон glob (например, "exports/*.csv") или список путей и шаблонов
+    :param n_jobs: количество процессов (None - по числу процессоров, 1 - без пула)
+    :param store: хранилище занятий (по умолчанию новое); все студенты подключаются к нему
+    :param deduplicate: одинаковые занятия одного студента (например, из пересекающихся выгрузок) загружаются один раз
+    :return: IngestResult(students - студенты в порядке первого появления, store - хранилище занятий,
+             conflicts - список IngestConflict(unique_id, accepted_file, rejected_file, fields),
+             errors - {путь: (количество ошибок, первые сообщения)})
+    """
+    paths = _expand_paths(files)
+    for path in paths:
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+    if store is None:
+        store = SessionStore()
+    n_jobs = min(os.cpu_count() or 1, len(paths)) if n_jobs is None else n_jobs
+    if n_jobs > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            parsed = list(executor.map(_parse_file, paths))
+    else:
+        parsed = [_parse_file(path) for path in paths]
+
+    students: Dict[int, Student] = {}
+    origin: Dict[int, str] = {}
+    conflicts: List[IngestConflict] = []
+    errors: Dict[str, Tuple[int, List[str]]] = {}
+    columns = [[], [], [], [], []]
+    for (path, ids, groups, subgroups, names, surnames, session_record, numbers, marks, presence, days,
+         error_count, error_messages) in parsed:
+        errors[path] = (error_count, error_messages)
+        names, surnames = _unpack_strings(*names), _unpack_strings(*surnames)
+        accepted = np.ones(ids.size, dtype=bool)
+        for index, (unique_id, group, subgroup) in enumerate(zip(ids.tolist(), groups.tolist(), subgroups.tolist())):
+            student = students.get(unique_id)
+            if student is None:
+                # записи уже проверены при разборе файла
+                students[unique_id] = Student._trusted(unique_id, names[index], surnames[index], group, subgroup)
+                origin[unique_id] = path
+                continue
+            fields = tuple(field for field, old, new in (('name', student.name, names[index]),
+                                                         ('surname', student.surname, surnames[index]),
+                                                         ('group', student.group, group),
+                                                         ('subgroup', student.subgroup, subgroup)) if old != new)
+            if fields:
+                accepted[index] = False
+                conflicts.append(IngestConflict(unique_id, origin[unique_id], path, fields))
+        keep = accepted[session_record]
+        for column, values in zip(columns, (ids[session_record], numbers, marks, presence, days)):
+            column.append(values[keep])
+
+    columns = [np.concatenate(column) if column else np.zeros(0) for column in columns]
+    if deduplicate and columns[0].size:
+        rows = np.empty(columns[0].size, dtype=[('unique_id', np.int64), ('lab_work_number', np.int32),
+                                                ('lab_work_mark', np.int32), ('presence', bool), ('day', np.int32)])
+        for field, values in zip(rows.dtype.names, columns):
+            rows[field] = values
+        first = np.sort(np.unique(rows, return_index=True)[1])
+        columns = [values[first] for values in columns]
+    store.extend(*columns)
+    for student in students.values():
+        student.lab_work_sessions = store
+    return IngestResult(list(students.values()), store, conflicts, errors)
+
+
+def ingest_benchmark(n_files: int = 8, n_students: int = 2000, n_labs: int = 20, n_jobs: Union[int, None] = None,
+                     file_stem: str = "benchmark_students"):
+    """
+    Время загрузки n_files csv файлов: load_students_csv по очереди против ingest_students
+    """
+    lab_dates = [date(2023, 1 + lab % 12, 1 + lab % 28) for lab in range(n_labs)]
+    paths = []
+    for file_index in range(n_files):
+        students = [Student(unique_id, 'Имя', 'Фамилия', 6407 + unique_id % 3, 1 + unique_id % 2)
+                    for unique_id in range(file_index * n_students, (file_index + 1) * n_students)]
+        for student in students:
+            for lab in range(n_labs):
+                student.append_lab_work_session(LabWorkSession(True, lab, lab % 6, lab_dates[lab]))
+        paths.append(f"{file_stem}_{file_index}.csv")
+        save_students_csv(paths[-1], students)
+    print(f"{n_files} files x {n_students} students x {n_labs} sessions, {os.cpu_count()} cpu:")
+    try:
+        t_0 = time.perf_counter()
+        sequential = []
+        for path in paths:
+            sequential.extend(load_students_csv(path))
+        print(f"load_students_csv one by one: {(time.perf_counter() - t_0) * 1e3:10.3f} ms")
+        for jobs in (1, n_jobs):
+            t_0 = time.perf_counter()
+            result = ingest_students(f"{file_stem}_*.csv", n_jobs=jobs)
+            print(f"ingest_students, n_jobs={jobs}: {(time.perf_counter() - t_0) * 1e3:10.3f} ms,"
+                  f" {len(result.students)} students, {len(result.store)} sessions")
+    finally:
+        for path in paths:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    ingest_benchmark()
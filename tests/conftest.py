@@ -0,0 +1,31 @@
+import os
+import sys
+from datetime import date
+import pytest
+
+# модули лабораторных лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Student_Class import Student, LabWorkSession, STUDENT_GROUPS, STUDENT_SUBGROUPS  # noqa: E402
+
+
+@pytest.fixture
+def make_students():
+    """
+    Фабрика тестовых студентов: make_students(unique_ids, n_labs) - студенты Имя{id} Фамилия{id}
+    с группой и подгруппой по unique_id и n_labs занятиями (n_labs - число или функция от unique_id).
+    Занятие lab студента id: номер lab, оценка (id + lab) % 6, даты различаются по годам и месяцам.
+    """
+    def make(unique_ids=range(1, 5), n_labs=3):
+        students = []
+        for unique_id in unique_ids:
+            student = Student(unique_id, f'Имя{unique_id}', f'Фамилия{unique_id}',
+                              STUDENT_GROUPS[unique_id % len(STUDENT_GROUPS)],
+                              STUDENT_SUBGROUPS[unique_id % len(STUDENT_SUBGROUPS)])
+            for lab in range(n_labs(unique_id) if callable(n_labs) else n_labs):
+                student.append_lab_work_session(LabWorkSession(True, lab, (unique_id + lab) % 6,
+                                                               date(2021 + lab % 3, 1 + lab * 5 % 12,
+                                                                    1 + (unique_id + lab) % 28)))
+            students.append(student)
+        return students
+    return make
@@ -0,0 +1,41 @@
+from datetime import date
+import numpy as np
+from Student_Class import Student, SessionStore
+from gradebook_analytics import session_columns, default_deadlines, gradebook_stats
+
+
+def _gradebook():
+    """
+    Группа 6407 сдаёт л.р. 0 1 сентября, группа 6408 - на неделю позже; студент 3 сдал с опозданием,
+    студент 4 пропустил занятие ещё позже срока
+    """
+    start = date(2023, 9, 1).toordinal()
+    students = [Student(unique_id, 'Имя', 'Фамилия', 6407 + unique_id // 2, 1) for unique_id in range(5)]
+    store = SessionStore()
+    store.extend(np.arange(5), np.zeros(5, dtype=int), np.full(5, 4),
+                 np.array([True, True, True, True, False]),
+                 np.array([start, start, start + 7, start + 9, start + 20]))
+    for student in students:
+        student.lab_work_sessions = store
+    return students
+
+
+def test_default_deadlines_per_group():
+    columns = session_columns(_gradebook())
+    start = date(2023, 9, 1).toordinal()
+    # у группы 6409 нет посещённых занятий - срок не определён
+    assert default_deadlines(columns) == {(6407, 0): start, (6408, 0): start + 7}
+
+
+def test_late_counts_present_sessions_of_own_group():
+    students = _gradebook()
+    table = gradebook_stats(students, ('group',))
+    assert table['group'].tolist() == [6407, 6408, 6409]
+    assert table['late'].tolist() == [0, 1, 0]
+    assert table['sessions'].tolist() == [2, 2, 1]
+
+    start = date(2023, 9, 1)
+    table = gradebook_stats(students, ('group',), deadlines={0: start, (6408, 0): date(2023, 9, 10)})
+    assert table['late'].tolist() == [0, 0, 0]
+    table = gradebook_stats(students, ('group',), deadlines={0: start})
+    assert table['late'].tolist() == [0, 2, 0]
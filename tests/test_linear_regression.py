@@ -0,0 +1,201 @@
+import numpy as np
+import pytest
+from Linear_Regression import Regression, LeastSquaresModel, LinearRegressionModel, BiLinearRegressionModel, \
+    PolyRegressionModel, QuadraticRegression2DModel, RollingRegression
+
+
+def _lstsq(design, target):
+    return np.linalg.lstsq(design, target, rcond=None)[0]
+
+
+def test_least_squares_model_is_abstract():
+    with pytest.raises(TypeError):
+        LeastSquaresModel()
+
+
+def test_models_match_lstsq():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(-1.0, 1.0, 500), rng.uniform(-1.0, 1.0, 500)
+    z = 1.0 + 2.0 * x - 3.0 * y + x * y + rng.normal(0.0, 0.1, 500)
+    assert np.allclose(LinearRegressionModel().fit(x, z).coefficients,
+                       _lstsq(np.column_stack((x, np.ones(x.size))), z))
+    assert np.allclose(BiLinearRegressionModel().fit(x, y, z).coefficients,
+                       _lstsq(np.column_stack((x, y, np.ones(x.size))), z))
+    assert np.allclose(QuadraticRegression2DModel().fit(x, y, z).coefficients,
+                       _lstsq(np.column_stack((x * x, x * y, y * y, x, y, np.ones(x.size))), z))
+    assert np.allclose(PolyRegressionModel(4).fit(x, z).coefficients,
+                       _lstsq(Regression.poly_design_matrix(x, 4), z))
+
+
+def test_poly_model_refit_append_and_predict():
+    rng = np.random.default_rng(1)
+    x = rng.uniform(-1.0, 1.0, 400)
+    targets = rng.normal(0.0, 1.0, (400, 3)) + x[:, None] ** 2
+    design = Regression.poly_design_matrix(x, 3)
+    model = PolyRegressionModel(3).fit(x, targets[:, 0])
+    model.fit(x, targets[:, 1])
+    assert np.allclose(model.coefficients, _lstsq(design, targets[:, 1]))
+    assert np.allclose(model.predict(x), design @ model.coefficients)
+    assert np.allclose(model.residual_sum_squares, np.sum((targets[:, 1] - design @ model.coefficients) ** 2))
+
+    model = PolyRegressionModel(3).fit(x[:300], targets[:300])
+    model.append(x[300:], targets[300:])
+    assert np.allclose(model.coefficients, _lstsq(design, targets))
+
+
+def test_rolling_regression_matches_window_lstsq():
+    rng = np.random.default_rng(2)
+    x = np.linspace(0.0, 10.0, 300)
+    y = np.sin(x) * x + rng.normal(0.0, 0.05, x.size)
+    window = 50
+    rolling = RollingRegression(window, PolyRegressionModel(2), refresh_period=64)
+    history = rolling.update(x, y)
+    for i in (window - 1, 120, x.size - 1):
+        rows = slice(i + 1 - window, i + 1)
+        assert np.allclose(history[i], _lstsq(Regression.poly_design_matrix(x[rows], 2), y[rows]))
+    assert np.allclose(rolling.model.predict(x[-window:]),
+                       Regression.poly_design_matrix(x[-window:], 2) @ history[-1])
+    assert np.allclose(rolling.push(10.1, 0.0), rolling.coefficients)
+
+
+
+def test_rolling_regression_degenerate_window():
+    rolling = RollingRegression(3)
+    assert rolling.push(1.0, 1.0).size == 0
+    for x in (2.0, 3.0):
+        coefficients = rolling.push(x, 2.0 * x - 1.0)
+    assert np.allclose(coefficients, [2.0, -1.0])
+    # все точки окна с одинаковым x: коэффициенты не определены, прежние не возвращаются
+    for _ in range(3):
+        coefficients = rolling.push(5.0, 1.0)
+    assert coefficients.size == 0 and rolling.coefficients.size == 0
+    assert np.isnan(rolling.update([5.0], [2.0])).all()
+    history = rolling.update([6.0, 7.0], [3.0, 4.0])
+    # окно снова невырождено, как только в нём появляются два различных x
+    assert np.allclose(history[0], _lstsq([[5.0, 1.0], [5.0, 1.0], [6.0, 1.0]], [1.0, 2.0, 3.0]))
+    assert np.allclose(history[1], _lstsq([[5.0, 1.0], [6.0, 1.0], [7.0, 1.0]], [2.0, 3.0, 4.0]))
+
+def test_poly_cross_validation_matches_direct_refits():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(-2.0, 3.0, 300)
+    y = np.cos(x) + rng.normal(0.0, 0.1, x.size)
+    orders, ridges = range(1, 7), (0.0, 1e-2)
+    table = Regression.poly_cross_validation(x, y, orders, ridges, n_folds=4, n_jobs=1, seed=1)
+    assert np.array_equal(table, Regression.poly_cross_validation(x, y, orders, ridges, n_folds=4, n_jobs=3, seed=1))
+    assert table.size == 12 and np.all(np.diff(table['mse']) >= 0.0)
+    folds = np.array_split(np.random.default_rng(1).permutation(x.size), 4)
+    # без регуляризации результат не зависит от масштабирования x, поэтому его можно сравнить с прямыми подгонками
+    for order, _, mse, _ in table[table['ridge'] == 0.0]:
+        errors = []
+        for fold in folds:
+            train = np.setdiff1d(np.arange(x.size), fold)
+            coefficients = Regression.poly_ridge_regression(x[train], y[train], order)
+            assert np.allclose(coefficients, np.polynomial.polynomial.polyfit(x[train], y[train], order))
+            errors.append(np.mean((Regression.polynom(x[fold], coefficients) - y[fold]) ** 2))
+        assert np.isclose(mse, np.mean(errors))
+
+
+def test_poly_ridge_regression_shrinks_coefficients():
+    rng = np.random.default_rng(2)
+    x = rng.uniform(0.0, 4.0, 200)
+    y = np.sin(x) + rng.normal(0.0, 0.1, x.size)
+    t = (x - x.min()) / (x.max() - x.min()) * 2.0 - 1.0
+    design = Regression.poly_design_matrix(t, 6)
+    penalty = np.diag([0.0] + [1.0] * 6)
+    expected = np.linalg.solve(design.T @ design + penalty, design.T @ y)
+    fitted = Regression.poly_ridge_regression(x, y, 6, 1.0)
+    assert np.allclose(Regression.polynom(x, fitted), design @ expected)
+
+
+def test_batch_poly_regression_matches_lstsq():
+    rng = np.random.default_rng(3)
+    x = rng.uniform(-1.0, 1.0, 400)
+    y = np.column_stack([np.polynomial.polynomial.polyval(x, rng.normal(size=4)) for _ in range(5)])
+    y += rng.normal(0.0, 0.05, y.shape)
+    coefficients = Regression.batch_poly_regression(x, y, 3)
+    assert coefficients.shape == (4, 5)
+    assert np.allclose(coefficients, _lstsq(Regression.poly_design_matrix(x, 3), y))
+    assert np.allclose(Regression.batch_poly_regression(x, y[:, 0], 3).ravel(), coefficients[:, 0])
+
+
+@pytest.mark.parametrize('method', ['huber', 'tukey', 'ransac'])
+def test_robust_regression_ignores_outliers(method):
+    rng = np.random.default_rng(4)
+    x = rng.uniform(-1.0, 1.0, 1000)
+    y = 2.0 * x - 0.5 + rng.normal(0.0, 0.05, x.size)
+    outliers = rng.choice(x.size, 150, replace=False)
+    y[outliers] += rng.uniform(5.0, 20.0, outliers.size)
+    kwargs = {'seed': 0} if method == 'ransac' else {}
+    k, b = Regression.robust_linear_regression(x, y, method, **kwargs)
+    assert abs(k - 2.0) < 0.05 and abs(b + 0.5) < 0.05
+    _, b_ls = Regression.linear_regression(x, y)
+    assert abs(b_ls + 0.5) > 1.0
+
+
+def test_irls_and_ransac_outputs():
+    rng = np.random.default_rng(5)
+    design = np.column_stack((rng.uniform(-1.0, 1.0, (500, 2)), np.ones(500)))
+    y = design @ np.array([1.0, -2.0, 0.3]) + rng.normal(0.0, 0.02, 500)
+    y[:50] -= 10.0
+    coefficients, weights = Regression.irls_regression(design, y, 'tukey')
+    assert np.allclose(coefficients, [1.0, -2.0, 0.3], atol=0.02)
+    assert np.all(weights[:50] == 0.0) and np.all(weights[50:] > 0.0)
+    coefficients, inliers = Regression.ransac_regression(design, y, seed=0)
+    assert np.allclose(coefficients, [1.0, -2.0, 0.3], atol=0.02)
+    assert not inliers[:50].any() and inliers[50:].mean() > 0.95
+    with pytest.raises(ValueError):
+        Regression.irls_regression(design, y, 'cauchy')
+
+
+def test_rand_array_in_range_is_seeded_and_bounded():
+    values = Regression.rand_array_in_range(4.0, (1000, 2), rng=7)
+    assert values.shape == (1000, 2) and values.min() >= -2.0 and values.max() < 2.0
+    assert np.array_equal(values, Regression.rand_array_in_range(4.0, (1000, 2), rng=7))
+    assert not np.array_equal(values, Regression.rand_array_in_range(4.0, (1000, 2), rng=8))
+    out = np.empty(500)
+    assert Regression.rand_array_in_range((3.0, 5.0), rng=np.random.default_rng(1), out=out) is out
+    assert out.min() >= 3.0 and out.max() < 5.0
+
+
+def test_data_chunks_sizes_and_reproducibility():
+    import Logistic_Regression
+    # одна реализация на оба модуля
+    assert Logistic_Regression.test_data_chunks is Regression.test_data_chunks
+    assert Logistic_Regression.rand_array_in_range is Regression.rand_array_in_range
+
+    chunks = list(Regression.test_data_chunks(Regression.test_data_nd, 250, chunk_size=100, seed=3))
+    assert [chunk.shape[0] for chunk in chunks] == [100, 100, 50]
+    again = list(Regression.test_data_chunks(Regression.test_data_nd, 250, chunk_size=100, seed=3))
+    assert all(np.array_equal(a, b) for a, b in zip(chunks, again))
+    # части берутся из одного потока случайных чисел, а не из одного и того же зерна
+    assert not np.array_equal(chunks[0][:50], chunks[2])
+    chunks = list(Regression.test_data_chunks(Logistic_Regression.log_reg_test_data, 25, chunk_size=10, seed=0))
+    assert [features.shape for features, _ in chunks] == [(10, 2), (10, 2), (5, 2)]
+
+
+@pytest.mark.parametrize('chunk_size', [None, 1, 7, 1000])
+def test_chunked_predictions_match_direct_evaluation(chunk_size):
+    rng = np.random.default_rng(8)
+    x, y = rng.uniform(-2.0, 2.0, (2, 6, 5))
+    x_rows = rng.uniform(-1.0, 1.0, (30, 3))
+    b = np.array([0.5, -1.0, 0.25, 2.0])
+    quadratic = np.array([1.0, -2.0, 0.5, 3.0, -1.0, 0.25])
+    cases = ((Regression.predict_linear, (x, 1.5, -0.5), 1.5 * x - 0.5),
+             (Regression.predict_bi_linear, (x, y, 1.5, -2.0, 0.5), 1.5 * x - 2.0 * y + 0.5),
+             (Regression.polynom, (x, b), b[0] + b[1] * x + b[2] * x ** 2 + b[3] * x ** 3),
+             (Regression.predict_n_linear, (x_rows, [1.0, 2.0, -1.0]), x_rows @ [1.0, 2.0, -1.0]),
+             (Regression.predict_n_linear, (x_rows, [1.0, 2.0, -1.0, 0.5]), x_rows @ [1.0, 2.0, -1.0] + 0.5),
+             (Regression.predict_quadratic_2d, (x, y, quadratic),
+              x * x - 2.0 * x * y + 0.5 * y * y + 3.0 * x - y + 0.25))
+    for predict, args, expected in cases:
+        assert np.allclose(predict(*args, chunk_size=chunk_size), expected)
+        out = np.full(expected.shape, np.nan)
+        assert predict(*args, out=out, chunk_size=chunk_size) is out
+        assert np.allclose(out, expected)
+
+
+def test_chunked_prediction_rejects_bad_out():
+    x = np.linspace(0.0, 1.0, 10)
+    for out in (np.empty(9), np.empty(10, dtype=np.float32), np.empty(20)[::2]):
+        with pytest.raises(ValueError):
+            Regression.predict_linear(x, 1.0, 0.0, out=out)
@@ -0,0 +1,138 @@
+import numpy as np
+import pytest
+from Logistic_Regression import sigmoid, LogisticRegression, MulticlassLogisticRegression, PolynomialFeatures
+
+
+def _clusters(n_points=3000, n_classes=4, seed=0):
+    rng = np.random.default_rng(seed)
+    angles = 2.0 * np.pi * np.arange(n_classes) / n_classes
+    centers = np.column_stack((np.cos(angles), np.sin(angles))) * 2.0
+    groups = rng.integers(0, n_classes, n_points)
+    return centers[groups] + rng.normal(0.0, 0.5, (n_points, 2)), groups
+
+
+def test_sigmoid_scalar():
+    assert isinstance(sigmoid(0.5), float)
+    assert abs(sigmoid(0.5) - 1.0 / (1.0 + np.exp(-0.5))) < 1e-15
+    assert abs(sigmoid(np.float64(-2.0)) - 1.0 / (1.0 + np.exp(2.0))) < 1e-15
+
+
+def test_sigmoid_array_and_out():
+    x = np.linspace(-700.0, 700.0, 101)
+    expected = 1.0 / (1.0 + np.exp(-x))
+    assert np.allclose(sigmoid(x), expected, rtol=1e-10, atol=0.0)
+    out = x.copy()
+    assert sigmoid(out, out=out) is out
+    assert np.allclose(out, expected, rtol=1e-10, atol=0.0)
+
+
+def test_sigmoid_no_overflow():
+    with np.errstate(over='raise', invalid='raise'):
+        values = sigmoid(np.array([-1e4, -800.0, 800.0, 1e4]))
+    assert np.array_equal(values, [0.0, 0.0, 1.0, 1.0])
+
+
+@pytest.mark.parametrize('multi_class', ['softmax', 'ovr'])
+def test_multiclass_train_and_stream_agree(multi_class):
+    features, groups = _clusters()
+    model = MulticlassLogisticRegression(max_iters=200, multi_class=multi_class, n_jobs=1)
+    model.train(features, groups)
+    assert np.mean(model.classify(features) == groups) > 0.98
+    assert np.allclose(model.predict(features).sum(axis=1), 1.0)
+    # один блок на всю выборку - тот же полный градиентный спуск, что и train
+    stream = MulticlassLogisticRegression(max_iters=200, multi_class=multi_class, classes=np.arange(4))
+    stream.train_stream((features, groups), chunk_size=groups.size)
+    assert np.allclose(stream.thetas, model.thetas, atol=1e-9)
+
+
+def test_softmax_and_ovr_classify_alike():
+    features, groups = _clusters()
+    labels = {}
+    for multi_class in ('softmax', 'ovr'):
+        model = MulticlassLogisticRegression(max_iters=200, multi_class=multi_class, n_jobs=1)
+        model.train(features, groups)
+        labels[multi_class] = model.classify(features)
+    assert np.mean(labels['softmax'] == labels['ovr']) > 0.99
+
+
+def test_multiclass_solver_check():
+    with pytest.raises(ValueError):
+        MulticlassLogisticRegression(solver='newton')
+    model = MulticlassLogisticRegression()
+    with pytest.raises(ValueError):
+        model.solver = 'newton'
+    model = MulticlassLogisticRegression(multi_class='ovr')
+    model.solver = 'newton'
+    assert model.solver == 'newton'
+
+
+def test_partial_fit_rejects_feature_count_change():
+    rng = np.random.default_rng(0)
+    features = rng.normal(0.0, 1.0, (200, 3))
+    groups = (features[:, 0] > 0.0).astype(float)
+    model = LogisticRegression()
+    model.partial_fit(features, groups)
+    thetas = model.thetas.copy()
+    with pytest.raises(ValueError):
+        model.partial_fit(features[:, :2], groups)
+    assert np.array_equal(model.thetas, thetas)
+    model.partial_fit(features, groups)
+    assert model.thetas.shape == thetas.shape
+
+
+def test_benchmark_restores_debug_mode(monkeypatch):
+    import Logistic_Regression
+
+    def failing(*args, **kwargs):
+        raise RuntimeError("data generation failed")
+
+    monkeypatch.setattr(Logistic_Regression, 'log_reg_test_data', failing)
+    debug_mode = Logistic_Regression._debug_mode
+    with pytest.raises(RuntimeError):
+        Logistic_Regression.train_benchmark()
+    assert Logistic_Regression._debug_mode == debug_mode
+
+
+def test_second_order_solvers_match_gradient_descent():
+    from Logistic_Regression import log_reg_ellipsoid_test_data
+    features, groups = log_reg_ellipsoid_test_data((0.08, -0.08, 1.6, 1.0, 1.0), n_points=3000, rng=0)
+    target_loss = 0.05
+    iterations = {}
+    for solver in ('gd', 'newton', 'lbfgs'):
+        model = LogisticRegression(max_iters=100000, accuracy=target_loss, loss_eval_interval=1,
+                                   early_stop_patience=1000000, solver=solver)
+        model.train(features, groups)
+        assert model.losses <= target_loss
+        assert np.mean((model.predict(features) > 0.5) == groups) > 0.98
+        iterations[solver] = len(model.loss_history)
+    assert iterations['newton'] < iterations['gd']
+    assert iterations['lbfgs'] < iterations['gd']
+
+
+def test_polynomial_features_degree_two():
+    rng = np.random.default_rng(6)
+    features = rng.normal(size=(10, 3))
+    x, y, z = features.T
+    expected = np.column_stack((x, y, z, x * x, x * y, x * z, y * y, y * z, z * z))
+    expansion = PolynomialFeatures(2, 3)
+    assert expansion.n_output_features == 9
+    assert str(expansion) == 'x0, x1, x2, x0^2, x0*x1, x0*x2, x1^2, x1*x2, x2^2'
+    assert np.allclose(expansion.transform(features), expected)
+    out = np.empty((10, 9), order='F')
+    assert expansion.transform(features, out) is out and np.allclose(out, expected)
+    # блоки пишутся в один буфер, поэтому копируются до получения следующего
+    blocks = [block.copy() for block in expansion.chunks(features, chunk_size=4)]
+    assert [block.shape[0] for block in blocks] == [4, 4, 2]
+    assert np.allclose(np.vstack(blocks), expected)
+    groups = np.arange(10)
+    streamed = [(block.copy(), labels) for block, labels in expansion.stream(features, groups, chunk_size=3)()]
+    assert np.allclose(np.vstack([block for block, _ in streamed]), expected)
+    assert np.array_equal(np.concatenate([labels for _, labels in streamed]), groups)
+
+    thetas = rng.normal(size=10)
+    field = expansion.decision_function(thetas, chunk_size=4)
+    assert np.allclose(field(x, y, z), thetas[0] + expected @ thetas[1:])
+    assert np.allclose(field(x.reshape(2, 5), y.reshape(2, 5), 0.0).ravel(),
+                       thetas[0] + expected[:, [0, 1, 3, 4, 6]] @ thetas[[1, 2, 4, 5, 7]])
+    assert isinstance(field(1.0, 2.0, 3.0), float)
+    assert np.isclose(field(1.0, 2.0, 3.0), thetas[0] + np.array([1, 2, 3, 1, 2, 3, 4, 6, 9]) @ thetas[1:])
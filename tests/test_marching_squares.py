@@ -0,0 +1,50 @@
+import numpy as np
+from Logistic_Regression import march_squares_2d, march_squares_2d_adaptive, stitch_sections
+
+
+def _circle(x, y):
+    return x * x + y * y
+
+
+def _two_circles(x, y):
+    return np.minimum((x - 2.0) ** 2 + y * y, (x + 2.0) ** 2 + y * y)
+
+
+def _crossed_cells(field, resolution, threshold, bound=5.0):
+    nodes = np.linspace(-bound, bound, resolution)
+    values = field(*np.meshgrid(nodes, nodes)) > threshold
+    corners = values[:-1, :-1].astype(int) + values[:-1, 1:] + values[1:, :-1] + values[1:, 1:]
+    return int(np.count_nonzero((corners != 0) & (corners != 4)))
+
+
+def test_uniform_segment_count_and_positions():
+    sections = march_squares_2d(_circle, march_resolution=(65, 65), threshold=4.0)
+    assert sections.shape == (_crossed_cells(_circle, 65, 4.0), 2, 2)
+    radii = np.linalg.norm(sections, axis=2)
+    assert np.all(np.abs(radii - 2.0) < 10.0 / 64)
+
+
+def test_adaptive_matches_uniform():
+    for field, threshold in ((_circle, 4.0), (_two_circles, 1.0)):
+        uniform = march_squares_2d(field, march_resolution=(129, 129), threshold=threshold)
+        adaptive = march_squares_2d_adaptive(field, march_resolution=(17, 17), depth=3, threshold=threshold)
+        assert adaptive.shape == uniform.shape
+        key = lambda s: np.lexsort(np.round(s.reshape(-1, 4), 9).T[::-1])
+        assert np.allclose(adaptive[key(adaptive)], uniform[key(uniform)])
+
+
+def test_stitch_closed_and_open_polylines():
+    sections = march_squares_2d(_two_circles, march_resolution=(96, 96), threshold=1.0)
+    vertices, offsets = stitch_sections(sections)
+    assert offsets.size == 3 and offsets[-1] == sections.shape[0] + 2
+    for start, stop in zip(offsets[:-1], offsets[1:]):
+        assert np.allclose(vertices[start], vertices[stop - 1])
+
+    line = march_squares_2d(lambda x, y: x + 0.3 * y, march_resolution=(33, 33), threshold=0.1)
+    vertices, offsets = stitch_sections(line)
+    assert offsets.tolist() == [0, line.shape[0] + 1]
+    assert not np.allclose(vertices[0], vertices[-1])
+    assert np.allclose(vertices[:, 0] + 0.3 * vertices[:, 1], 0.1)
+
+    vertices, offsets = stitch_sections(np.empty((0, 2, 2)))
+    assert vertices.shape == (0, 2) and offsets.tolist() == [0]
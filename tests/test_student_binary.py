@@ -0,0 +1,60 @@
+import filecmp
+import warnings
+import pytest
+from Student_Class import SessionStore, save_students_csv
+from student_binary import HEADER, StudentBinaryFile, save_students_binary, load_students_binary, \
+    convert_to_binary, convert_from_binary
+
+
+@pytest.fixture
+def students(make_students):
+    # у студентов разное количество занятий
+    return make_students((5, 1, 3), n_labs=lambda unique_id: unique_id)
+
+
+def _records(students):
+    return sorted((student.unique_id, student.name, student.surname, student.group, student.subgroup,
+                   tuple(student.lab_work_sessions)) for student in students)
+
+
+def test_binary_round_trip(tmp_path, students):
+    save_students_binary(str(tmp_path / 's.bin'), students)
+    assert _records(load_students_binary(str(tmp_path / 's.bin'))) == _records(students)
+    assert _records(load_students_binary(str(tmp_path / 's.bin'), SessionStore())) == _records(students)
+
+
+@pytest.mark.parametrize('extension', ['csv', 'json'])
+def test_converters_are_inverse(tmp_path, extension, students):
+    save_students_csv(str(tmp_path / 'source.csv'), students)
+    convert_to_binary(str(tmp_path / 'source.csv'), str(tmp_path / 'c1.bin'))
+    convert_from_binary(str(tmp_path / 'c1.bin'), str(tmp_path / f'c1.{extension}'))
+    convert_to_binary(str(tmp_path / f'c1.{extension}'), str(tmp_path / 'c2.bin'))
+    convert_from_binary(str(tmp_path / 'c2.bin'), str(tmp_path / f'c2.{extension}'))
+    assert filecmp.cmp(str(tmp_path / 'c1.bin'), str(tmp_path / 'c2.bin'), shallow=False)
+    assert filecmp.cmp(str(tmp_path / f'c1.{extension}'), str(tmp_path / f'c2.{extension}'), shallow=False)
+    assert _records(load_students_binary(str(tmp_path / 'c2.bin'))) == _records(students)
+
+
+def test_truncated_file(tmp_path, students):
+    save_students_binary(str(tmp_path / 's.bin'), students)
+    data = (tmp_path / 's.bin').read_bytes()
+    (tmp_path / 't.bin').write_bytes(data[:HEADER.size + 10])
+    with pytest.raises(ValueError, match='truncated'):
+        StudentBinaryFile(str(tmp_path / 't.bin'))
+
+
+def test_close_with_live_views(tmp_path, students):
+    save_students_binary(str(tmp_path / 's.bin'), students)
+    binary_file = StudentBinaryFile(str(tmp_path / 's.bin'))
+    sessions = binary_file.sessions(3)
+    binary_file.close()
+    # занятия студента - копия, они не держат отображение
+    assert sessions.lab_work_number.tolist() == [0, 1, 2]
+
+    binary_file = StudentBinaryFile(str(tmp_path / 's.bin'))
+    table = binary_file.students_table
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        binary_file.close()
+    assert [warning.category for warning in caught] == [ResourceWarning]
+    assert table['unique_id'].tolist() == [1, 3, 5]
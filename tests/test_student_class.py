@@ -0,0 +1,267 @@
+import numpy as np
+import pytest
+from Student_Class import Student, SessionStore, LoadErrors, load_students_csv, iter_students_csv, \
+    load_students_json, build_students, validate_session_columns, save_students_csv, \
+    write_students_json, iter_students_json, StudentRepository
+
+CSV_HEADER = 'unique_id;name;surname;group;subgroup;date;presence;lab_work_number;lab_work_mark\n'
+
+
+def _write_csv(path, rows):
+    path.write_text(CSV_HEADER + ''.join(row + '\n' for row in rows), encoding='utf-8')
+    return str(path)
+
+
+def test_csv_error_positions_are_file_lines(tmp_path):
+    file_path = _write_csv(tmp_path / 'students.csv', ['1;A;B;6407;1;1:1:23;1;0;5',
+                                                       '1;A;B;6407;1;bad;1;1;5',
+                                                       '2;C;D;6400;1;1:1:23;1;0;5',
+                                                       '3;E;F;6407;1;1:1:23;1;0;5',
+                                                       '1;A;B;6407;1;3:1:23;1;3;5'])
+    errors = LoadErrors()
+    students = load_students_csv(file_path, errors)
+    assert [student.unique_id for student in students] == [1, 3]
+    assert [position for position, _, _ in errors.errors] == [3, 4]
+
+    errors = LoadErrors()
+    students = list(iter_students_csv(file_path, errors))
+    assert [student.unique_id for student in students] == [1, 3]
+    assert [position for position, _, _ in errors.errors] == [3, 4, 6]
+
+
+def test_session_store_relabel_collision(make_students):
+    students = make_students()
+    store = SessionStore.from_students(students)
+    with pytest.raises(ValueError):
+        students[0].unique_id = 2
+    assert students[0].unique_id == 1
+    assert store.count(1) == 3 and store.count(2) == 3
+    students[0].unique_id = 10
+    assert store.count(1) == 0 and store.count(10) == 3
+    assert [session.lab_work_mark for session in students[0].lab_work_sessions] == [1, 2, 3]
+
+
+def test_reassigned_sessions_leave_the_store(make_students):
+    students = make_students()
+    store = SessionStore.from_students(students)
+    students[1].lab_work_sessions = list(students[1].lab_work_sessions)
+    assert len(store) == 9 and store.count(2) == 0
+    assert store.columns['lab_work_mark'].tolist() == [1, 2, 3, 3, 4, 5, 4, 5, 0]
+    assert len(list(students[1].lab_work_sessions)) == 3
+
+    other = SessionStore()
+    other.attach(students[2])
+    assert len(store) == 6 and len(other) == 3
+    assert [session.lab_work_mark for session in students[3].lab_work_sessions] == [4, 5, 0]
+
+
+def test_json_error_positions(tmp_path):
+    file_path = tmp_path / 'students.json'
+    session = '{"presence": 1, "lab_work_n": 1, "lab_work_mark": 3, "lab_work_date": "15:09:23"}'
+    bad_session = '{"presence": 1, "lab_work_n": 1, "lab_work_mark": 3, "lab_work_date": "bad"}'
+    student = '{{"unique_id": {}, "name": "A", "surname": "B", "group": {}, "subgroup": 1, ' \
+              '"lab_works_sessions": [{}]}}'
+    file_path.write_text('{"students": [' + ', '.join([student.format(1, 6407, session),
+                                                         student.format(2, 6400, session),
+                                                         student.format(3, 6408, f'{session}, {bad_session}')]) +
+                         ']}', encoding='utf-8')
+    errors = LoadErrors()
+    students = load_students_json(str(file_path), errors)
+    assert [student.unique_id for student in students] == [1, 3]
+    assert [position for position, _, _ in errors.errors] == [1, (2, 1)]
+
+
+
+def test_json_non_string_dates_do_not_break_students(tmp_path, capsys):
+    file_path = tmp_path / 'students.json'
+    student = '{{"unique_id": {}, "name": "A", "surname": "B", "group": 6407, "subgroup": 1, ' \
+              '"lab_works_sessions": [{{"presence": 1, "lab_work_n": 1, "lab_work_mark": 3, "lab_work_date": {}}}, ' \
+              '{{"presence": 1, "lab_work_n": 2, "lab_work_mark": 4, "lab_work_date": "15:09:23"}}]}}'
+    file_path.write_text('{"students": [' + ', '.join([student.format(1, 'null'), student.format(2, 150923)]) +
+                         ']}', encoding='utf-8')
+    errors = LoadErrors()
+    students = load_students_json(str(file_path), errors)
+    assert [(student.unique_id, len(list(student.lab_work_sessions))) for student in students] == [(1, 1), (2, 1)]
+    assert [position for position, _, _ in errors.errors] == [(0, 0), (1, 0)]
+    assert all(isinstance(error, TypeError) for _, _, error in errors.errors)
+    # без приёмника ошибки печатаются
+    assert len(load_students_json(str(file_path))) == 2
+    assert capsys.readouterr().out.count('is not a string') == 2
+
+def test_student_error_names_failed_fields(tmp_path):
+    with pytest.raises(ValueError, match='group'):
+        Student(1, 'A', 'B', 6400, 1)
+    file_path = _write_csv(tmp_path / 'students.csv', ['1;A;B;6407;3;1:1:23;1;0;5'])
+    errors = LoadErrors()
+    assert load_students_csv(file_path, errors) == []
+    assert 'subgroup' in str(errors.errors[0][2]) and 'group    ' not in str(errors.errors[0][2])
+
+
+def test_build_students_error_routing():
+    errors = LoadErrors()
+    students = build_students(np.array([1, 2, 3, 4]), ['a', 'b', 3, 'd'], ['x', 'y', 'z', 'w'],
+                              np.array([6407, 6400, 6408, 6409]), np.array([1, 1, 2, 2]), errors)
+    assert [student.unique_id for student in students] == [1, 4]
+    assert [(position, record) for position, record, _ in errors.errors] == \
+        [(1, (2, 'b', 'y', 6400, 1)), (2, (3, 3, 'z', 6408, 2))]
+    assert isinstance(students[0], Student) and students[1].name == 'd' and students[1].session_store is None
+    with pytest.raises(ValueError):
+        build_students(np.array([1]), ['a'], ['b'], np.array([6400]), np.array([1]))
+    assert build_students(np.array([1.0]), ['a'], ['b'], np.array([6407]), np.array([1]), errors) == []
+
+
+def test_session_columns_validation():
+    valid = validate_session_columns(np.array([True, False, True, True]), np.array([1, 2, 3, 4]),
+                                     np.array([0, 1, -1, 5]), np.array([738000, 738000, 738000, 0]))
+    assert valid.tolist() == [True, False, False, False]
+    # типы проверяются по dtype столбца, как isinstance в конструкторе
+    assert not validate_session_columns(np.array([1]), np.array([1]), np.array([1]), np.array([738000])).any()
+
+
+def test_session_view_checks_only_untrusted_stores():
+    store = SessionStore()
+    store.extend(np.array([1, 1, 2]), np.array([1, 2, 1]), np.array([3, 4, 5]), np.array([True, True, True]),
+                 np.array([738000] * 3))
+    assert store.sessions(1).trusted
+    assert [session.lab_work_mark for session in store.sessions(1)] == [3, 4]
+    store.extend(np.array([3]), np.array([1]), np.array([3]), np.array([False]), np.array([738000]))
+    assert not store.sessions(1).trusted
+    with pytest.raises(ValueError):
+        list(store.sessions(3))
+    store.remove(3)
+    assert store.sessions(2).trusted
+
+
+def _as_tuples(students):
+    return [(student.unique_id, student.name, student.surname, student.group, student.subgroup,
+             [tuple(session) for session in student.lab_work_sessions]) for student in students]
+
+
+def _round_trip_students(make_students):
+    students = make_students((1, 2, 3))
+    students[1].name, students[1].surname = 'Имя "в кавычках"', 'Back\\slash'
+    students[2].name, students[2].surname = 'Tab\tName', 'Ёлкина'
+    return students
+
+
+def test_csv_round_trip(tmp_path, make_students):
+    students = _round_trip_students(make_students)
+    file_path = str(tmp_path / 'students.csv')
+    assert save_students_csv(file_path, students)
+    errors = LoadErrors()
+    assert _as_tuples(load_students_csv(file_path, errors)) == _as_tuples(students)
+    assert _as_tuples(iter_students_csv(file_path, errors)) == _as_tuples(students)
+    assert errors.count == 0
+    store = SessionStore()
+    assert _as_tuples(load_students_csv(file_path, store=store)) == _as_tuples(students)
+    assert len(store) == 9
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_json_round_trip(tmp_path, compact, make_students):
+    students = _round_trip_students(make_students)
+    file_path = tmp_path / 'students.json'
+    with open(file_path, 'w', encoding='utf-8') as output_file:
+        assert write_students_json(output_file, students, compact) == len(students)
+    errors = LoadErrors()
+    assert _as_tuples(load_students_json(str(file_path), errors)) == _as_tuples(students)
+    assert errors.count == 0
+    text = file_path.read_text(encoding='utf-8')
+    assert ('\n' in text) != compact
+
+    stored = _round_trip_students(make_students)
+    SessionStore.from_students(stored)
+    stored_path = tmp_path / 'stored.json'
+    with open(stored_path, 'w', encoding='utf-8') as output_file:
+        write_students_json(output_file, stored, compact)
+    assert stored_path.read_text(encoding='utf-8') == text
+
+
+def test_iter_students_json_small_chunks(tmp_path, make_students):
+    students = _round_trip_students(make_students)
+    file_path = tmp_path / 'students.json'
+    with open(file_path, 'w', encoding='utf-8') as output_file:
+        output_file.write('{"version": {"major": 1, "tags": ["a", "]"]}, "students": [')
+        output_file.write(','.join(str(student) for student in students))
+        output_file.write('], "comment": "}"}')
+    for chunk_size in (1, 7, 1 << 16):
+        errors = LoadErrors()
+        assert _as_tuples(iter_students_json(str(file_path), errors, chunk_size)) == _as_tuples(students)
+        assert errors.count == 0
+
+
+def _repository_state(repository):
+    return (sorted(repository._by_id), {key: sorted(value) for key, value in repository._by_group.items()},
+            list(repository._surnames))
+
+
+def test_repository_reindexes_on_field_changes(make_students):
+    students = make_students(range(1, 7))
+    store = SessionStore.from_students(students)
+    repository = StudentRepository(students)
+    student = repository[2]
+
+    student.surname = 'Абрамов'
+    assert repository.by_surname_prefix('Абр') == [student]
+    assert student not in repository.by_surname_prefix('Фамилия')
+
+    student.group, student.subgroup = 6409, 2
+    assert student in repository.by_group(6409, 2)
+    assert student not in repository.by_group(6409, 1) and student not in repository.by_group(6408)
+    with pytest.raises(AssertionError):
+        student.group = 6400
+    assert student.group == 6409 and student in repository.by_group(6409, 2)
+
+    with pytest.raises(ValueError):
+        student.unique_id = 3
+    assert student.unique_id == 2 and repository[2] is student and store.count(2) == 3
+    student.unique_id = 20
+    assert 2 not in repository and repository[20] is student
+    assert store.count(2) == 0 and store.count(20) == 3
+    assert repository.by_surname_prefix('Абр') == [student]
+
+
+def test_repository_extend_rolls_back_duplicates(make_students):
+    repository = StudentRepository(make_students((1, 2)))
+    state = _repository_state(repository)
+    batch = make_students((3, 4, 3))
+    with pytest.raises(ValueError, match='duplicate unique_id 3'):
+        repository.extend(batch)
+    assert _repository_state(repository) == state
+    assert all(student._repository is None for student in batch)
+    repository.extend(batch[:2])
+    assert len(repository) == 4 and [student.unique_id for student in repository.by_group(6407)] == [3]
+
+
+def test_repository_surname_queries(make_students):
+    students = make_students(range(1, 6))
+    for student, surname in zip(students, ('Ива', 'Иванов', 'Иванова', 'Ивб', 'Иг')):
+        student.surname = surname
+    repository = StudentRepository(students)
+    surnames = lambda found: [student.surname for student in found]
+    assert surnames(repository.by_surname_prefix('Ива')) == ['Ива', 'Иванов', 'Иванова']
+    assert surnames(repository.by_surname_prefix('Иванов')) == ['Иванов', 'Иванова']
+    assert surnames(repository.by_surname_prefix('Ивб')) == ['Ивб']
+    assert surnames(repository.by_surname_prefix('Ж')) == []
+    assert len(repository.by_surname_prefix('')) == 5
+    # верхняя граница не включается
+    assert surnames(repository.by_surname_range('Иванов', 'Ивб')) == ['Иванов', 'Иванова']
+    assert surnames(repository.by_surname_range('Ива', 'Иг')) == ['Ива', 'Иванов', 'Иванова', 'Ивб']
+    assert repository.by_surname_range('Иг', 'Ива') == []
+
+
+def test_repository_remove(make_students):
+    repository = StudentRepository()
+    for student in make_students((1, 2, 3)):
+        repository.add(student)
+    student = repository.remove(2)
+    assert 2 not in repository and len(repository) == 2 and student._repository is None
+    assert student not in repository.by_group(student.group) and student not in repository.by_surname_prefix('')
+    # удалённый студент меняет поля без обращения к репозиторию и может быть добавлен снова
+    student.surname = 'Новая'
+    repository.add(student)
+    assert repository.by_surname_prefix('Нов') == [student]
+    with pytest.raises(KeyError):
+        repository.remove(5)
+    with pytest.raises(ValueError):
+        repository.add(student)
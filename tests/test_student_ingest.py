@@ -0,0 +1,52 @@
+from datetime import date
+import pytest
+from Student_Class import LabWorkSession, save_students_csv, save_students_json
+from student_ingest import ingest_students
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_ingest_mixed_csv_and_json(tmp_path, n_jobs, make_students):
+    students = make_students(range(6))
+    save_students_csv(str(tmp_path / 'x1.csv'), students)
+    save_students_json(str(tmp_path / 'x2.json'), students)
+    result = ingest_students([str(tmp_path / 'x1.csv'), str(tmp_path / 'x2.json')], n_jobs=n_jobs)
+    assert result.conflicts == []
+    assert [(student.unique_id, student.name, student.surname) for student in result.students] == \
+        [(student.unique_id, student.name, student.surname) for student in students]
+    # одинаковые занятия из двух файлов загружаются один раз
+    assert len(result.store) == 6 * 3
+    assert list(result.students[1].lab_work_sessions) == list(students[1].lab_work_sessions)
+
+
+def test_ingest_conflicts(tmp_path, make_students):
+    students = make_students(range(6))
+    save_students_csv(str(tmp_path / 'a.csv'), students)
+    changed = make_students(range(6))
+    changed[2].surname = 'Другая'
+    changed[4].group = 6409 if changed[4].group != 6409 else 6408
+    for student in changed:
+        student.append_lab_work_session(LabWorkSession(True, 9, 5, date(2023, 12, 1)))
+    save_students_json(str(tmp_path / 'b.json'), changed)
+
+    result = ingest_students(str(tmp_path / '*'), n_jobs=1)
+    assert [(conflict.unique_id, conflict.fields) for conflict in result.conflicts] == \
+        [(2, ('surname',)), (4, ('group',))]
+    assert result.conflicts[0].accepted_file.endswith('a.csv')
+    assert result.conflicts[0].rejected_file.endswith('b.json')
+    by_id = {student.unique_id: student for student in result.students}
+    assert by_id[2].surname == 'Фамилия2'
+    # занятия конфликтующей записи не загружены, остальных - дополнены
+    assert len(by_id[2].lab_work_sessions) == 3
+    assert len(by_id[3].lab_work_sessions) == 4
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_ingest_names_with_control_characters(tmp_path, n_jobs, make_students):
+    students = make_students(range(4))
+    students[1].name = 'a\x00b'
+    students[2].surname = '\x00'
+    save_students_json(str(tmp_path / 'x1.json'), students)
+    save_students_csv(str(tmp_path / 'x2.csv'), students)
+    result = ingest_students([str(tmp_path / 'x1.json'), str(tmp_path / 'x2.csv')], n_jobs=n_jobs)
+    assert [(student.unique_id, student.name, student.surname) for student in result.students] == \
+        [(student.unique_id, student.name, student.surname) for student in students]